@@ -1,5 +1,4 @@
 from http.client import HTTPException
-from passlib.context import CryptContext
 from datetime import timedelta, timezone, datetime
 import jwt
 from jwt.exceptions import InvalidTokenError
@@ -7,21 +6,32 @@ from app.config import settings
 from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from typing import Annotated
-from sqlmodel import Session, select
-from app.db import get_session
+from sqlmodel import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_async_session
 from app.schemas import task as schema_task
+from app.auth.user_cache import UserCache
+from app.auth import hashing
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+_user_cache: UserCache | None = None
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def get_user_cache() -> UserCache:
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = UserCache(max_size=settings.user_cache_size,
+                                ttl=settings.user_cache_ttl_seconds)
+    return _user_cache
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def get_password_hash(password):
+    return await hashing.hash_password(password)
+
+
+async def verify_password(plain_password, hashed_password):
+    return await hashing.verify_password(plain_password, hashed_password)
 
 
 def create_access_token(data: dict,
@@ -41,8 +51,12 @@ def create_access_token(data: dict,
     return encoded_jwt
 
 
-def get_current_user(token: Annotated[str, Depends(oauth2_scheme)],
-                     db_session: Session = Depends(get_session)):
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)],
+                           db_session: AsyncSession = Depends(get_async_session)):
+    cached_user = get_user_cache().get(token)
+    if cached_user is not None:
+        return cached_user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -59,9 +73,10 @@ def get_current_user(token: Annotated[str, Depends(oauth2_scheme)],
     statement = (select(schema_task.User)
                  .where(schema_task.User.email == username))
 
-    user = db_session.exec(statement).first()
+    user = (await db_session.execute(statement)).scalars().first()
 
     if user is None:
         raise credentials_exception
 
+    get_user_cache().put(token, user, payload.get("exp"))
     return user
@@ -0,0 +1,125 @@
+"""
+This module provides password hashing in a bounded process pool,
+so that bcrypt does not block the event loop of the worker
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config import settings
+
+
+_pwd_context = None
+_executor: ProcessPoolExecutor | None = None
+_pending = 0
+_dummy_hash: str | None = None
+
+
+class HashingOverloaded(Exception):
+    """
+    В очереди пула уже password_hash_max_pending задач; приложение
+    отвечает на это 503 с Retry-After
+    """
+
+
+def get_pwd_context():
+    """
+    Контекст passlib создается при первом хэшировании: в процессах пула
+    и в процессе приложения независимо
+    """
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        # bcrypt__rounds задает стоимость новых хэшей и помечает хэши с другой
+        # стоимостью как требующие обновления (needs_update)
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto",
+                                    bcrypt__rounds=settings.bcrypt_rounds)
+    return _pwd_context
+
+
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return get_pwd_context().verify_and_update(password, hashed_password)
+
+
+def _warm_up_worker() -> None:
+    get_pwd_context()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.password_hash_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+async def _run(func, *args):
+    """
+    Выполнить func в пуле процессов. Если в очереди уже
+    password_hash_max_pending задач, сразу отказываем (HashingOverloaded),
+    чтобы задержка не росла неограниченно
+    """
+    global _pending
+    if _pending >= settings.password_hash_max_pending:
+        raise HashingOverloaded()
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), func, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Проверить пароль. Вторым элементом возвращается новый хэш,
+    если текущий создан с устаревшими параметрами
+    """
+    return await _run(_verify_and_update, password, hashed_password)
+
+
+async def warm_up() -> None:
+    """
+    Запустить процессы пула заранее: иначе первые входы ждут запуска
+    процесса и импорта приложения в нем
+    """
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    await asyncio.gather(*(loop.run_in_executor(executor, _warm_up_worker)
+                           for _ in range(settings.password_hash_workers)))
+    await _get_dummy_hash()
+
+
+async def verify_unknown_user(password: str) -> None:
+    """
+    Проверка пароля для несуществующего пользователя: сравнение с хэшем
+    той же стоимости занимает столько же времени, что и для настоящего
+    пользователя, поэтому по времени ответа нельзя узнать, есть ли email в БД
+    """
+    await verify_password(password, await _get_dummy_hash())
+
+
+async def _get_dummy_hash() -> str:
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await hash_password(os.urandom(16).hex())
+    return _dummy_hash
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
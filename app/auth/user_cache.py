@@ -0,0 +1,91 @@
+"""
+This module provides a bounded LRU/TTL cache of verified access tokens
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from app.schemas import task as schema_task
+
+
+class UserCache:
+    """
+    Кэш проверенных токенов: подпись токена -> снимок пользователя.
+    Запись живет не дольше ttl секунд и не дольше срока действия токена.
+    Кэш принадлежит процессу: invalidate_user не затрагивает другие воркеры
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, schema_task.User]] = OrderedDict()
+        self._keys_by_user: dict[int, set[str]] = {}
+
+    @staticmethod
+    def key(token: str) -> str:
+        return token.rsplit(".", 1)[-1]
+
+    def get(self, token: str) -> schema_task.User | None:
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user
+
+    def put(self, token: str, user: schema_task.User, token_exp: float | None) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        snapshot = schema_task.User(**user.model_dump())
+        key = self.key(token)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, snapshot)
+            self._keys_by_user.setdefault(snapshot.user_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[1].user_id
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
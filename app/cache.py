@@ -0,0 +1,214 @@
+"""
+This module provides a response cache for read-heavy listing routes
+with ETag support and invalidation shared between worker processes
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable
+
+from fastapi import Request, Response, status
+
+from app.config import settings
+
+
+def make_etag(body: bytes) -> str:
+    # Слабая метка: тело может быть отправлено сжатым разными кодеками,
+    # а сравнение в If-None-Match все равно слабое
+    return 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _encode(body: bytes, headers: dict) -> bytes:
+    return json.dumps(headers).encode() + b"\n" + body
+
+
+def _decode(value: bytes) -> tuple[bytes, dict]:
+    headers, body = value.split(b"\n", 1)
+    return body, json.loads(headers)
+
+
+class MemoryBackend:
+    """
+    LRU-кэш в памяти процесса. Поколения пространств имен хранятся
+    в файлах shared_dir: запись увеличивает файл на один байт (O_APPEND
+    атомарен), а номер поколения - это размер файла. Так сброс кэша
+    в одном воркере виден остальным воркерам на том же хосте
+    ценой одного stat на запрос
+    """
+
+    # После этого размера файл поколения пересоздается (меняется inode)
+    MAX_GENERATION_FILE_SIZE = 1 << 20
+
+    def __init__(self, max_entries: int, ttl: float, shared_dir: str):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_dir = shared_dir
+        os.makedirs(shared_dir, exist_ok=True)
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def generation(self, namespace: str) -> str:
+        try:
+            stat = os.stat(self._generation_path(namespace))
+        except FileNotFoundError:
+            return "0"
+        return f"{stat.st_ino}.{stat.st_size}"
+
+    async def bump(self, namespace: str) -> None:
+        path = self._generation_path(namespace)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, b"1")
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size > self.MAX_GENERATION_FILE_SIZE:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(b"1")
+            os.replace(tmp_path, path)
+
+    def _generation_path(self, namespace: str) -> str:
+        return os.path.join(self.shared_dir, f"{namespace}.generation")
+
+
+class RedisBackend:
+    """
+    Кэш в Redis (или совместимом сервере): общий для всех воркеров и хостов.
+    Требует установленного пакета redis
+    """
+
+    def __init__(self, url: str, ttl: float):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("cache_backend=redis requires the 'redis' package") from e
+        self.ttl = ttl
+        self._redis = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._redis.get(f"cache:{key}")
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self._redis.set(f"cache:{key}", value, ex=int(self.ttl) or None)
+
+    async def generation(self, namespace: str) -> str:
+        value = await self._redis.get(f"generation:{namespace}")
+        return value.decode() if value else "0"
+
+    async def bump(self, namespace: str) -> None:
+        await self._redis.incr(f"generation:{namespace}")
+
+
+class ResponseCache:
+    """
+    Кэш готовых JSON-ответов. Ключ строится из пути, параметров запроса,
+    пользователя и поколений пространств имен, от которых зависит ответ;
+    invalidate() переводит пространство имен на новое поколение
+    """
+
+    def __init__(self, backend_factory: Callable[[], object]):
+        # Хранилище создается при первом запросе, а не при импорте модуля
+        self._backend_factory = backend_factory
+        self._backend = None
+        self._backend_ready = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        if not self._backend_ready:
+            self._backend = self._backend_factory()
+            self._backend_ready = True
+        return self._backend
+
+    async def get_or_build(self,
+                           request: Request,
+                           namespaces: Iterable[str],
+                           build: Callable[[], Awaitable[tuple[bytes, dict]]],
+                           vary: str = "") -> Response:
+        """
+        Ответ из кэша, либо результат build() (тело и заголовки),
+        сохраненный в кэш. Учитывает If-None-Match
+        """
+        if self.backend is None:
+            body, headers = await build()
+            return self._respond(request, body, headers)
+
+        generations = [await self.backend.generation(namespace) for namespace in namespaces]
+        query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+        raw_key = f"{request.url.path}?{query}|{vary}|{','.join(generations)}"
+        key = hashlib.blake2b(raw_key.encode(), digest_size=16).hexdigest()
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            body, headers = _decode(cached)
+        else:
+            self.misses += 1
+            body, headers = await build()
+            headers["ETag"] = make_etag(body)
+            await self.backend.set(key, _encode(body, headers))
+        return self._respond(request, body, headers)
+
+    async def invalidate(self, *namespaces: str) -> None:
+        if self.backend is None:
+            return
+        for namespace in namespaces:
+            await self.backend.bump(namespace)
+
+    def stats(self) -> dict:
+        return {"backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "misses": self.misses}
+
+    @staticmethod
+    def _respond(request: Request, body: bytes, headers: dict) -> Response:
+        headers = dict(headers)
+        headers.setdefault("ETag", make_etag(body))
+        headers.setdefault("Cache-Control", settings.cache_control)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = {_opaque_tag(tag) for tag in if_none_match.split(",")}
+            if _opaque_tag(headers["ETag"]) in tags or "*" in tags:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                                headers={"ETag": headers["ETag"],
+                                         "Cache-Control": headers["Cache-Control"]})
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _make_backend():
+    if settings.cache_backend == "redis":
+        return RedisBackend(settings.cache_redis_url, settings.cache_ttl_seconds)
+    if settings.cache_backend == "memory":
+        shared_dir = settings.cache_shared_dir or os.path.join(tempfile.gettempdir(),
+                                                               "taskman-cache")
+        return MemoryBackend(settings.cache_max_entries, settings.cache_ttl_seconds, shared_dir)
+    return None
+
+
+response_cache = ResponseCache(_make_backend)
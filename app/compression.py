@@ -0,0 +1,210 @@
+"""
+This module provides response compression negotiated by Accept-Encoding:
+zstd and brotli when the optional zstandard/brotli packages are installed,
+gzip always. Buffered and streaming responses are compressed on the fly
+"""
+import zlib
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Типы содержимого, которые имеет смысл сжимать. text/event-stream
+# не сжимается: события должны уходить клиенту сразу, без буферизации
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/plain", "text/html")
+# Части потокового ответа (например, по строке NDJSON) копятся до этого
+# размера: на мелких частях кодеки тратят больше времени, а brotli
+# с низким quality почти перестает сжимать
+STREAM_BUFFER_SIZE = 16 * 1024
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BufferedEncoder:
+    """
+    Кодек, которому части тела передаются пачками не меньше buffer_size
+    """
+
+    def __init__(self, encoder, buffer_size: int = STREAM_BUFFER_SIZE):
+        self.encoder = encoder
+        self.buffer_size = buffer_size
+        self._buffer: list[bytes] = []
+        self._buffered = 0
+
+    def compress(self, data: bytes) -> bytes:
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered < self.buffer_size:
+            return b""
+        return self.encoder.compress(self._take())
+
+    def finish(self) -> bytes:
+        return self.encoder.compress(self._take()) + self.encoder.finish()
+
+    def _take(self) -> bytes:
+        data = b"".join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+        return data
+
+
+def available_encoders() -> dict:
+    """
+    Кодеки в порядке предпочтения сервера с уровнями из настроек;
+    кодеки без установленной библиотеки пропускаются
+    """
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = lambda: ZstdEncoder(settings.compression_zstd_level)
+    if brotli is not None:
+        encoders["br"] = lambda: BrotliEncoder(settings.compression_brotli_quality)
+    encoders["gzip"] = lambda: GzipEncoder(settings.compression_gzip_level)
+    return encoders
+
+
+def negotiate(accept_encoding: str, encodings) -> str | None:
+    """
+    Кодек из encodings с наибольшим q в Accept-Encoding; при равных q
+    выбирается первый в encodings. None - сжатие не принимается
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _header(headers: list, name: bytes) -> bytes | None:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _add_vary(headers: list) -> list:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower():
+        return headers
+    return [(key, value + b", Accept-Encoding" if key.lower() == b"vary" else value)
+            for key, value in headers]
+
+
+class CompressionMiddleware:
+    """
+    ASGI-middleware сжатия ответов. Ответ целиком короче
+    compression_min_size отправляется как есть; потоковые ответы
+    сжимаются по мере отправки, без ожидания конца тела
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.encoders = available_encoders()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = _header(scope["headers"], b"accept-encoding") or b""
+        encoding = negotiate(accept_encoding.decode("latin-1"), self.encoders)
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = message.get("headers", [])
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if (message["status"] < 200 or message["status"] in (204, 304)
+                        or _header(headers, b"content-encoding") is not None
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                    passthrough = True
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = _add_vary(start_message.get("headers", []))
+                if encoding is None or (not more_body and len(body) < settings.compression_min_size):
+                    passthrough = True
+                    await send({**start_message, "headers": headers})
+                    await send(message)
+                    return
+                headers = [(key, value) for key, value in headers if key.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                encoder = BufferedEncoder(self.encoders[encoding]())
+                await send({**start_message, "headers": headers})
+
+            data = encoder.compress(body)
+            if not more_body:
+                data += encoder.finish()
+            # Кодек может накапливать данные: пустые части не отправляются
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -4,8 +4,19 @@ This module provides project configuration
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
-class Settings(BaseSettings):
-    model_config = SettingsConfigDict(env_file=".env")
+class ProcessSettings(BaseSettings):
+    """
+    Параметры, которые нужны при импорте модулей (до импорта
+    prometheus_client) и поэтому не требуют остальных настроек
+    """
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    # Каталог для метрик Prometheus в режиме нескольких воркеров;
+    # без него метрики собираются только по текущему процессу
+    metrics_multiproc_dir: str | None = None
+
+
+class Settings(ProcessSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="forbid")
     db_username: str
     db_password: str
     db_host: str
@@ -14,6 +25,144 @@ class Settings(BaseSettings):
     secret_key: str
     algo: str
     access_token_expire_minutes: int
+    # Полный адрес БД для async-драйвера, например sqlite+aiosqlite:///bench.db;
+    # если задан, параметры db_username..db_name не используются
+    database_url: str | None = None
+    # Параметры подключения к БД и пула соединений (на каждый воркер)
+    db_echo: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # 0 - без ограничения времени выполнения запроса
+    db_statement_timeout_ms: int = 0
+    # Совместимость с PgBouncer в режиме transaction pooling
+    db_pgbouncer: bool = False
+    # Прогрев при запуске: число заранее открытых соединений пула,
+    # схемы OpenAPI и процессы хэширования паролей
+    warmup_enabled: bool = True
+    db_pool_warmup_connections: int = 2
+    # Индекс занятости сотрудников в памяти процесса для /tasks/get-candidate.
+    # Точен только при одном воркере: изменения из других процессов он не видит
+    workload_index_enabled: bool = False
+    # Кэш проверенных токенов в get_current_user. Сбрасывается только
+    # в воркере, обработавшем изменение пользователя: в остальных воркерах
+    # измененный или удаленный пользователь виден из кэша еще до
+    # user_cache_ttl_seconds секунд
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: int = 60
+    # Кэш ответов списков: memory (общая инвалидация для воркеров одного
+    # хоста через файлы в cache_shared_dir), redis или none
+    cache_backend: str = "memory"
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_max_entries: int = 1024
+    cache_ttl_seconds: int = 300
+    cache_shared_dir: str | None = None
+    # Запросы с большим числом SQL-выражений логируются как возможный N+1
+    metrics_statement_threshold: int = 20
+    # Максимальное число элементов в одном пакетном запросе
+    bulk_max_items: int = 50000
+    # Автоназначение /tasks/auto-assign с учетом сроков: задание со сроком
+    # не позже чем через due_horizon дней весит 1 + due_weight
+    auto_assign_due_horizon_days: int = 3
+    auto_assign_due_weight: float = 1.0
+    # Производственный календарь для /tasks/tasks-for-day:
+    # провайдер isdayoff или file, файл бессрочного кэша и таймаут ответа
+    dayoff_provider: str = "isdayoff"
+    dayoff_url: str = "https://isdayoff.ru"
+    dayoff_file: str = "dayoff.json"
+    dayoff_cache_path: str | None = ".cache/dayoff.json"
+    dayoff_timeout_seconds: float = 1.0
+    # Год, который провайдер не отдал, не запрашивается повторно столько
+    # секунд; запрашиваются только годы не дальше заданного числа лет
+    # от текущего, для остальных is_day_off - null
+    dayoff_retry_seconds: float = 60.0
+    dayoff_years_back: int = 10
+    dayoff_years_ahead: int = 1
+    # Лента изменений заданий: число последних событий для продолжения
+    # с номера, размер очереди одного подключения и период пустых сообщений
+    feed_buffer_size: int = 5000
+    feed_queue_size: int = 1000
+    feed_heartbeat_seconds: float = 15.0
+    # Пакет из большего числа событий публикуется одним событием bulk
+    feed_bulk_threshold: int = 100
+    # Сжатие ответов: минимальный размер тела и уровни кодеков,
+    # подобранные по benchmarks.compression ради пропускной способности
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 1
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    # Cache-Control для списков: браузер и прокси хранят ответ,
+    # но перед использованием перепроверяют его по ETag
+    cache_control: str = "private, no-cache"
+    # Синхронизация /tasks/changes: запас по времени на транзакции,
+    # зафиксированные позже чтения, и срок хранения отметок об удалении
+    sync_overlap_seconds: float = 5.0
+    sync_tombstone_retention_days: int = 30
+    # Фоновые задания app.jobs: исполнитель в каждом воркере приложения
+    # (или отдельным процессом python -m app.jobs), число одновременно
+    # выполняемых заданий, период опроса очереди, срок аренды задания
+    # исполнителем и паузы между повторами: base, 2*base ... но не дольше max
+    jobs_worker_enabled: bool = True
+    jobs_concurrency: int = 4
+    jobs_poll_interval_seconds: float = 1.0
+    jobs_lease_seconds: float = 300.0
+    jobs_max_attempts: int = 5
+    jobs_retry_base_seconds: float = 5.0
+    jobs_retry_max_seconds: float = 3600.0
+    # Напоминания о сроках: за сколько дней до срока напоминать, период
+    # сканирования и число заданий, обрабатываемых в одной транзакции
+    reminder_due_soon_days: int = 1
+    reminder_scan_interval_seconds: float = 300.0
+    reminder_batch_size: int = 5000
+    # Ограничение частоты входа и регистрации: memory (общая таблица для
+    # воркеров одного хоста в файле rate_limit_shared_dir), redis или none.
+    # Корзины: запас запросов (burst) и пополнение в минуту
+    rate_limit_backend: str = "memory"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_shared_dir: str | None = None
+    rate_limit_shards: int = 64
+    rate_limit_slots: int = 1024
+    login_ip_burst: int = 20
+    login_ip_per_minute: float = 10
+    login_account_burst: int = 5
+    login_account_per_minute: float = 2
+    signup_ip_burst: int = 5
+    signup_ip_per_minute: float = 1
+    # Блокировка после login_lockout_threshold неудачных входов подряд:
+    # base, 2*base, 4*base ... но не дольше max; счетчик забывается
+    # через login_failure_window_seconds после последней ошибки
+    login_lockout_threshold: int = 5
+    login_lockout_base_seconds: float = 1.0
+    login_lockout_max_seconds: float = 900.0
+    login_failure_window_seconds: float = 900.0
+    # Хэширование паролей: стоимость bcrypt, число процессов пула
+    # и максимальная очередь, после которой отвечаем 503
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+
+
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    """
+    Настройки читаются из окружения и .env при первом обращении,
+    а не при импорте: без .env приложение импортируется, но не запускается
+    """
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+class _LazySettings:
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(get_settings(), name, value)
 
 
-settings = Settings()
+settings: Settings = _LazySettings()
@@ -0,0 +1,230 @@
+"""
+This module provides the working/non-working day calendar
+used by /tasks/tasks-for-day
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from typing import TYPE_CHECKING
+
+from app import metrics
+from app.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+
+logger = logging.getLogger(__name__)
+
+
+def _year_days(year: int) -> list[date]:
+    first = date(year, 1, 1)
+    return [first + timedelta(days=i)
+            for i in range((date(year + 1, 1, 1) - first).days)]
+
+
+class DayOffProvider(ABC):
+    """
+    Источник производственного календаря. Возвращает календарь сразу
+    на весь год: список признаков выходного дня, по одному на каждый день
+    """
+
+    @abstractmethod
+    async def fetch_year(self, year: int) -> list[bool]:
+        ...
+
+
+class IsDayOffProvider(DayOffProvider):
+    """
+    Календарь сервиса isdayoff.ru, год запрашивается одним вызовом
+    """
+
+    def __init__(self, http_client: "httpx.AsyncClient", base_url: str = "https://isdayoff.ru"):
+        self.http_client = http_client
+        self.base_url = base_url.rstrip("/")
+
+    async def fetch_year(self, year: int) -> list[bool]:
+        response = await self.http_client.get(f"{self.base_url}/api/getdata",
+                                              params={"year": year})
+        response.raise_for_status()
+        days = response.text.strip()
+        if len(days) != len(_year_days(year)):
+            raise ValueError(f"Unexpected calendar length for {year}: {len(days)}")
+        return [day == "1" for day in days]
+
+
+class FileProvider(DayOffProvider):
+    """
+    Локальный календарь из JSON-файла вида {"2025": ["2025-01-01", ...]}.
+    Для отсутствующих в файле лет выходными считаются суббота и воскресенье
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._days_off: dict[str, set[str]] | None = None
+
+    async def fetch_year(self, year: int) -> list[bool]:
+        if self._days_off is None:
+            self._days_off = {}
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    self._days_off = {key: set(value) for key, value in json.load(f).items()}
+        days_off = self._days_off.get(str(year))
+        if days_off is None:
+            return [day.weekday() >= 5 for day in _year_days(year)]
+        return [day.isoformat() in days_off for day in _year_days(year)]
+
+
+class DayOffCalendar:
+    """
+    Кэш календаря по годам. Прошедшие и будущие дни не меняются,
+    поэтому год, полученный от провайдера, хранится бессрочно
+    в памяти и в файле cache_path. Год, загрузка которого не удалась,
+    не запрашивается снова retry_after секунд; у провайдера запрашиваются
+    только годы из отрезка years (по умолчанию - около текущего года)
+    """
+
+    def __init__(self, cache_path: str | None, timeout: float,
+                 retry_after: float = 60.0, years: range | None = None):
+        self.cache_path = cache_path
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.years = years
+        self.provider: DayOffProvider | None = None
+        self._years: dict[int, list[bool]] = {}
+        self._fetches: dict[int, asyncio.Task] = {}
+        self._failed: dict[int, float] = {}
+        self._cache_mtime: int | None = None
+        self._load_cache()
+
+    async def is_day_off(self, day: date) -> bool | None:
+        """
+        Признак выходного дня или None, если провайдер не ответил вовремя
+        """
+        return (await self.days_off(day, day))[day]
+
+    async def days_off(self, start: date, end: date) -> dict[date, bool | None]:
+        """
+        Признаки выходных для всех дней отрезка [start, end]
+        """
+        years = range(start.year, end.year + 1)
+        missing = [year for year in years
+                   if year not in self._years and self._can_fetch(year)]
+        if missing:
+            # Год мог загрузить другой воркер (например, фоновым заданием)
+            self._load_cache()
+            missing = [year for year in missing if year not in self._years]
+        if missing and self.provider is not None:
+            fetches = [asyncio.shield(self._fetch(year)) for year in missing]
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(asyncio.gather(*fetches, return_exceptions=True),
+                                       timeout=self.timeout)
+            except asyncio.TimeoutError:
+                # Загрузка продолжится в фоне и заполнит кэш для следующих запросов
+                logger.warning("Day-off provider did not answer in %s s", self.timeout)
+            finally:
+                metrics.record_external("dayoff", time.perf_counter() - started)
+
+        result = {}
+        for offset in range((end - start).days + 1):
+            # Смещение от start, а не следующий день: день после date.max не существует
+            day = start + timedelta(days=offset)
+            year = self._years.get(day.year)
+            result[day] = year[day.timetuple().tm_yday - 1] if year is not None else None
+        return result
+
+    async def prefetch(self, years) -> None:
+        """
+        Загрузить недостающие годы без ограничения по времени ответа.
+        Ошибка провайдера пробрасывается, чтобы фоновое задание повторилось
+        """
+        if self.provider is None:
+            raise RuntimeError("Day-off provider is not configured")
+        self._load_cache()
+        for year in years:
+            if year not in self._years:
+                self._years[year] = await self.provider.fetch_year(year)
+                self._save_cache()
+
+    def _can_fetch(self, year: int) -> bool:
+        if year not in (_fetchable_years() if self.years is None else self.years):
+            return False
+        failed_at = self._failed.get(year)
+        return failed_at is None or time.monotonic() - failed_at >= self.retry_after
+
+    def _fetch(self, year: int) -> asyncio.Task:
+        # Одновременные запросы за один и тот же год ждут одну загрузку
+        task = self._fetches.get(year)
+        if task is None:
+            task = asyncio.create_task(self._fetch_year(year))
+            self._fetches[year] = task
+        return task
+
+    async def _fetch_year(self, year: int) -> None:
+        try:
+            self._years[year] = await self.provider.fetch_year(year)
+            self._failed.pop(year, None)
+            self._save_cache()
+        except Exception:
+            # До истечения retry_after запросы за этот год не ждут провайдера
+            self._failed[year] = time.monotonic()
+            logger.exception("Failed to fetch day-off calendar for %s", year)
+        finally:
+            self._fetches.pop(year, None)
+
+    def _load_cache(self) -> None:
+        # Файл перечитывается, только если изменился с прошлого чтения
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            mtime = os.stat(self.cache_path).st_mtime_ns
+            if mtime == self._cache_mtime:
+                return
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            self._years.update({int(year): [day == "1" for day in days]
+                                for year, days in cached.items()})
+            self._cache_mtime = mtime
+        except (OSError, ValueError):
+            logger.exception("Failed to read day-off cache %s", self.cache_path)
+
+    def _save_cache(self) -> None:
+        if not self.cache_path:
+            return
+        data = {str(year): "".join("1" if day_off else "0" for day_off in days)
+                for year, days in sorted(self._years.items())}
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.cache_path)
+
+
+def _fetchable_years() -> range:
+    year = date.today().year
+    return range(year - settings.dayoff_years_back, year + settings.dayoff_years_ahead + 1)
+
+
+def make_provider(http_client: "httpx.AsyncClient") -> DayOffProvider:
+    if settings.dayoff_provider == "file":
+        return FileProvider(settings.dayoff_file)
+    return IsDayOffProvider(http_client, settings.dayoff_url)
+
+
+_calendar: DayOffCalendar | None = None
+
+
+def get_calendar() -> DayOffCalendar:
+    global _calendar
+    if _calendar is None:
+        _calendar = DayOffCalendar(cache_path=settings.dayoff_cache_path,
+                                   timeout=settings.dayoff_timeout_seconds,
+                                   retry_after=settings.dayoff_retry_seconds)
+    return _calendar
@@ -0,0 +1,260 @@
+"""
+This module provides the task change feed: writers publish events in the
+same transaction as the change, every worker receives them through
+Postgres LISTEN/NOTIFY and fans them out to WebSocket/SSE subscribers
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Iterable
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import db
+from app.config import settings
+from app.schemas import task as schema_task
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "task_feed"
+
+# Номер события берется из общей последовательности в момент публикации,
+# поэтому он одинаков во всех воркерах
+_NOTIFY = text(
+    "SELECT pg_notify(:channel, (jsonb_build_object('seq', nextval('task_feed_seq')) "
+    "|| CAST(payload AS jsonb))::text) "
+    "FROM unnest(CAST(:payloads AS text[])) AS payload"
+)
+
+# Служебные события подписчику: буфер переполнен или история потеряна,
+# в обоих случаях клиент должен заново запросить актуальные данные
+OVERFLOW = {"type": "overflow"}
+RESET = {"type": "reset"}
+# Наибольшее число исполнителей и проектов в событии bulk: уведомление
+# Postgres ограничено 8000 байт, при большем числе списка нет
+# и событие получают все подписчики
+BULK_MAX_KEYS = 200
+
+
+def task_event(event_type: str, task, previous: dict | None = None) -> dict:
+    """
+    Событие об изменении задания. previous содержит прежних исполнителя
+    и проект, чтобы подписчики увидели, что задание от них ушло
+    """
+    event = {"type": event_type,
+             "task": schema_task.TaskRead.model_validate(task, from_attributes=True)
+             .model_dump(mode="json")}
+    if previous is not None:
+        event["previous"] = previous
+    return event
+
+
+def deleted_event(task_id: int, assignee: int, project: int | None) -> dict:
+    return {"type": "deleted",
+            "task": {"task_id": task_id, "assignee": assignee, "project": project}}
+
+
+def bulk_event(events: list[dict]) -> dict:
+    """
+    Одно событие вместо пакета изменений: подписчики затронутых
+    исполнителей и проектов перечитывают данные, как после RESET
+    """
+    assignees, projects = set(), set()
+    for event in events:
+        for task in (event["task"], event.get("previous", {})):
+            if "assignee" in task:
+                assignees.add(task["assignee"])
+            if "project" in task:
+                projects.add(task["project"])
+    return {"type": "bulk",
+            "action": events[0]["type"],
+            "count": len(events),
+            "assignees": sorted(assignees) if len(assignees) <= BULK_MAX_KEYS else None,
+            "projects": (sorted(projects, key=lambda project: project or 0)
+                         if len(projects) <= BULK_MAX_KEYS else None)}
+
+
+async def publish(session: AsyncSession, events: Iterable[dict]) -> None:
+    """
+    Опубликовать события в транзакции сессии: в Postgres уведомления
+    доставляются только после фиксации транзакции, одним запросом на пакет.
+    Пакет больше feed_bulk_threshold заменяется одним событием bulk:
+    иначе он вытеснил бы историю из буфера и переполнил очереди
+    подписчиков, а Postgres до 13 версии сверяет каждое уведомление
+    транзакции со всеми предыдущими
+    """
+    events = list(events)
+    if len(events) > settings.feed_bulk_threshold:
+        events = [bulk_event(events)]
+    payloads = [orjson.dumps(event).decode() for event in events]
+    if not payloads:
+        return
+    if db.is_postgres():
+        await session.execute(_NOTIFY, {"channel": CHANNEL, "payloads": payloads})
+    else:
+        # Без Postgres события расходятся только внутри процесса
+        for payload in payloads:
+            hub.dispatch(payload, local=True)
+
+
+class Subscription:
+    """
+    Очередь событий одного подключения с отбором по исполнителю и проекту.
+    Очередь ограничена: если клиент не успевает читать, вместо накопления
+    событий он получает OVERFLOW и переподключается с последнего seq
+    """
+
+    def __init__(self, assignee: int | None, project: int | None, max_size: int):
+        self.assignee = assignee
+        self.project = project
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=max_size)
+
+    def matches(self, event: dict) -> bool:
+        if "assignee" in event:
+            # Напоминание адресовано исполнителю, а не проекту
+            return self.assignee in (None, event["assignee"]) and self.project is None
+        if event.get("type") == "bulk":
+            return ((self.assignee is None or event["assignees"] is None
+                     or self.assignee in event["assignees"])
+                    and (self.project is None or event["projects"] is None
+                         or self.project in event["projects"]))
+        if "task" not in event:
+            return True
+        task, previous = event["task"], event.get("previous", {})
+        if self.assignee is not None and self.assignee not in (task.get("assignee"),
+                                                               previous.get("assignee")):
+            return False
+        if self.project is not None and self.project not in (task.get("project"),
+                                                             previous.get("project")):
+            return False
+        return True
+
+    def offer(self, event: dict) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+
+class FeedHub:
+    """
+    Рассылка событий подписчикам процесса и кольцевой буфер последних
+    событий для продолжения с номера. Все воркеры получают уведомления
+    в порядке фиксации транзакций, поэтому продолжение идет по позиции
+    события в буфере, а не по сравнению номеров
+    """
+
+    def __init__(self, buffer_size: int | None = None, queue_size: int | None = None):
+        # Размеры по умолчанию берутся из настроек при первом событии
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self._buffer: deque[dict] | None = None
+        self._subscriptions: set[Subscription] = set()
+        self._local_seq = 0
+        self._listener: asyncio.Task | None = None
+
+    def subscribe(self, assignee: int | None = None, project: int | None = None,
+                  since: int | None = None) -> Subscription:
+        """
+        Новая подписка; если задан since, в очередь сразу попадают события
+        после события с этим номером, либо RESET, если их уже нет в буфере
+        """
+        subscription = Subscription(assignee, project,
+                                    self.queue_size or settings.feed_queue_size)
+        if since is not None:
+            for event in self._replay(since):
+                if subscription.matches(event):
+                    subscription.offer(event)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def dispatch(self, payload: str, local: bool = False) -> None:
+        event = orjson.loads(payload)
+        if local:
+            self._local_seq += 1
+            event["seq"] = self._local_seq
+        self._history.append(event)
+        for subscription in self._subscriptions:
+            if subscription.matches(event):
+                subscription.offer(event)
+
+    def reset(self) -> None:
+        """
+        История прервалась (потеряно соединение LISTEN): продолжение
+        с номера невозможно, подписчики должны перечитать данные
+        """
+        self._history.clear()
+        for subscription in self._subscriptions:
+            subscription.offer(RESET)
+
+    @property
+    def _history(self) -> deque[dict]:
+        if self._buffer is None:
+            self._buffer = deque(maxlen=self.buffer_size or settings.feed_buffer_size)
+        return self._buffer
+
+    def _replay(self, since: int) -> list[dict]:
+        history = list(self._history)
+        for position in range(len(history) - 1, -1, -1):
+            if history[position]["seq"] == since:
+                return history[position + 1:]
+        return [RESET]
+
+    async def start(self) -> None:
+        if db.is_postgres() and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        """
+        Отдельное соединение (не из пула), слушающее канал; при обрыве
+        переподключается, а подписчики получают RESET
+        """
+        import asyncpg
+
+        url = make_url(db.database_urls()[1])
+        delay = 1.0
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(user=url.username, password=url.password,
+                                                   host=url.host, port=url.port,
+                                                   database=url.database)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(
+                    CHANNEL, lambda _conn, _pid, _channel, payload: self.dispatch(payload)
+                )
+                delay = 1.0
+                await closed.wait()
+                logger.warning("Task feed listener connection closed")
+            except Exception:
+                # Любая ошибка (в том числе InterfaceError оборванного
+                # соединения) ведет к переподключению, а не к остановке ленты
+                logger.exception("Task feed listener failed")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            self.reset()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+hub = FeedHub()
@@ -0,0 +1,348 @@
+"""
+This module provides a background job queue: jobs are rows of the job table
+claimed with SELECT ... FOR UPDATE SKIP LOCKED, so any number of runners
+(inside application workers or started with `python -m app.jobs`) share
+one queue without blocking each other. Failed jobs are retried with
+exponential backoff; periodic jobs are rescheduled after every run
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app import db, dayoff, metrics
+from app.config import settings
+from app.schemas.task import Job, TaskTombstone
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Handler:
+    func: Callable[[dict], Awaitable[None]]
+    # Наибольшее число одновременно выполняемых заданий вида в одном исполнителе
+    concurrency: int | None = None
+    # Период повторения в секундах для периодических заданий; функция,
+    # если период берется из настроек, которые не читаются при импорте
+    every: float | Callable[[], float] | None = None
+
+    def period(self) -> float | None:
+        return self.every() if callable(self.every) else self.every
+
+
+HANDLERS: dict[str, Handler] = {}
+
+
+def register(kind: str, concurrency: int | None = None,
+             every: float | Callable[[], float] | None = None):
+    """
+    Декоратор обработчика заданий вида kind: async def handler(payload: dict).
+    Задание может быть выполнено повторно (например, если исполнитель
+    остановился, не успев отметить его), поэтому обработчик должен быть
+    идемпотентным
+    """
+    def decorator(func):
+        HANDLERS[kind] = Handler(func, concurrency, every)
+        return func
+    return decorator
+
+
+def _now() -> datetime:
+    # Время считается в приложении, а не в БД: так сравнение одинаково
+    # работает в Postgres и SQLite
+    return datetime.now(timezone.utc)
+
+
+def _backoff(attempts: int) -> float:
+    return min(settings.jobs_retry_base_seconds * 2 ** (attempts - 1),
+               settings.jobs_retry_max_seconds)
+
+
+async def enqueue(session: AsyncSession, kind: str, payload: dict | None = None,
+                  priority: int = 0, delay: float = 0.0, key: str | None = None,
+                  max_attempts: int | None = None) -> None:
+    """
+    Поставить задание в очередь в транзакции сессии: исполнители увидят его
+    только после фиксации, вместе с изменениями, ради которых оно создано.
+    Чем больше priority, тем раньше задание будет выполнено. Задание
+    с key, равным ключу незавершенного задания, не добавляется
+    """
+    await enqueue_many(session, kind, [payload or {}], priority, delay, max_attempts, key)
+
+
+async def enqueue_many(session: AsyncSession, kind: str, payloads: list[dict],
+                       priority: int = 0, delay: float = 0.0,
+                       max_attempts: int | None = None, key: str | None = None) -> None:
+    """
+    Поставить в очередь задания вида kind с разными payload одним запросом
+    """
+    if not payloads:
+        return
+    insert = postgresql.insert if db.is_postgres() else sqlite.insert
+    run_at = _now() + timedelta(seconds=delay)
+    max_attempts = max_attempts or settings.jobs_max_attempts
+    await session.execute(
+        insert(Job).values([{"kind": kind, "payload": payload, "priority": priority, "key": key,
+                             "run_at": run_at, "max_attempts": max_attempts}
+                            for payload in payloads])
+        .on_conflict_do_nothing(index_elements=["key"])
+    )
+
+
+async def claim(session: AsyncSession, limit: int, kinds: list[str]) -> list:
+    """
+    Взять до limit готовых к выполнению заданий видов kinds: задания
+    получают аренду на jobs_lease_seconds, по ее истечении незавершенное
+    задание снова доступно исполнителям. Строки, заблокированные другими
+    исполнителями, пропускаются, а не ожидаются
+    """
+    now = _now()
+    candidates = (
+        select(Job.job_id)
+        .where(Job.failed_at.is_(None), Job.run_at <= now, Job.kind.in_(kinds))
+        .order_by(Job.priority.desc(), Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        update(Job)
+        .where(Job.job_id.in_(candidates.scalar_subquery()))
+        .values(run_at=now + timedelta(seconds=settings.jobs_lease_seconds),
+                attempts=Job.attempts + 1)
+        .returning(Job.job_id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+    )
+    jobs = result.all()
+    await session.commit()
+    return jobs
+
+
+class JobRunner:
+    """
+    Исполнитель очереди в event loop процесса: забирает задания пачками
+    по числу свободных мест (jobs_concurrency) и выполняет их параллельно,
+    соблюдая ограничения видов заданий. Очередь опрашивается раз
+    в jobs_poll_interval_seconds и сразу после завершения задания
+    """
+
+    def __init__(self, concurrency: int | None = None, poll_interval: float | None = None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._poller: asyncio.Task | None = None
+        self._running: dict[asyncio.Task, str] = {}
+        self._wake: asyncio.Event | None = None
+
+    def wake(self) -> None:
+        """
+        Проверить очередь, не дожидаясь очередного опроса
+        """
+        if self._wake is not None:
+            self._wake.set()
+
+    async def start(self) -> None:
+        if self._poller is None:
+            self._wake = asyncio.Event()
+            await self._schedule_periodic()
+            self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Остановить опрос и дождаться выполняемых заданий; задания,
+        не успевшие за timeout, прерываются и будут выполнены повторно
+        после истечения аренды
+        """
+        if self._poller is None:
+            return
+        self._poller.cancel()
+        try:
+            await self._poller
+        except asyncio.CancelledError:
+            pass
+        self._poller = None
+        if self._running:
+            _, pending = await asyncio.wait(list(self._running), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def run_forever(self) -> None:
+        await self.start()
+        await self._poller
+
+    async def _schedule_periodic(self) -> None:
+        # Ключ не дает исполнителям разных воркеров завести копии
+        async with db.async_session() as session:
+            for kind, handler in HANDLERS.items():
+                if handler.period() is not None:
+                    await enqueue(session, kind, key=f"periodic:{kind}")
+            await session.commit()
+
+    def _free_kinds(self) -> dict[str, float]:
+        running = {}
+        for kind in self._running.values():
+            running[kind] = running.get(kind, 0) + 1
+        return {kind: (handler.concurrency or float("inf")) - running.get(kind, 0)
+                for kind, handler in HANDLERS.items()
+                if running.get(kind, 0) < (handler.concurrency or float("inf"))}
+
+    async def _poll(self) -> None:
+        concurrency = self.concurrency or settings.jobs_concurrency
+        while True:
+            self._wake.clear()
+            free = concurrency - len(self._running)
+            kinds = self._free_kinds()
+            claimed = []
+            if free > 0 and kinds:
+                try:
+                    async with db.async_session() as session:
+                        claimed = await claim(session, free, list(kinds))
+                except Exception:
+                    logger.exception("Failed to claim background jobs")
+
+            excess = []
+            for job in claimed:
+                if kinds[job.kind] < 1:
+                    excess.append(job.job_id)
+                    continue
+                kinds[job.kind] -= 1
+                task = asyncio.create_task(self._execute(job))
+                self._running[task] = job.kind
+                task.add_done_callback(self._finished)
+            if excess:
+                await self._release(excess)
+
+            # Полная пачка: в очереди, возможно, есть еще задания
+            if free > 0 and len(claimed) == free and not excess:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(),
+                                       self.poll_interval or settings.jobs_poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._running.pop(task, None)
+        self.wake()
+
+    async def _execute(self, job) -> None:
+        started = time.perf_counter()
+        try:
+            await HANDLERS[job.kind].func(job.payload)
+        except Exception as e:
+            logger.exception("Background job %s (%s) failed", job.job_id, job.kind)
+            outcome = "retry" if job.attempts < job.max_attempts else "failed"
+            update_job = self._failed(job, e)
+        else:
+            outcome = "done"
+            update_job = self._done(job)
+        metrics.JOB_DURATION.labels(job.kind, outcome).observe(time.perf_counter() - started)
+        try:
+            await update_job
+        except Exception:
+            # Задание останется в очереди и будет выполнено снова после аренды
+            logger.exception("Failed to update background job %s", job.job_id)
+
+    async def _done(self, job) -> None:
+        every = HANDLERS[job.kind].period()
+        async with db.async_session() as session:
+            if every is None:
+                await session.execute(delete(Job).where(Job.job_id == job.job_id))
+            else:
+                await session.execute(
+                    update(Job).where(Job.job_id == job.job_id)
+                    .values(run_at=_now() + timedelta(seconds=every), attempts=0, last_error=None)
+                )
+            await session.commit()
+
+    async def _failed(self, job, error: Exception) -> None:
+        values = {"last_error": f"{type(error).__name__}: {error}"[:1000]}
+        every = HANDLERS[job.kind].period()
+        if job.attempts < job.max_attempts:
+            values["run_at"] = _now() + timedelta(seconds=_backoff(job.attempts))
+        elif every is not None:
+            # Периодическое задание не бросается: следующий запуск по расписанию
+            values.update(run_at=_now() + timedelta(seconds=every), attempts=0)
+        else:
+            # Ключ освобождается, чтобы задание можно было поставить заново
+            values.update(failed_at=_now(), key=None)
+        async with db.async_session() as session:
+            await session.execute(update(Job).where(Job.job_id == job.job_id).values(**values))
+            await session.commit()
+
+    async def _release(self, job_ids: list[int]) -> None:
+        # Лишние задания вида, для которого нет свободных мест, возвращаются в очередь
+        async with db.async_session() as session:
+            await session.execute(
+                update(Job).where(Job.job_id.in_(job_ids))
+                .values(run_at=_now(), attempts=Job.attempts - 1)
+            )
+            await session.commit()
+
+
+runner = JobRunner()
+
+
+# Задания приложения
+
+@register("tombstones.purge", concurrency=1, every=3600)
+async def purge_tombstones(payload: dict) -> None:
+    """
+    Удалить отметки об удалении старше срока хранения /tasks/changes.
+    Удаление идет пачками, чтобы не держать долгие блокировки
+    """
+    batch = payload.get("batch", 10000)
+    cutoff = _now() - timedelta(days=settings.sync_tombstone_retention_days)
+    async with db.async_session() as session:
+        while True:
+            expired = (
+                select(TaskTombstone.tombstone_id)
+                .where(TaskTombstone.deleted_at < cutoff)
+                .limit(batch)
+            )
+            result = await session.execute(
+                delete(TaskTombstone).where(TaskTombstone.tombstone_id.in_(expired.scalar_subquery()))
+            )
+            await session.commit()
+            if result.rowcount < batch:
+                break
+
+
+@register("dayoff.prefetch", concurrency=1, every=24 * 3600)
+async def prefetch_dayoff(payload: dict) -> None:
+    """
+    Загрузить производственный календарь текущего и следующего года заранее,
+    чтобы /tasks/tasks-for-day не ждал внешний сервис
+    """
+    today = date.today()
+    await dayoff.get_calendar().prefetch([today.year, today.year + 1])
+
+
+async def main() -> None:
+    import httpx
+
+    # Модули с обработчиками заданий регистрируют их при импорте
+    from app import reminders  # noqa: F401
+
+    calendar = dayoff.get_calendar()
+    async with httpx.AsyncClient(timeout=httpx.Timeout(settings.dayoff_timeout_seconds)) as client:
+        calendar.provider = dayoff.make_provider(client)
+        try:
+            await runner.run_forever()
+        finally:
+            await runner.stop()
+            await db.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    # При запуске через -m этот модуль - __main__, а обработчики
+    # регистрируются в app.jobs, поэтому исполнитель берется оттуда
+    from app import jobs
+    asyncio.run(jobs.main())
@@ -1,6 +1,52 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 
-from app.routes import task, auth
+from app import compression, db, dayoff, feed, jobs, metrics
+# Модуль регистрирует обработчики фоновых заданий при импорте
+from app import reminders  # noqa: F401
+from app.config import settings
+from app.auth import hashing
+from app.routes import task, task_feed, auth, project, service
+
+
+async def warm_up(app: FastAPI) -> None:
+    """
+    Подготовка воркера до приема запросов: соединения пула,
+    схема OpenAPI (и JSON-схемы моделей pydantic) и процессы хэширования
+    """
+    await db.warm_up_pool(min(settings.db_pool_warmup_connections, settings.db_pool_size))
+    app.openapi()
+    await hashing.warm_up()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # httpx нужен только внешнему календарю, поэтому импортируется здесь
+    import httpx
+
+    calendar = dayoff.get_calendar()
+    timeout = httpx.Timeout(settings.dayoff_timeout_seconds)
+    # Остановка выполняется и при ошибке запуска: иначе остаются процессы
+    # хэширования и открытые соединения. stop() незапущенных служб ничего не делает
+    try:
+        async with httpx.AsyncClient(timeout=timeout) as http_client:
+            calendar.provider = dayoff.make_provider(http_client)
+            try:
+                if settings.warmup_enabled:
+                    await warm_up(app)
+                await feed.hub.start()
+                if settings.jobs_worker_enabled:
+                    await jobs.runner.start()
+                yield
+            finally:
+                await jobs.runner.stop()
+                await feed.hub.stop()
+                calendar.provider = None
+    finally:
+        hashing.shutdown()
+        metrics.mark_process_dead()
+        await db.dispose()
 
 
 app = FastAPI(
@@ -14,8 +60,26 @@ app = FastAPI(
     license_info={
         "name": "MIT",
         "url": "https://opensource.org/licenses/MIT",
-    }
+    },
+    lifespan=lifespan
 )
 
+
+@app.exception_handler(hashing.HashingOverloaded)
+async def hashing_overloaded_handler(request: Request, exc: hashing.HashingOverloaded):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service is overloaded, try again later"},
+        headers={"Retry-After": "1"},
+    )
+
+
+app.add_middleware(compression.CompressionMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(auth.router)
 app.include_router(task.router)
+app.include_router(task_feed.router)
+app.include_router(project.router)
+app.include_router(service.router)
+app.include_router(service.metrics_router)
@@ -0,0 +1,185 @@
+"""
+This module provides request-level performance metrics in Prometheus format:
+latency per route, SQL statements, DB time and connection pool wait per request,
+and time spent waiting for external services
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import ProcessSettings, settings
+
+# Режим нескольких процессов должен быть включен до импорта prometheus_client
+_multiproc_dir = ProcessSettings().metrics_multiproc_dir
+if _multiproc_dir:
+    os.makedirs(_multiproc_dir, exist_ok=True)
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", _multiproc_dir)
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry,
+                               Counter, Histogram, generate_latest, multiprocess)
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds",
+                            "HTTP request latency",
+                            ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+REQUEST_STATEMENTS = Histogram("http_request_db_statements",
+                               "SQL statements executed per request",
+                               ["method", "route"], buckets=STATEMENT_BUCKETS)
+REQUEST_DB_TIME = Histogram("http_request_db_seconds",
+                            "Time spent executing SQL per request",
+                            ["method", "route"], buckets=LATENCY_BUCKETS)
+REQUEST_POOL_WAIT = Histogram("http_request_db_pool_wait_seconds",
+                              "Time spent waiting for a pooled DB connection per request",
+                              ["method", "route"], buckets=LATENCY_BUCKETS)
+REQUEST_EXTERNAL_TIME = Histogram("http_request_external_seconds",
+                                  "Time spent waiting for external services per request",
+                                  ["method", "route"], buckets=LATENCY_BUCKETS)
+EXTERNAL_CALL_TIME = Histogram("external_call_duration_seconds",
+                               "Time spent waiting for external services",
+                               ["service"], buckets=LATENCY_BUCKETS)
+JOB_DURATION = Histogram("job_duration_seconds",
+                         "Background job run time by outcome (done, retry, failed)",
+                         ["kind", "outcome"], buckets=LATENCY_BUCKETS)
+SUSPECTED_N_PLUS_ONE = Counter("http_request_statement_threshold_exceeded",
+                               "Requests executing more SQL statements than allowed",
+                               ["method", "route"])
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_time", "pool_wait", "external_time")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.external_time = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def record_external(service: str, seconds: float) -> None:
+    EXTERNAL_CALL_TIME.labels(service).observe(seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.external_time += seconds
+
+
+class _TimedPoolMixin:
+    """
+    Пул соединений, который учитывает время ожидания свободного соединения
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            stats = _request_stats.get()
+            if stats is not None:
+                stats.pool_wait += time.perf_counter() - started
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", time.perf_counter())
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def instrument_engine(db_engine) -> None:
+    """
+    Подписаться на события выполнения SQL движка (sync или async)
+    """
+    sync_engine = getattr(db_engine, "sync_engine", db_engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: измеряет запрос целиком, включая отправку
+    потокового тела, и сводит статистику БД по шаблону маршрута
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, route, str(status_code)).observe(elapsed)
+            REQUEST_STATEMENTS.labels(method, route).observe(stats.statements)
+            REQUEST_DB_TIME.labels(method, route).observe(stats.db_time)
+            REQUEST_POOL_WAIT.labels(method, route).observe(stats.pool_wait)
+            if stats.external_time:
+                REQUEST_EXTERNAL_TIME.labels(method, route).observe(stats.external_time)
+            if stats.statements > settings.metrics_statement_threshold:
+                SUSPECTED_N_PLUS_ONE.labels(method, route).inc()
+                logger.warning(
+                    "%s %s executed %d SQL statements (threshold %d), possible N+1",
+                    method, scope.get("path"), stats.statements,
+                    settings.metrics_statement_threshold
+                )
+
+
+def render_latest() -> bytes:
+    """
+    Метрики в текстовом формате Prometheus, в режиме нескольких
+    процессов - сумма по всем воркерам
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
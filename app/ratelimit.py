@@ -0,0 +1,272 @@
+"""
+This module provides rate limiting for authentication routes: token buckets
+per client IP and per account, and lockout with exponential backoff after
+repeated failed logins. State is shared between worker processes
+"""
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+
+# Ячейка таблицы: хэш ключа, значение и отметка времени
+_SLOT = struct.Struct("<Qdd")
+
+
+def _key_hash(key: str) -> int:
+    # 0 обозначает пустую ячейку
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+
+def _refill(tokens: float, updated_at: float, now: float,
+            capacity: float, rate: float) -> float:
+    return min(capacity, tokens + max(now - updated_at, 0.0) * rate)
+
+
+def _backoff(failures: float, threshold: int, base: float, maximum: float) -> float:
+    if failures < threshold:
+        return 0.0
+    return min(base * 2 ** (failures - threshold), maximum)
+
+
+class MemoryBackend:
+    """
+    Таблица в разделяемой памяти: файл в shared_dir отображается через mmap
+    в каждый воркер хоста. Таблица разбита на shards частей по slots ячеек,
+    часть блокируется fcntl-блокировкой своего диапазона байт, так что
+    воркеры конкурируют только за одну часть. Ключ ищется в пределах
+    PROBE ячеек от своей позиции; если все заняты, вытесняется ячейка
+    с самой старой отметкой времени
+    """
+
+    PROBE = 16
+
+    def __init__(self, shared_dir: str, shards: int, slots: int):
+        self.shards = shards
+        self.slots = slots
+        self._shard_size = slots * _SLOT.size
+        os.makedirs(shared_dir, exist_ok=True)
+        path = os.path.join(shared_dir, f"ratelimit-{shards}x{slots}.bin")
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = shards * self._shard_size
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def _update(self, key: str, update):
+        """
+        Выполнить update(value, stamp, found) -> (value, stamp, result) над
+        ячейкой ключа под блокировкой части таблицы; value=None удаляет запись.
+        Блокировка удерживается микросекунды, поэтому берется синхронно
+        """
+        key_hash = _key_hash(key)
+        shard = key_hash % self.shards
+        shard_offset = shard * self._shard_size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self._shard_size, shard_offset)
+        try:
+            start = (key_hash // self.shards) % self.slots
+            target, found, oldest = None, False, None
+            for step in range(min(self.PROBE, self.slots)):
+                offset = shard_offset + (start + step) % self.slots * _SLOT.size
+                slot_hash, value, stamp = _SLOT.unpack_from(self._map, offset)
+                if slot_hash == key_hash:
+                    target, found = offset, True
+                    break
+                if slot_hash == 0:
+                    if target is None:
+                        target = offset
+                elif oldest is None or stamp < oldest[1]:
+                    oldest = (offset, stamp)
+            if target is None:
+                target = oldest[0]
+            value, stamp = _SLOT.unpack_from(self._map, target)[1:] if found else (0.0, 0.0)
+            value, stamp, result = update(value, stamp, found)
+            if value is None:
+                # None - удалить запись; чужую вытесняемую ячейку не трогаем
+                if found:
+                    _SLOT.pack_into(self._map, target, 0, 0.0, 0.0)
+            else:
+                _SLOT.pack_into(self._map, target, key_hash, value, stamp)
+            return result
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self._shard_size, shard_offset)
+
+    async def take(self, key: str, capacity: float, rate: float) -> float:
+        now = time.time()
+
+        def update(tokens, updated_at, found):
+            tokens = _refill(tokens, updated_at, now, capacity, rate) if found else capacity
+            if tokens >= 1:
+                return tokens - 1, now, 0.0
+            return tokens, now, (1 - tokens) / rate
+
+        return self._update(key, update)
+
+    async def add_failure(self, key: str, threshold: int, base: float,
+                          maximum: float, window: float) -> float:
+        now = time.time()
+
+        def update(failures, last_failure, found):
+            if not found or now - last_failure > window:
+                failures = 0.0
+            failures += 1
+            return failures, now, _backoff(failures, threshold, base, maximum)
+
+        return self._update(key, update)
+
+    async def locked_for(self, key: str, threshold: int, base: float,
+                         maximum: float, window: float) -> float:
+        now = time.time()
+
+        def update(failures, last_failure, found):
+            if not found or now - last_failure > window:
+                return None, 0.0, 0.0
+            remaining = last_failure + _backoff(failures, threshold, base, maximum) - now
+            return failures, last_failure, max(remaining, 0.0)
+
+        return self._update(key, update)
+
+    async def reset(self, key: str) -> None:
+        self._update(key, lambda value, stamp, found: (None, 0.0, None))
+
+
+class RedisBackend:
+    """
+    Счетчики в Redis (или совместимом сервере): общие для всех воркеров
+    и хостов. Требует установленного пакета redis
+    """
+
+    # Корзина хранится в хэше (tokens, updated_at); время передается
+    # из приложения, чтобы не зависеть от команды TIME в скриптах
+    TAKE_SCRIPT = """
+    local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local tokens = capacity
+    if state[1] then
+        tokens = math.min(capacity, tonumber(state[1]) + math.max(now - tonumber(state[2]), 0) * rate)
+    end
+    local retry_after = 0
+    if tokens >= 1 then tokens = tokens - 1 else retry_after = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(retry_after)
+    """
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("rate_limit_backend=redis requires the 'redis' package") from e
+        self._redis = redis_asyncio.from_url(url)
+        self._take = self._redis.register_script(self.TAKE_SCRIPT)
+
+    async def take(self, key: str, capacity: float, rate: float) -> float:
+        return float(await self._take(keys=[f"ratelimit:{key}"],
+                                      args=[capacity, rate, time.time()]))
+
+    async def add_failure(self, key: str, threshold: int, base: float,
+                          maximum: float, window: float) -> float:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            failures, _ = await pipe.incr(f"failures:{key}").expire(
+                f"failures:{key}", math.ceil(window)).execute()
+        lock = _backoff(failures, threshold, base, maximum)
+        if lock:
+            await self._redis.set(f"lockout:{key}", 1, px=max(int(lock * 1000), 1))
+        return lock
+
+    async def locked_for(self, key: str, threshold: int, base: float,
+                         maximum: float, window: float) -> float:
+        remaining = await self._redis.pttl(f"lockout:{key}")
+        return remaining / 1000 if remaining > 0 else 0.0
+
+    async def reset(self, key: str) -> None:
+        await self._redis.delete(f"failures:{key}", f"lockout:{key}")
+
+
+def _too_many_requests(retry_after: float, detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+    )
+
+
+class RateLimiter:
+    """
+    Ограничения маршрутов аутентификации. Проверки выполняются до обращения
+    к БД и bcrypt, поэтому число проверок пароля в секунду ограничено
+    независимо от числа входящих запросов
+    """
+
+    def __init__(self, backend_factory):
+        self._backend_factory = backend_factory
+        self._backend = None
+        self._backend_ready = False
+
+    @property
+    def backend(self):
+        if not self._backend_ready:
+            self._backend = self._backend_factory()
+            self._backend_ready = True
+        return self._backend
+
+    def _lockout_args(self) -> tuple:
+        return (settings.login_lockout_threshold, settings.login_lockout_base_seconds,
+                settings.login_lockout_max_seconds, settings.login_failure_window_seconds)
+
+    async def _take(self, key: str, burst: int, per_minute: float, detail: str) -> None:
+        retry_after = await self.backend.take(key, burst, per_minute / 60)
+        if retry_after:
+            raise _too_many_requests(retry_after, detail)
+
+    async def check_login(self, client_ip: str, account: str) -> None:
+        """
+        Бросить 429, если исчерпана корзина IP или учетной записи
+        либо учетная запись заблокирована после неудачных входов
+        """
+        if self.backend is None:
+            return
+        account = account.strip().lower()
+        await self._take(f"login-ip:{client_ip}", settings.login_ip_burst,
+                         settings.login_ip_per_minute, "Too many login attempts")
+        locked_for = await self.backend.locked_for(f"login:{account}", *self._lockout_args())
+        if locked_for:
+            raise _too_many_requests(locked_for, "Too many failed login attempts")
+        await self._take(f"login-account:{account}", settings.login_account_burst,
+                         settings.login_account_per_minute, "Too many login attempts")
+
+    async def login_failed(self, account: str) -> None:
+        if self.backend is not None:
+            await self.backend.add_failure(f"login:{account.strip().lower()}",
+                                           *self._lockout_args())
+
+    async def login_succeeded(self, account: str) -> None:
+        if self.backend is not None:
+            await self.backend.reset(f"login:{account.strip().lower()}")
+
+    async def check_signup(self, client_ip: str) -> None:
+        if self.backend is None:
+            return
+        await self._take(f"signup-ip:{client_ip}", settings.signup_ip_burst,
+                         settings.signup_ip_per_minute, "Too many signup attempts")
+
+
+def _make_backend():
+    if settings.rate_limit_backend == "redis":
+        return RedisBackend(settings.rate_limit_redis_url)
+    if settings.rate_limit_backend == "memory":
+        shared_dir = settings.rate_limit_shared_dir or os.path.join(tempfile.gettempdir(),
+                                                                    "taskman-ratelimit")
+        return MemoryBackend(shared_dir, settings.rate_limit_shards, settings.rate_limit_slots)
+    return None
+
+
+rate_limiter = RateLimiter(_make_backend)
@@ -0,0 +1,203 @@
+"""
+This module provides due-date reminders: a scanner walks the task due-date
+index from a stored watermark, so every run reads only the tasks that
+crossed a reminder threshold or were created or changed since the previous
+one, and queues one reminder job per assignee. Scanners in several workers
+are serialized with Postgres advisory locks
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select, func
+
+from app import db, feed, jobs
+from app.config import settings
+from app.schemas import task as schema_task
+from app.serialization import read_columns, rows_to_dicts
+
+
+# Виды напоминаний: срок наступает в ближайшие reminder_due_soon_days дней
+# или уже прошел
+KINDS = ("due_soon", "overdue")
+# Пространство ключей advisory-блокировок сканера; второй ключ - номер вида
+LOCK_CLASS = 0x7265
+# Наибольшее значение task_id (integer): позиция "после всех заданий дня"
+MAX_TASK_ID = 2 ** 31 - 1
+# Отметки об отправке нужны, пока срок задания внутри окна сканера
+KEEP_SENT_DAYS = 7
+# Запас времени при поиске измененных заданий (см. scan_step)
+CHANGE_LAG = timedelta(seconds=60)
+
+TASK_READ_COLUMNS = read_columns(schema_task.Task, schema_task.TaskRead)
+
+
+def _window(kind: str, today: date) -> tuple[date | None, date]:
+    """
+    Отрезок сроков [lower, upper], при попадании в который отправляется
+    напоминание вида kind; lower=None - без нижней границы
+    """
+    if kind == "due_soon":
+        return today, today + timedelta(days=settings.reminder_due_soon_days)
+    return None, today - timedelta(days=1)
+
+
+async def _lock(session: AsyncSession, kind: str) -> bool:
+    """
+    Взять блокировку вида до конца транзакции; False - ее держит
+    сканер другого воркера. Без Postgres сканер работает в одном процессе
+    """
+    if not db.is_postgres():
+        return True
+    return (await session.execute(
+        select(func.pg_try_advisory_xact_lock(LOCK_CLASS, KINDS.index(kind)))
+    )).scalar_one()
+
+
+async def _watermark(session: AsyncSession, kind: str,
+                     today: date) -> schema_task.ReminderWatermark:
+    watermark = await session.get(schema_task.ReminderWatermark, kind)
+    if watermark is None:
+        # Первый запуск: напоминания только о заданиях, которые пересекают
+        # порог сейчас, без рассылки по всей истории
+        lower, upper = _window(kind, today)
+        start = (lower or upper) - timedelta(days=1)
+        watermark = schema_task.ReminderWatermark(kind=kind, due_date=start, task_id=MAX_TASK_ID,
+                                                  changed_at=datetime.now(timezone.utc),
+                                                  changed_task_id=0)
+        session.add(watermark)
+    return watermark
+
+
+async def scan_step(session: AsyncSession, kind: str, today: date) -> bool | None:
+    """
+    Один шаг сканера в своей транзакции: до reminder_batch_size заданий,
+    срок которых пересек порог, и заданий, созданных или измененных
+    со сроком уже внутри окна.
+    Возвращает True, если сканировать есть что еще, и None, если сканер
+    этого вида уже работает в другом воркере
+    """
+    if not await _lock(session, kind):
+        return None
+    task = schema_task.Task
+    batch = settings.reminder_batch_size
+    watermark = await _watermark(session, kind, today)
+    lower, upper = _window(kind, today)
+
+    # Граница измененных заданий берется до обхода: задания, измененные
+    # во время шага, достанутся следующему шагу
+    now = datetime.now(timezone.utc)
+
+    # Сроки, пересекшие порог: диапазон индекса (due_date, task_id) после позиции
+    start = (watermark.due_date, watermark.task_id)
+    if lower is not None:
+        start = max(start, (lower - timedelta(days=1), MAX_TASK_ID))
+    crossed = (await session.execute(
+        select(task.task_id, task.assignee, task.due_date)
+        .where(tuple_(task.due_date, task.task_id) > tuple_(*start), task.due_date <= upper)
+        .order_by(task.due_date, task.task_id)
+        .limit(batch)
+    )).all()
+    if crossed:
+        watermark.due_date, watermark.task_id = crossed[-1].due_date, crossed[-1].task_id
+
+    # Новые задания и задания, срок которых перенесли позади позиции
+    # обхода (или с одной прошедшей даты на другую): диапазон индекса
+    # (updated_at, task_id) после позиции
+    # Для overdue нижняя граница - срок хранения отметок об отправке:
+    # о более старых заданиях напоминание уже было, а отметка удалена
+    conditions = [tuple_(task.updated_at, task.task_id)
+                  > tuple_(watermark.changed_at, watermark.changed_task_id),
+                  task.updated_at <= now,
+                  task.due_date <= min(upper, watermark.due_date),
+                  task.due_date >= (lower or today - timedelta(days=KEEP_SENT_DAYS))]
+    changed = (await session.execute(
+        select(task.task_id, task.assignee, task.due_date, task.updated_at)
+        .where(*conditions)
+        .order_by(task.updated_at, task.task_id)
+        .limit(batch)
+    )).all()
+    if len(changed) == batch:
+        watermark.changed_at, watermark.changed_task_id = changed[-1].updated_at, changed[-1].task_id
+    else:
+        # Следующий проход начнется с запасом: updated_at - время начала
+        # транзакции, и изменение с более ранним временем может быть
+        # зафиксировано позже этого шага. Повторно найденные задания
+        # отсеиваются отметками об отправке
+        watermark.changed_at, watermark.changed_task_id = now - CHANGE_LAG, 0
+
+    await _remind(session, kind, crossed + changed)
+    await session.commit()
+    return len(crossed) == batch or len(changed) == batch
+
+
+async def _remind(session: AsyncSession, kind: str, rows: list) -> None:
+    """
+    Отметить напоминания отправленными и поставить по заданию рассылки
+    на исполнителя. Уже отправленные напоминания пропускаются
+    """
+    rows = list({row.task_id: row for row in rows}.values())
+    if not rows:
+        return
+    insert = postgresql.insert if db.is_postgres() else sqlite.insert
+    inserted = (await session.execute(
+        insert(schema_task.TaskReminder)
+        .values([{"due_date": row.due_date, "task_id": row.task_id, "kind": kind}
+                 for row in rows])
+        .on_conflict_do_nothing()
+        .returning(schema_task.TaskReminder.task_id)
+    )).scalars().all()
+    assignees = {row.task_id: row.assignee for row in rows}
+    by_assignee: dict[int, list[int]] = {}
+    for task_id in sorted(inserted):
+        by_assignee.setdefault(assignees[task_id], []).append(task_id)
+    await jobs.enqueue_many(session, "reminders.send", [
+        {"kind": kind, "assignee": assignee, "task_ids": task_ids}
+        for assignee, task_ids in by_assignee.items()
+    ])
+
+
+async def scan(today: date | None = None) -> None:
+    today = today or date.today()
+    for kind in KINDS:
+        while True:
+            async with db.async_session() as session:
+                if not await scan_step(session, kind, today):
+                    break
+    async with db.async_session() as session:
+        await session.execute(
+            delete(schema_task.TaskReminder)
+            .where(schema_task.TaskReminder.due_date < today - timedelta(days=KEEP_SENT_DAYS))
+        )
+        await session.commit()
+
+
+@jobs.register("reminders.scan", concurrency=1,
+               every=lambda: settings.reminder_scan_interval_seconds)
+async def scan_job(payload: dict) -> None:
+    await scan()
+
+
+@jobs.register("reminders.send")
+async def send_job(payload: dict) -> None:
+    """
+    Напоминание исполнителю одним событием ленты заданий; задания,
+    которые уже удалены или переданы другому, не включаются
+    """
+    async with db.async_session() as session:
+        rows = (await session.execute(
+            select(*TASK_READ_COLUMNS)
+            .where(schema_task.Task.task_id.in_(payload["task_ids"]),
+                   schema_task.Task.assignee == payload["assignee"])
+            .order_by(schema_task.Task.due_date, schema_task.Task.task_id)
+        )).all()
+        if not rows:
+            return
+        await feed.publish(session, [{
+            "type": "reminder",
+            "reminder": payload["kind"],
+            "assignee": payload["assignee"],
+            "tasks": rows_to_dicts(schema_task.TaskRead, rows),
+        }])
+        await session.commit()
@@ -1,40 +1,60 @@
-from fastapi import APIRouter, status, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, status, Depends, HTTPException, Request
+from sqlmodel import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from psycopg2.errors import UniqueViolation
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from datetime import timedelta
 from typing import Annotated, List
 
-from ..auth import auth_handler
+from ..auth import auth_handler, hashing
 from app.config import settings
-from app.db import get_session, get_async_session
+from app.cache import response_cache
+from app.db import get_async_session
+from app.ratelimit import rate_limiter
+from app.serialization import read_columns, rows_to_json
+from app.workload import workload_index
 from ..schemas import task as schema_task
 
+# SQLSTATE нарушения уникальности (psycopg2.errorcodes.UNIQUE_VIOLATION):
+# psycopg2 не импортируется, так как маршруты работают через asyncpg
+UNIQUE_VIOLATION = "23505"
+
 router = APIRouter(prefix="/auth", tags=["Аутентификация пользователей"])
 
+USER_READ_COLUMNS = read_columns(schema_task.User, schema_task.UserRead)
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
 @router.post("/signup", status_code=status.HTTP_201_CREATED,
              response_model=int,
              summary="Зарегистрироваться")
-def create_user(user: schema_task.User,
-                session: Session = Depends(get_session)):
+async def create_user(user: schema_task.User,
+                      request: Request,
+                      session: AsyncSession = Depends(get_async_session)):
     """
-    Регистрация пользователя
+    Регистрация пользователя. Число регистраций с одного IP ограничено
     """
+    await rate_limiter.check_signup(_client_ip(request))
     new_user = schema_task.User(
         name=user.name,
         email=user.email,
-        password=auth_handler.get_password_hash(user.password),
+        password=await auth_handler.get_password_hash(user.password),
         grade=user.grade
     )
     try:
         session.add(new_user)
-        session.commit()
-        session.refresh(new_user)
+        await session.commit()
+        await session.refresh(new_user)
+        workload_index.set_user(schema_task.UserRead.model_validate(new_user.model_dump()))
+        await response_cache.invalidate("users")
         return new_user.user_id
     except IntegrityError as e:
-        assert isinstance(e.orig, UniqueViolation)
+        if (getattr(e.orig, "pgcode", None) != UNIQUE_VIOLATION
+                and getattr(e.orig, "sqlite_errorname", None) != "SQLITE_CONSTRAINT_UNIQUE"):
+            raise
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=f"User with email {user.email} already exists"
@@ -44,23 +64,35 @@ def create_user(user: schema_task.User,
 @router.post("/login",
              status_code=status.HTTP_200_OK,
              summary="Войти в систему")
-def user_login(login_attempt_data: OAuth2PasswordRequestForm = Depends(),
-               db_session: Session = Depends(get_session)):
+async def user_login(request: Request,
+                     login_attempt_data: OAuth2PasswordRequestForm = Depends(),
+                     db_session: AsyncSession = Depends(get_async_session)):
     """
-    Авторизация пользователя
+    Авторизация пользователя. Число попыток ограничено по IP и по учетной
+    записи, после серии неудачных попыток учетная запись блокируется
+    на растущее время (429 с Retry-After). Неизвестный email и неверный
+    пароль неотличимы ни по ответу, ни по времени
     """
+    await rate_limiter.check_login(_client_ip(request), login_attempt_data.username)
+
     statement = (select(schema_task.User)
                  .where(schema_task.User.email == login_attempt_data.username))
-    existing_user = db_session.exec(statement).first()
+    existing_user = (await db_session.execute(statement)).scalars().first()
 
-    if not existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"User {login_attempt_data.username} not found"
-        )
-
-    if auth_handler.verify_password(login_attempt_data.password,
-                                    existing_user.password):
+    if existing_user:
+        verified, new_hash = await auth_handler.verify_password(login_attempt_data.password,
+                                                                existing_user.password)
+    else:
+        await hashing.verify_unknown_user(login_attempt_data.password)
+        verified, new_hash = False, None
+
+    if verified:
+        await rate_limiter.login_succeeded(login_attempt_data.username)
+        if new_hash is not None:
+            # Хэш создан с устаревшей стоимостью bcrypt - пересохраняем
+            existing_user.password = new_hash
+            db_session.add(existing_user)
+            await db_session.commit()
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
         access_token = auth_handler.create_access_token(
             data={"sub": login_attempt_data.username},
@@ -71,9 +103,11 @@ def user_login(login_attempt_data: OAuth2PasswordRequestForm = Depends(),
             "token_type": "bearer"
         }
     else:
+        await rate_limiter.login_failed(login_attempt_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Wrong password for user {login_attempt_data.username}"
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
         )
 
 
@@ -90,15 +124,27 @@ def show_current_user(
 
 
 
+@router.get("/user-cache-stats",
+            summary="Статистика кэша пользователей")
+def show_user_cache_stats(
+    current_user: Annotated[schema_task.User, Depends(auth_handler.get_current_user)]
+):
+    """
+    Размер кэша проверенных токенов и число попаданий/промахов
+    в обработавшем запрос воркере; только для вошедших пользователей
+    """
+    return auth_handler.get_user_cache().stats()
+
+
 @router.patch("/update-user", status_code=status.HTTP_202_ACCEPTED,
             response_model=schema_task.UserRead,
             summary="Обновить данные пользователя")
-def update_user(
+async def update_user(
         user_id: int,
         user_data: schema_task.UserUpdate,
-        session: Session = Depends(get_session)
+        session: AsyncSession = Depends(get_async_session)
 ):
-    user = session.exec(select(schema_task.User).where(schema_task.User.user_id == user_id)).first()
+    user = await session.get(schema_task.User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -110,8 +156,11 @@ def update_user(
         setattr(user, field, value)
 
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
+    auth_handler.get_user_cache().invalidate_user(user.user_id)
+    workload_index.set_user(schema_task.UserRead.model_validate(user.model_dump()))
+    await response_cache.invalidate("users")
 
     return user
 
@@ -119,18 +168,16 @@ def update_user(
 @router.get("/users", status_code=status.HTTP_200_OK,
             response_model=List[schema_task.UserRead],
             summary="Показать список пользователей")
-async def read_users_async(session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(schema_task.User))
-    users = result.scalars().all()
-    if users is None or len(users) == 0:
-        raise HTTPException(
-            status_code=status.HTTP_204_NO_CONTENT,
-            detail=f"The user list is empty"
-        )
-    users_result = [schema_task.UserRead(
-        name=user.name,
-        email=user.email,
-        user_id=user.user_id,
-        grade=user.grade
-    ) for user in users]
-    return users_result
+async def read_users_async(request: Request,
+                           session: AsyncSession = Depends(get_async_session)):
+    async def build():
+        result = await session.execute(select(*USER_READ_COLUMNS))
+        users = result.all()
+        if users is None or len(users) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_204_NO_CONTENT,
+                detail=f"The user list is empty"
+            )
+        return rows_to_json(schema_task.UserRead, users), {}
+
+    return await response_cache.get_or_build(request, ["users"], build)
@@ -0,0 +1,196 @@
+from datetime import date
+from typing import List
+
+from fastapi import APIRouter, status, Depends, HTTPException, Query, Request
+from sqlalchemy import literal
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select, func
+
+from app.cache import response_cache
+from app.db import get_async_session, is_postgres
+from app.serialization import read_columns, rows_to_json
+from ..schemas import task as schema_task
+
+
+router = APIRouter(prefix="/projects", tags=["Проекты"])
+
+PROJECT_READ_COLUMNS = read_columns(schema_task.Project, schema_task.ProjectRead)
+
+
+async def _get_project(session: AsyncSession, project_id: int) -> schema_task.Project:
+    project = await session.get(schema_task.Project, project_id)
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Project with id {project_id} not found"
+        )
+    return project
+
+
+@router.post("/add-project", status_code=status.HTTP_201_CREATED,
+             response_model=schema_task.ProjectRead,
+             summary="Добавить проект")
+async def create_project(project: schema_task.ProjectCreate,
+                         session: AsyncSession = Depends(get_async_session)):
+    new_project = schema_task.Project(**project.model_dump())
+    session.add(new_project)
+    await session.commit()
+    await response_cache.invalidate("projects")
+    return new_project
+
+
+@router.get("/projects-list", status_code=status.HTTP_200_OK,
+            response_model=List[schema_task.ProjectRead],
+            summary="Показать список проектов")
+async def read_projects(request: Request,
+                        session: AsyncSession = Depends(get_async_session),
+                        limit: int = Query(100, ge=1, le=1000,
+                                           description="Размер страницы"),
+                        after: int | None = Query(None,
+                                                  description="project_id последнего проекта предыдущей страницы")):
+    """
+    Список проектов с постраничной выдачей по project_id.
+    Курсор следующей страницы передается в заголовке X-Next-Cursor
+    """
+    async def build():
+        statement = select(*PROJECT_READ_COLUMNS).order_by(schema_task.Project.project_id)
+        if after is not None:
+            statement = statement.where(schema_task.Project.project_id > after)
+        projects = (await session.execute(statement.limit(limit))).all()
+        if not projects:
+            raise HTTPException(
+                status_code=status.HTTP_204_NO_CONTENT,
+                detail="The project list is empty"
+            )
+        headers = {}
+        if len(projects) == limit:
+            headers["X-Next-Cursor"] = str(projects[-1].project_id)
+        return rows_to_json(schema_task.ProjectRead, projects), headers
+
+    return await response_cache.get_or_build(request, ["projects"], build)
+
+
+@router.get("/{project_id}", status_code=status.HTTP_200_OK,
+            response_model=schema_task.ProjectRead,
+            summary="Показать проект")
+async def read_project(project_id: int,
+                       session: AsyncSession = Depends(get_async_session)):
+    return await _get_project(session, project_id)
+
+
+@router.patch("/update-project", status_code=status.HTTP_202_ACCEPTED,
+              response_model=schema_task.ProjectRead,
+              summary="Обновить проект")
+async def update_project(project_id: int,
+                         project_data: schema_task.ProjectUpdate,
+                         session: AsyncSession = Depends(get_async_session)):
+    project = await _get_project(session, project_id)
+    for field, value in project_data.model_dump(exclude_unset=True).items():
+        setattr(project, field, value)
+    await session.commit()
+    await response_cache.invalidate("projects")
+    return project
+
+
+def _project_has_tasks(project_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Project with id {project_id} has tasks"
+    )
+
+
+@router.delete("/delete-project/{project_id}",
+               summary="Удалить проект")
+async def delete_project(project_id: int,
+                         session: AsyncSession = Depends(get_async_session)):
+    """
+    Удалить проект без заданий
+    """
+    project = await _get_project(session, project_id)
+    has_tasks = (await session.execute(
+        select(select(schema_task.Task.task_id)
+               .where(schema_task.Task.project == project_id)
+               .exists())
+    )).scalar()
+    if has_tasks:
+        raise _project_has_tasks(project_id)
+    await session.delete(project)
+    try:
+        await session.commit()
+    except IntegrityError:
+        # Задание добавили в проект между проверкой и удалением
+        await session.rollback()
+        raise _project_has_tasks(project_id)
+    await response_cache.invalidate("projects")
+    return {"Message": f"Project with id {project_id} deleted"}
+
+
+def _stats_source():
+    """
+    Сводная таблица, которую поддерживают триггеры Postgres;
+    на других БД триггеров нет, и задания считаются напрямую
+    """
+    if is_postgres():
+        return schema_task.ProjectTaskStats.__table__
+    return (
+        select(schema_task.Task.project.label("project_id"),
+               schema_task.Task.assignee,
+               func.coalesce(schema_task.Task.grade, 0).label("grade"),
+               schema_task.Task.due_date,
+               literal(1).label("task_count"))
+        .subquery()
+    )
+
+
+@router.get("/{project_id}/stats", status_code=status.HTTP_200_OK,
+            response_model=schema_task.ProjectStats,
+            summary="Статистика проекта")
+async def read_project_stats(project_id: int,
+                             request: Request,
+                             session: AsyncSession = Depends(get_async_session)):
+    """
+    Число заданий проекта по грейдам и исполнителям, в том числе просроченных.
+    Считается одним GROUP BY по сводной таблице проекта
+    """
+    today = date.today()
+
+    async def build():
+        await _get_project(session, project_id)
+        source = _stats_source()
+        task_count = func.sum(source.c.task_count)
+        overdue = func.coalesce(task_count.filter(source.c.due_date < today), 0)
+        rows = (await session.execute(
+            select(source.c.assignee, source.c.grade,
+                   task_count.label("tasks"), overdue.label("overdue"))
+            .where(source.c.project_id == project_id)
+            .group_by(source.c.assignee, source.c.grade)
+        )).all()
+
+        by_grade, by_assignee = {}, {}
+        for row in rows:
+            for key, totals in ((row.grade or None, by_grade), (row.assignee, by_assignee)):
+                counts = totals.setdefault(key, [0, 0])
+                counts[0] += row.tasks
+                counts[1] += row.overdue
+
+        stats = schema_task.ProjectStats(
+            project_id=project_id,
+            tasks=sum(row.tasks for row in rows),
+            overdue=sum(row.overdue for row in rows),
+            by_grade=[
+                schema_task.GradeStats(grade=grade, tasks=tasks, overdue=overdue)
+                for grade, (tasks, overdue)
+                in sorted(by_grade.items(), key=lambda item: (item[0] is None, item[0] or 0))
+            ],
+            by_assignee=[
+                schema_task.AssigneeStats(assignee=assignee, tasks=tasks, overdue=overdue)
+                for assignee, (tasks, overdue)
+                in sorted(by_assignee.items(), key=lambda item: (-item[1][0], item[0]))
+            ],
+        )
+        return stats.model_dump_json().encode(), {}
+
+    # Число просроченных заданий зависит от текущей даты
+    return await response_cache.get_or_build(request, ["tasks", "projects"], build,
+                                              vary=today.isoformat())
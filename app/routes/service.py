@@ -0,0 +1,42 @@
+import os
+from fastapi import APIRouter, status, Response
+
+from app import metrics
+from app.cache import response_cache
+from app.db import created_engines, pool_stats
+
+
+router = APIRouter(prefix="/service", tags=["Служебные"])
+metrics_router = APIRouter(tags=["Служебные"])
+
+
+@router.get("/pool-stats", status_code=status.HTTP_200_OK,
+            summary="Состояние пула соединений с БД")
+async def read_pool_stats():
+    """
+    Занятые, свободные и сверхлимитные соединения пулов
+    в обработавшем запрос воркере. Движки, которые воркер еще
+    не создал, не показываются и не создаются
+    """
+    return {
+        "pid": os.getpid(),
+        **{name: pool_stats(db_engine) for name, db_engine in created_engines().items()},
+    }
+
+
+@router.get("/cache-stats", status_code=status.HTTP_200_OK,
+            summary="Статистика кэша ответов")
+async def read_cache_stats():
+    """
+    Попадания и промахи кэша ответов в обработавшем запрос воркере
+    """
+    return {"pid": os.getpid(), **response_cache.stats()}
+
+
+@metrics_router.get("/metrics", summary="Метрики Prometheus")
+async def read_metrics():
+    """
+    Задержки по маршрутам, число SQL-выражений, время в БД и ожидание
+    соединений из пула, время внешних вызовов
+    """
+    return Response(content=metrics.render_latest(), media_type=metrics.CONTENT_TYPE)
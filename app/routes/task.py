@@ -1,28 +1,94 @@
-import httpx
 import asyncio
-from fastapi import APIRouter, status, Depends, HTTPException, Response
-from sqlmodel import Session, select
-from typing import Annotated, List
+import base64
+import calendar
+import json
+import orjson
+from fastapi import APIRouter, status, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError, TypeAdapter
+from sqlmodel import select, func
+from sqlalchemy import any_, bindparam, insert, update, delete, literal_column, true, tuple_
+from sqlalchemy.dialects import postgresql
+from typing import Annotated, List, Literal
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import date
+from datetime import date, datetime, timedelta
 
-from app.db import get_session, get_async_session
+from app.db import get_async_session, async_session, is_postgres
 from ..schemas import task as schema_task
 from app.api_docs import request_examples
+from app import dayoff, feed, search
+from app.cache import response_cache
+from app.config import settings
+from app.serialization import read_columns, rows_to_dicts, rows_to_json, row_to_json_line
+from app.workload import plan_assignments, workload_index
 from ..auth import auth_handler
 
 
 router = APIRouter(prefix="/tasks", tags=["Задания"])
 
+# Размер пачки строк, которую курсор на стороне сервера отдает за один раз
+STREAM_BATCH_SIZE = 1000
+# Максимальная длина периода в /tasks/tasks-for-day
+MAX_DAYS_RANGE = 366
+
+# Колонки задания в порядке полей TaskRead для быстрой сериализации
+TASK_READ_COLUMNS = read_columns(schema_task.Task, schema_task.TaskRead)
+candidate_list_adapter = TypeAdapter(List[schema_task.CandidateRead])
+
+
+def _task_filters(assignee: int | None = None,
+                  project: int | None = None,
+                  grade_min: int | None = None,
+                  grade_max: int | None = None,
+                  due_from: date | None = None,
+                  due_to: date | None = None,
+                  after: int | None = None) -> list:
+    """
+    Условия отбора заданий для списка, выполняемые на стороне БД
+    """
+    conditions = []
+    if assignee is not None:
+        conditions.append(schema_task.Task.assignee == assignee)
+    if project is not None:
+        conditions.append(schema_task.Task.project == project)
+    if grade_min is not None:
+        conditions.append(schema_task.Task.grade >= grade_min)
+    if grade_max is not None:
+        conditions.append(schema_task.Task.grade <= grade_max)
+    if due_from is not None:
+        conditions.append(schema_task.Task.due_date >= due_from)
+    if due_to is not None:
+        conditions.append(schema_task.Task.due_date <= due_to)
+    if after is not None:
+        conditions.append(schema_task.Task.task_id > after)
+    return conditions
+
+
+def _tasks_list_statement(**filters):
+    return (
+        select(*TASK_READ_COLUMNS)
+        .where(*_task_filters(**filters))
+        .order_by(schema_task.Task.task_id)
+    )
+
+
+def _tasks_for_days_statement(start: date, end: date):
+    return (
+        select(schema_task.Task)
+        .where(schema_task.Task.due_date.between(start, end))
+        .order_by(schema_task.Task.due_date, schema_task.Task.task_id)
+    )
+
 
 @router.post("/add-task", status_code=status.HTTP_201_CREATED,
              response_model=schema_task.TaskRead,
              summary="Добавить задание")
-def create_task(task: Annotated[
-                        schema_task.TaskCreate,
-                        request_examples.example_create_task],
-                session: Session = Depends(get_session)
-                ):
+async def create_task(task: Annotated[
+                              schema_task.TaskCreate,
+                              request_examples.example_create_task],
+                      response: Response,
+                      session: AsyncSession = Depends(get_async_session)
+                      ):
     """
     Создание задачи
     """
@@ -30,7 +96,7 @@ def create_task(task: Annotated[
         select(schema_task.User)
         .where(schema_task.User.user_id == task.assignee)
     )
-    user = session.exec(statement).first()
+    user = (await session.execute(statement)).scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,165 +117,564 @@ def create_task(task: Annotated[
         project=task.project
     )
     session.add(new_task)
-    session.commit()
-    session.refresh(new_task)
+    await session.flush()
+    await feed.publish(session, [feed.task_event("created", new_task)])
+    await session.commit()
+    workload_index.adjust(new_task.assignee, 1)
+    await response_cache.invalidate("tasks")
+    response.headers["ETag"] = _task_etag(new_task.version)
     return new_task
 
 
+def _if_match_versions(if_match: str | None) -> set[int] | None:
+    """
+    Версии задания из заголовка If-Match; None - заголовка нет или он равен *.
+    Слабые и нечисловые метки не совпадают ни с одной версией
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = set()
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag.startswith('"') and tag.endswith('"') and tag[1:-1].isdigit():
+            versions.add(int(tag[1:-1]))
+    return versions
+
+
+def _task_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _version_mismatch(task_id: int, version: int | None = None) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail=f"Task with id {task_id} was modified by another request",
+        headers={"ETag": _task_etag(version)} if version is not None else None
+    )
+
+
 @router.patch("/update-task", status_code=status.HTTP_202_ACCEPTED,
             response_model=schema_task.TaskRead,
             summary="Обновить задание")
-def update_task(
+async def update_task(
         task_id: int,
         user_data: schema_task.TaskUpdate,
-        session: Session = Depends(get_session)
+        response: Response,
+        session: AsyncSession = Depends(get_async_session),
+        if_match: str | None = Header(None, description="Ожидаемая версия задания, например \"3\"")
 ):
     """
-    Обновление задачи
+    Обновление задачи. Задание, исполнитель и проект проверяются
+    одним запросом, изменение выполняется одним UPDATE ... RETURNING.
+    Если передан If-Match, а задание уже изменено другим запросом,
+    возвращается 412
     """
-    task = session.exec(select(schema_task.Task).where(schema_task.Task.task_id == task_id)).first()
-    if not task:
+    versions = _if_match_versions(if_match)
+    user_exists = (
+        select(schema_task.User.user_id)
+        .where(schema_task.User.user_id == user_data.assignee)
+        .exists()
+        if user_data.assignee else true()
+    )
+    project_exists = (
+        select(schema_task.Project.project_id)
+        .where(schema_task.Project.project_id == user_data.project)
+        .exists()
+        if user_data.project else true()
+    )
+    current = (await session.execute(
+        select(schema_task.Task.assignee,
+               schema_task.Task.project,
+               schema_task.Task.version,
+               user_exists.label("user_exists"),
+               project_exists.label("project_exists"))
+        .where(schema_task.Task.task_id == task_id)
+    )).first()
+    if not current:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Task with id {task_id} not found"
         )
-    if user_data.assignee:
-        statement = select(schema_task.Task).where(schema_task.Task.assignee == user_data.assignee)
-        user = session.exec(statement).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"User with id {user_data.assignee} not found"
-            )
-    if user_data.project:
-        statement = select(schema_task.Task).where(schema_task.Task.project == user_data.project)
-        project = session.exec(statement).first()
+    if not current.user_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {user_data.assignee} not found"
+        )
+    if not current.project_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Project with id {user_data.project} not found"
+        )
 
-        if not project:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Project with id {user_data.project} not found"
-            )
+    if versions is not None and current.version not in versions:
+        raise _version_mismatch(task_id, current.version)
 
-    update_data = user_data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(task, field, value)
+    statement = (
+        update(schema_task.Task)
+        .where(schema_task.Task.task_id == task_id)
+        .values(**user_data.model_dump(exclude_unset=True),
+                version=schema_task.Task.version + 1)
+        .returning(schema_task.Task)
+        .execution_options(synchronize_session=False)
+    )
+    if versions is not None:
+        # Задание могло измениться между проверкой и UPDATE
+        statement = statement.where(schema_task.Task.version.in_(versions))
+    task = (await session.scalars(statement)).first()
+    if not task:
+        if versions is not None:
+            raise _version_mismatch(task_id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Task with id {task_id} not found"
+        )
+    if task.assignee != current.assignee:
+        session.add(schema_task.TaskTombstone(task_id=task_id, assignee=current.assignee))
+    await feed.publish(session, [feed.task_event(
+        "updated", task, previous={"assignee": current.assignee, "project": current.project}
+    )])
+    await session.commit()
 
-    session.add(task)
-    session.commit()
-    session.refresh(task)
+    if task.assignee != current.assignee:
+        workload_index.adjust(current.assignee, -1)
+        workload_index.adjust(task.assignee, 1)
+    await response_cache.invalidate("tasks")
 
+    response.headers["ETag"] = _task_etag(task.version)
     return task
 
 
 @router.get("/tasks-list", status_code=status.HTTP_200_OK,
             response_model=List[schema_task.TaskRead],
             summary="Показать список заданий")
-async def read_tasks_async(session: AsyncSession = Depends(get_async_session)):
+async def read_tasks_async(
+        request: Request,
+        session: AsyncSession = Depends(get_async_session),
+        limit: int = Query(100, ge=1, le=1000,
+                           description="Размер страницы"),
+        after: int | None = Query(None,
+                                  description="task_id последнего задания предыдущей страницы"),
+        assignee: int | None = None,
+        project: int | None = None,
+        grade_min: int | None = Query(None, ge=1, le=10),
+        grade_max: int | None = Query(None, ge=1, le=10),
+        due_from: date | None = None,
+        due_to: date | None = None,
+        stream: bool = Query(False,
+                             description="Отдать все подходящие задания потоком NDJSON")
+):
     """
-    Список всех заданий
+    Список заданий с фильтрами и постраничной выдачей по task_id.
+    Курсор следующей страницы передается в заголовке X-Next-Cursor.
+    В режиме stream задания отдаются потоком NDJSON без ограничения
+    на размер выборки
     """
-    result = await session.execute(select(schema_task.Task))
-    tasks = result.scalars().all()
-    if tasks is None or len(tasks) == 0:
-        raise HTTPException(
-            status_code=status.HTTP_204_NO_CONTENT,
-            detail=f"The task list is empty"
+    statement = _tasks_list_statement(assignee=assignee, project=project,
+                                      grade_min=grade_min, grade_max=grade_max,
+                                      due_from=due_from, due_to=due_to, after=after)
+
+    if stream:
+        return StreamingResponse(_stream_tasks(statement),
+                                 media_type="application/x-ndjson")
+
+    async def build():
+        result = await session.execute(statement.limit(limit))
+        tasks = result.all()
+        if tasks is None or len(tasks) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_204_NO_CONTENT,
+                detail=f"The task list is empty"
+            )
+        headers = {}
+        if len(tasks) == limit:
+            headers["X-Next-Cursor"] = str(tasks[-1].task_id)
+        return rows_to_json(schema_task.TaskRead, tasks), headers
+
+    return await response_cache.get_or_build(request, ["tasks"], build)
+
+
+async def _stream_tasks(statement):
+    """
+    Построчная выдача заданий через курсор на стороне сервера.
+    Сессия открывается здесь же, так как сессия из зависимости
+    закрывается до начала отправки тела ответа
+    """
+    async with async_session() as session:
+        rows = await session.stream(
+            statement.execution_options(yield_per=STREAM_BATCH_SIZE)
         )
-    return tasks
+        async for row in rows:
+            yield row_to_json_line(schema_task.TaskRead, row)
 
 
 @router.get("/my-tasks",
             status_code=status.HTTP_200_OK,
             response_model=List[schema_task.TaskRead],
             summary = 'Список моих заданий')
-def show_my_tasks(
+async def show_my_tasks(
+    request: Request,
     current_user: Annotated[schema_task.User, Depends(auth_handler.get_current_user)],
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Список всех заданий для вошедшего пользователя
     """
-    statement = select(schema_task.Task).where(schema_task.Task.assignee == current_user.user_id)
-    result = session.exec(statement)
-    tasks = result.all()
-    if tasks is None or len(tasks) == 0:
+    async def build():
+        result = await session.execute(_tasks_list_statement(assignee=current_user.user_id))
+        tasks = result.all()
+        if tasks is None or len(tasks) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_204_NO_CONTENT,
+                detail=f"The task list for user {current_user.name} is empty"
+            )
+        return rows_to_json(schema_task.TaskRead, tasks), {}
+
+    return await response_cache.get_or_build(request, ["tasks"], build,
+                                              vary=str(current_user.user_id))
+
+
+def _encode_sync_token(moment: datetime) -> str:
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode()
+
+
+def _decode_sync_token(token: str) -> datetime:
+    try:
+        moment = datetime.fromisoformat(base64.urlsafe_b64decode(token.encode()).decode())
+    except ValueError:
+        moment = None
+    if moment is None or moment.tzinfo is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+    return moment
+
+
+@router.get("/changes",
+            status_code=status.HTTP_200_OK,
+            response_model=schema_task.TaskChanges,
+            summary="Изменения моих заданий")
+async def read_my_task_changes(
+    current_user: Annotated[schema_task.User, Depends(auth_handler.get_current_user)],
+    session: AsyncSession = Depends(get_async_session),
+    since: str | None = Query(None, description="token из предыдущего ответа")
+):
+    """
+    Изменения заданий вошедшего пользователя с момента, закодированного в since:
+    измененные и новые задания и id заданий, которые удалены или переданы
+    другому исполнителю. Без since (или если since старше срока хранения
+    отметок об удалении) возвращается полный список с full=true.
+    Каждый ответ содержит token для следующего запроса
+    """
+    # Время начала транзакции чтения: все, что изменено позже, попадет
+    # в следующий ответ
+    now = (await session.execute(select(func.now()))).scalar_one()
+    start = None
+    if since is not None:
+        start = _decode_sync_token(since)
+        if start < now - timedelta(days=settings.sync_tombstone_retention_days):
+            start = None
+
+    statement = _tasks_list_statement(assignee=current_user.user_id)
+    deleted = []
+    if start is not None:
+        # Транзакция записи, начатая раньше предыдущего чтения, но зафиксированная
+        # после него, получает updated_at меньше token, поэтому окно берется с запасом
+        start -= timedelta(seconds=settings.sync_overlap_seconds)
+        statement = statement.where(schema_task.Task.updated_at > start)
+        deleted = (await session.execute(
+            select(schema_task.TaskTombstone.task_id)
+            .where(schema_task.TaskTombstone.assignee == current_user.user_id,
+                   schema_task.TaskTombstone.deleted_at > start)
+            .distinct()
+        )).scalars().all()
+
+    changed = rows_to_dicts(schema_task.TaskRead, (await session.execute(statement)).all())
+    # Задание могло уйти от исполнителя и вернуться к нему
+    returned = {task["task_id"] for task in changed}
+    body = {"token": _encode_sync_token(now),
+            "full": start is None,
+            "changed": changed,
+            "deleted": sorted(task_id for task_id in deleted if task_id not in returned)}
+    return Response(content=orjson.dumps(body), media_type="application/json")
+
+
+# Колонка и конфигурация текстового поиска Postgres (миграция 906da302ef52)
+SEARCH_VECTOR = literal_column("task.search_vector")
+SEARCH_CONFIG = literal_column(f"'{search.SEARCH_CONFIG}'::regconfig")
+
+
+def _encode_search_cursor(rank: float, task_id: int) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([rank, task_id])).decode()
+
+
+def _decode_search_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, task_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(task_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _search_statement(query: str, after: tuple[float, int] | None = None, **filters):
+    """
+    Поиск по колонке search_vector (GIN-индекс ix_task_search_vector)
+    с рангом ts_rank и подсветкой ts_headline; постраничная выдача по ключу
+    (ранг, task_id). Postgres вычисляет ts_headline после сортировки
+    и LIMIT, то есть только для строк страницы
+    """
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+    rank = func.ts_rank(SEARCH_VECTOR, tsquery)
+    # Подсветка строится по экранированному описанию: разметка из текста
+    # задания не попадает в ответ как HTML. Сущности (&lt;) разборщик
+    # ts_headline не считает словами и оставляет как есть
+    description = schema_task.Task.task_description
+    for char, entity in search.HTML_ESCAPES:
+        description = func.replace(description, char, entity)
+    headline = func.ts_headline(SEARCH_CONFIG, description, tsquery, "HighlightAll=true")
+    statement = (
+        select(*TASK_READ_COLUMNS, rank.label("rank"), headline.label("highlight"))
+        .where(SEARCH_VECTOR.op("@@")(tsquery), *_task_filters(**filters))
+        .order_by(rank.desc(), schema_task.Task.task_id.desc())
+    )
+    if after is not None:
+        statement = statement.where(tuple_(rank, schema_task.Task.task_id) < tuple_(*after))
+    return statement
+
+
+async def _search_fallback(session: AsyncSession, query: str, limit: int,
+                           after: tuple[float, int] | None = None, **filters) -> list:
+    """
+    Поиск по обратному индексу процесса для БД без tsvector. Задания
+    страницы читаются из БД пачками с теми же фильтрами, что и в Postgres
+    """
+    await search.search_index.refresh(session)
+    ranked = search.search_index.search(query, after)
+    terms = search.parse_query(query)[0]
+    rows = []
+    for start in range(0, len(ranked), limit):
+        chunk = dict((task_id, rank) for rank, task_id in ranked[start:start + limit])
+        result = await session.execute(
+            select(*TASK_READ_COLUMNS)
+            .where(schema_task.Task.task_id.in_(chunk), *_task_filters(**filters))
+        )
+        found = {row.task_id: row for row in result.all()}
+        for task_id, rank in chunk.items():
+            if task_id in found:
+                row = found[task_id]
+                rows.append((*row, rank, search.highlight(row.task_description, terms)))
+        if len(rows) >= limit:
+            break
+    return rows[:limit]
+
+
+@router.get("/search", status_code=status.HTTP_200_OK,
+            response_model=List[schema_task.TaskSearchHit],
+            summary="Поиск заданий по описанию")
+async def search_tasks(
+        request: Request,
+        q: str = Query(min_length=1, max_length=300,
+                       description="Слова из описания; \"фраза\", OR и -слово как в веб-поиске"),
+        session: AsyncSession = Depends(get_async_session),
+        limit: int = Query(20, ge=1, le=100, description="Размер страницы"),
+        after: str | None = Query(None, description="X-Next-Cursor предыдущей страницы"),
+        assignee: int | None = None,
+        project: int | None = None,
+):
+    """
+    Полнотекстовый поиск по описаниям заданий, от более релевантных к менее.
+    Найденные слова выделены в highlight. Курсор следующей страницы
+    передается в заголовке X-Next-Cursor. В Postgres поиск идет
+    по GIN-индексу, на других БД - по обратному индексу в памяти процесса
+    """
+    cursor = _decode_search_cursor(after) if after is not None else None
+
+    async def build():
+        if is_postgres():
+            statement = _search_statement(q, cursor, assignee=assignee, project=project)
+            rows = (await session.execute(statement.limit(limit))).all()
+        else:
+            rows = await _search_fallback(session, q, limit, cursor,
+                                          assignee=assignee, project=project)
+        headers = {}
+        if len(rows) == limit:
+            last = dict(zip(schema_task.TaskSearchHit.model_fields, rows[-1]))
+            headers["X-Next-Cursor"] = _encode_search_cursor(last["rank"], last["task_id"])
+        return rows_to_json(schema_task.TaskSearchHit, rows), headers
+
+    return await response_cache.get_or_build(request, ["tasks"], build)
+
+
+def _days_range(due_date: date | None,
+                date_from: date | None,
+                date_to: date | None,
+                view: str) -> tuple[date, date]:
+    """
+    Границы периода: явный отрезок from/to либо день, неделя или месяц,
+    содержащие due_date
+    """
+    if date_from is not None or date_to is not None:
+        start = date_from or date_to
+        end = date_to or date_from
+    else:
+        day = due_date or date.today()
+        if view == "week":
+            start = day - timedelta(days=day.weekday())
+            # Последняя неделя календаря обрезается по date.max
+            end = start + timedelta(days=min(6, (date.max - start).days))
+        elif view == "month":
+            start = day.replace(day=1)
+            end = start.replace(day=calendar.monthrange(start.year, start.month)[1])
+        else:
+            start = end = day
+
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="'from' must not be later than 'to'"
+        )
+    if (end - start).days + 1 > MAX_DAYS_RANGE:
         raise HTTPException(
-            status_code=status.HTTP_204_NO_CONTENT,
-            detail=f"The task list for user {current_user.name} is empty"
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"The period must not exceed {MAX_DAYS_RANGE} days"
         )
-    return tasks
+    return start, end
 
 
 @router.get("/tasks-for-day",
             status_code=status.HTTP_200_OK,
             summary="Показать ближайшие задания")
-async def read_tasks_for_day(response: Response,
-                             session: AsyncSession = Depends(get_async_session),
-                             due_date: date = date.today()):
+async def read_tasks_for_day(session: AsyncSession = Depends(get_async_session),
+                             due_date: date | None = None,
+                             date_from: date | None = Query(None, alias="from"),
+                             date_to: date | None = Query(None, alias="to"),
+                             view: Literal["day", "week", "month"] = "day"):
     """
-    Показать задания с заданным дедлайном
+    Показать задания с заданным дедлайном (по умолчанию - сегодня),
+    либо задания за период from/to или за неделю/месяц, содержащие due_date.
+    Задания сгруппированы по дням; is_day_off равен null,
+    если календарь выходных не ответил вовремя
     """
-    async def query_db(due_date_param):
-        statement = (
-            select(schema_task.Task)
-            .where(schema_task.Task.due_date == due_date_param)
-        )
-        result = await session.execute(statement)
-        return result.scalars().all()
+    start, end = _days_range(due_date, date_from, date_to, view)
 
+    async def query_db():
+        result = await session.execute(_tasks_for_days_statement(start, end))
+        return result.scalars().all()
 
-    http_client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=None))
-    res = await asyncio.gather(
-        query_db(due_date),
-        http_client.get(f"https://isdayoff.ru/{due_date}"),
+    tasks, days_off = await asyncio.gather(
+        query_db(),
+        dayoff.get_calendar().days_off(start, end),
     )
 
+    tasks_by_day = {day: [] for day in days_off}
+    for task in tasks:
+        tasks_by_day[task.due_date].append(task)
+
     output = [{
-        "due_date": due_date,
-        "is_day_off": res[1].text == "1",
-        "tasks": res[0]
-    }]
+        "due_date": day,
+        "is_day_off": is_day_off,
+        "count": len(tasks_by_day[day]),
+        "tasks": tasks_by_day[day]
+    } for day, is_day_off in days_off.items()]
 
     return output
 
 
+def _workload_statement(task_grade: int | None = None):
+    """
+    Сотрудники с числом назначенных им заданий, от менее загруженных к более.
+    Задания каждого сотрудника считаются по индексу (assignee, task_id),
+    поэтому при отборе по грейду задания остальных сотрудников не читаются
+    """
+    load = (
+        select(func.count())
+        .where(schema_task.Task.assignee == schema_task.User.user_id)
+        .scalar_subquery()
+    )
+    statement = (
+        select(schema_task.User.user_id,
+               schema_task.User.name,
+               schema_task.User.email,
+               schema_task.User.grade,
+               load.label("load"))
+        .order_by(load, schema_task.User.user_id)
+    )
+    if task_grade is not None:
+        statement = statement.where(schema_task.User.grade >= task_grade)
+    return statement
+
+
+async def _find_candidates(session: AsyncSession, task_grade: int, k: int) -> List[schema_task.CandidateRead]:
+    if settings.workload_index_enabled:
+        if not workload_index.ready:
+            rows = (await session.execute(_workload_statement())).all()
+            workload_index.load(
+                (schema_task.UserRead.model_validate(row._mapping), row.load)
+                for row in rows
+            )
+        return [
+            schema_task.CandidateRead(**user.model_dump(), load=load)
+            for user, load in workload_index.top_k(task_grade, k)
+        ]
+
+    rows = (await session.execute(_workload_statement(task_grade).limit(k))).all()
+    return [schema_task.CandidateRead.model_validate(row._mapping) for row in rows]
+
+
 @router.get("/get-candidate/{task_grade}",
                response_model=schema_task.UserRead,
                summary="Подобрать исполнителя")
-def get_candidate(task_grade: int, session: Session = Depends(get_session)):
+async def get_candidate(task_grade: int,
+                        request: Request,
+                        session: AsyncSession = Depends(get_async_session)):
     """
     Подобрать подходящего кандидата для задания с учетом его грейда и занятости
     """
-    statement = select(schema_task.User).where(schema_task.User.grade >= task_grade)
-    users = session.exec(statement).all()
-    tasks = session.exec(select(schema_task.Task)).all()
-    if not users:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"No users"
-        )
+    async def build():
+        candidates = await _find_candidates(session, task_grade, 1)
+        if not candidates:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No users"
+            )
+        user = schema_task.UserRead.model_validate(candidates[0].model_dump())
+        return user.model_dump_json().encode(), {}
 
-    task_counts = {user.user_id: 0 for user in users}
-    for task in tasks:
-        if task.assignee in task_counts:
-            task_counts[task.assignee] += 1
+    return await response_cache.get_or_build(request, ["tasks", "users"], build)
 
-    user_with_min_tasks = min(
-        users,
-        key=lambda user: task_counts.get(user.user_id, 0)
-    )
 
-    return user_with_min_tasks
+@router.get("/get-candidates/{task_grade}",
+            response_model=List[schema_task.CandidateRead],
+            summary="Подобрать несколько исполнителей")
+async def get_candidates(task_grade: int,
+                         request: Request,
+                         k: int = Query(5, ge=1, le=100),
+                         session: AsyncSession = Depends(get_async_session)):
+    """
+    Подобрать k наименее загруженных кандидатов для задания с учетом их грейда
+    """
+    async def build():
+        candidates = await _find_candidates(session, task_grade, k)
+        if not candidates:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No users"
+            )
+        return candidate_list_adapter.dump_json(candidates), {}
+
+    return await response_cache.get_or_build(request, ["tasks", "users"], build)
 
 
 @router.delete("/delete-task/{task_id}",
                summary="Удалить задание")
-def delete_task(task_id: int, session: Session = Depends(get_session)):
+async def delete_task(task_id: int, session: AsyncSession = Depends(get_async_session)):
     """
     Удалить задание с заданным id
     """
-    task = session.get(schema_task.Task, task_id)
+    task = await session.get(schema_task.Task, task_id)
 
     if not task:
         raise HTTPException(
@@ -217,7 +682,376 @@ def delete_task(task_id: int, session: Session = Depends(get_session)):
             detail=f"Task with id {task_id} not found"
         )
 
-    session.delete(task)
-    session.commit()
+    assignee = task.assignee
+    await session.delete(task)
+    session.add(schema_task.TaskTombstone(task_id=task_id, assignee=assignee))
+    await feed.publish(session, [feed.deleted_event(task_id, assignee, task.project)])
+    await session.commit()
+    workload_index.adjust(assignee, -1)
+    await response_cache.invalidate("tasks")
 
     return {"Message": f"Task with id {task_id} deleted"}
+
+
+async def _read_bulk_items(request: Request) -> list:
+    """
+    Элементы пакетного запроса: JSON-массив или NDJSON (по объекту в строке).
+    Строки NDJSON, которые не удалось разобрать, возвращаются как ValueError,
+    чтобы попасть в список ошибок, а не прервать весь пакет
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(e)
+    else:
+        try:
+            items = json.loads(body)
+        except ValueError:
+            items = None
+        if not isinstance(items, list):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Expected a JSON array or an NDJSON body"
+            )
+
+    if len(items) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch must not contain more than {settings.bulk_max_items} items"
+        )
+    return items
+
+
+def _validate_bulk_items(items: list, model) -> tuple[list, list[schema_task.BulkItemError]]:
+    """
+    Проверить каждый элемент отдельно: возвращает пары (позиция, модель)
+    для корректных элементов и ошибки для остальных
+    """
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        if isinstance(item, Exception):
+            errors.append(schema_task.BulkItemError(index=index, detail=f"Invalid JSON: {item}"))
+            continue
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as e:
+            errors.append(schema_task.BulkItemError(
+                index=index,
+                detail=e.errors(include_url=False, include_context=False, include_input=False)
+            ))
+    return valid, errors
+
+
+def _in_ids(column, ids):
+    """
+    Условие column IN ids с одним параметром запроса: в пакете может быть
+    больше id, чем допускает драйвер (32767 параметров в asyncpg)
+    """
+    ids = list(ids)
+    if is_postgres():
+        return column == any_(bindparam(None, ids, type_=postgresql.ARRAY(column.type)))
+    return column.in_(
+        select(literal_column("value")).select_from(func.json_each(json.dumps(ids)))
+    )
+
+
+async def _existing_ids(session: AsyncSession, column, ids: set) -> set:
+    if not ids:
+        return set()
+    result = await session.execute(select(column).where(_in_ids(column, ids)))
+    return set(result.scalars().all())
+
+
+_BULK_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+            "application/x-ndjson": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+
+@router.post("/add-tasks", status_code=status.HTTP_201_CREATED,
+             response_model=schema_task.BulkTaskCreateResult,
+             summary="Добавить задания пакетом",
+             openapi_extra=_BULK_BODY)
+async def create_tasks(request: Request,
+                       session: AsyncSession = Depends(get_async_session)):
+    """
+    Создание множества заданий одним запросом (JSON-массив или NDJSON).
+    Исполнители проверяются одним запросом, задания вставляются
+    многострочными INSERT ... RETURNING. Ошибочные элементы
+    перечисляются в errors и не мешают созданию остальных
+    """
+    items, errors = _validate_bulk_items(await _read_bulk_items(request),
+                                         schema_task.TaskCreate)
+
+    assignee_ids = {task.assignee for _, task in items}
+    result = await session.execute(
+        select(schema_task.User.user_id, schema_task.User.grade)
+        .where(_in_ids(schema_task.User.user_id, assignee_ids))
+    )
+    grades = {user_id: grade for user_id, grade in result.all()}
+    projects = await _existing_ids(session, schema_task.Project.project_id,
+                                   {task.project for _, task in items if task.project})
+
+    rows = []
+    for index, task in items:
+        if task.assignee not in grades:
+            errors.append(schema_task.BulkItemError(index=index, detail="Assignee not found"))
+        elif task.grade and grades[task.assignee] and grades[task.assignee] < task.grade:
+            errors.append(schema_task.BulkItemError(
+                index=index,
+                detail="Assignee must have higher or equal grade, than the task grade"
+            ))
+        elif task.project and task.project not in projects:
+            errors.append(schema_task.BulkItemError(
+                index=index, detail=f"Project with id {task.project} not found"
+            ))
+        else:
+            rows.append(task.model_dump())
+
+    created = []
+    if rows:
+        result = await session.scalars(
+            insert(schema_task.Task).returning(schema_task.Task, sort_by_parameter_order=True),
+            rows
+        )
+        created = result.all()
+        await feed.publish(session, [feed.task_event("created", task) for task in created])
+        await session.commit()
+        for task in created:
+            workload_index.adjust(task.assignee, 1)
+        await response_cache.invalidate("tasks")
+
+    errors.sort(key=lambda error: error.index)
+    return schema_task.BulkTaskCreateResult(created=created, errors=errors)
+
+
+@router.patch("/update-tasks", status_code=status.HTTP_202_ACCEPTED,
+              response_model=schema_task.BulkTaskUpdateResult,
+              summary="Обновить задания пакетом",
+              openapi_extra=_BULK_BODY)
+async def update_tasks(request: Request,
+                       session: AsyncSession = Depends(get_async_session)):
+    """
+    Обновление множества заданий одним запросом. Каждый элемент содержит
+    task_id и изменяемые поля
+    """
+    items, errors = _validate_bulk_items(await _read_bulk_items(request),
+                                         schema_task.TaskBulkUpdate)
+
+    result = await session.execute(
+        select(schema_task.Task.task_id, schema_task.Task.assignee, schema_task.Task.project)
+        .where(_in_ids(schema_task.Task.task_id, {item.task_id for _, item in items}))
+    )
+    previous = {task_id: {"assignee": assignee, "project": project}
+                for task_id, assignee, project in result.all()}
+    users = await _existing_ids(session, schema_task.User.user_id,
+                                {item.assignee for _, item in items if item.assignee})
+    projects = await _existing_ids(session, schema_task.Project.project_id,
+                                   {item.project for _, item in items if item.project})
+
+    rows = {}
+    for index, item in items:
+        if item.task_id not in previous:
+            errors.append(schema_task.BulkItemError(
+                index=index, detail=f"Task with id {item.task_id} not found"
+            ))
+        elif item.assignee and item.assignee not in users:
+            errors.append(schema_task.BulkItemError(
+                index=index, detail=f"User with id {item.assignee} not found"
+            ))
+        elif item.project and item.project not in projects:
+            errors.append(schema_task.BulkItemError(
+                index=index, detail=f"Project with id {item.project} not found"
+            ))
+        else:
+            rows.setdefault(item.task_id, {"task_id": item.task_id}).update(
+                item.model_dump(exclude_unset=True)
+            )
+
+    updated = []
+    if rows:
+        # UPDATE по первичному ключу: строки с одинаковым набором полей
+        # отправляются одним executemany
+        await session.execute(
+            update(schema_task.Task).values(version=schema_task.Task.version + 1),
+            list(rows.values())
+        )
+        result = await session.execute(
+            select(schema_task.Task)
+            .where(_in_ids(schema_task.Task.task_id, rows))
+            .order_by(schema_task.Task.task_id)
+            .execution_options(populate_existing=True)
+        )
+        updated = result.scalars().all()
+        reassigned = [{"task_id": task.task_id, "assignee": previous[task.task_id]["assignee"]}
+                      for task in updated
+                      if task.assignee != previous[task.task_id]["assignee"]]
+        if reassigned:
+            await session.execute(insert(schema_task.TaskTombstone), reassigned)
+        await feed.publish(session, [feed.task_event("updated", task, previous[task.task_id])
+                                     for task in updated])
+        await session.commit()
+        for task in updated:
+            previous_assignee = previous[task.task_id]["assignee"]
+            if task.assignee != previous_assignee:
+                workload_index.adjust(previous_assignee, -1)
+                workload_index.adjust(task.assignee, 1)
+        await response_cache.invalidate("tasks")
+
+    errors.sort(key=lambda error: error.index)
+    return schema_task.BulkTaskUpdateResult(updated=updated, errors=errors)
+
+
+@router.post("/delete-tasks", status_code=status.HTTP_200_OK,
+             response_model=schema_task.BulkTaskDeleteResult,
+             summary="Удалить задания пакетом")
+async def delete_tasks(task_ids: List[int],
+                       session: AsyncSession = Depends(get_async_session)):
+    """
+    Удалить задания с заданными id одним запросом
+    """
+    if len(task_ids) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch must not contain more than {settings.bulk_max_items} items"
+        )
+
+    result = await session.execute(
+        delete(schema_task.Task)
+        .where(_in_ids(schema_task.Task.task_id, task_ids))
+        .returning(schema_task.Task.task_id, schema_task.Task.assignee, schema_task.Task.project)
+    )
+    rows = result.all()
+    deleted = {task_id: assignee for task_id, assignee, _ in rows}
+    if deleted:
+        await session.execute(insert(schema_task.TaskTombstone),
+                              [{"task_id": task_id, "assignee": assignee}
+                               for task_id, assignee in deleted.items()])
+    await feed.publish(session, [feed.deleted_event(*row) for row in rows])
+    await session.commit()
+    for assignee in deleted.values():
+        workload_index.adjust(assignee, -1)
+    if deleted:
+        await response_cache.invalidate("tasks")
+
+    errors = [
+        schema_task.BulkItemError(index=index, detail=f"Task with id {task_id} not found")
+        for index, task_id in enumerate(task_ids) if task_id not in deleted
+    ]
+    return schema_task.BulkTaskDeleteResult(deleted=list(deleted), errors=errors)
+
+
+def _auto_assign_loads_statement(urgent_until: date | None = None):
+    """
+    Грейд и нагрузка сотрудников с грейдом: число заданий и, если
+    указан urgent_until, число заданий со сроком не позже этой даты
+    """
+    load = (
+        select(func.count())
+        .where(schema_task.Task.assignee == schema_task.User.user_id)
+        .scalar_subquery()
+    )
+    urgent = (
+        select(func.count())
+        .where(schema_task.Task.assignee == schema_task.User.user_id,
+               schema_task.Task.due_date <= urgent_until)
+        .scalar_subquery()
+        if urgent_until is not None else literal_column("0")
+    )
+    return (
+        select(schema_task.User.user_id, schema_task.User.grade,
+               load.label("load"), urgent.label("urgent"))
+        .where(schema_task.User.grade.is_not(None))
+    )
+
+
+@router.post("/auto-assign", status_code=status.HTTP_201_CREATED,
+             response_model=schema_task.AutoAssignResult,
+             summary="Распределить задания между сотрудниками",
+             openapi_extra=_BULK_BODY)
+async def auto_assign_tasks(request: Request,
+                            response: Response,
+                            dry_run: bool = False,
+                            weight_by_due_date: bool = False,
+                            session: AsyncSession = Depends(get_async_session)):
+    """
+    Создание множества заданий без исполнителя (JSON-массив или NDJSON)
+    с равномерным распределением по сотрудникам. Нагрузка сотрудников
+    читается одним запросом, затем задания назначаются за один проход:
+    от высокого грейда к низкому и от ближнего срока к дальнему, каждое -
+    наименее загруженному сотруднику с грейдом не ниже грейда задания.
+    С weight_by_due_date задания со сроком в ближайшие
+    auto_assign_due_horizon_days дней весят больше, и срочные задания
+    не скапливаются у одного сотрудника. Все задания вставляются
+    в одной транзакции; с dry_run возвращается только план назначения
+    """
+    items, errors = _validate_bulk_items(await _read_bulk_items(request),
+                                         schema_task.TaskAutoAssign)
+    projects = await _existing_ids(session, schema_task.Project.project_id,
+                                   {task.project for _, task in items if task.project})
+    accepted = []
+    for index, task in items:
+        if task.project and task.project not in projects:
+            errors.append(schema_task.BulkItemError(
+                index=index, detail=f"Project with id {task.project} not found"
+            ))
+        else:
+            accepted.append((index, task))
+
+    urgent_until = None
+    if weight_by_due_date:
+        urgent_until = date.today() + timedelta(days=settings.auto_assign_due_horizon_days)
+
+    def weight(due_date: date | None) -> float:
+        if urgent_until is None or due_date is None or due_date > urgent_until:
+            return 1
+        return 1 + settings.auto_assign_due_weight
+
+    result = await session.execute(_auto_assign_loads_statement(urgent_until))
+    users = [(user_id, grade, load + settings.auto_assign_due_weight * urgent)
+             for user_id, grade, load, urgent in result.all()]
+    order = sorted(accepted, key=lambda item: (-(item[1].grade or 0),
+                                               item[1].due_date or date.max, item[0]))
+    plan = plan_assignments(users, ((index, task.grade, weight(task.due_date))
+                                     for index, task in order))
+
+    # Задания вставляются в порядке позиций запроса, как в /tasks/add-tasks
+    assignments, rows = [], []
+    for index, task in accepted:
+        if index not in plan:
+            errors.append(schema_task.BulkItemError(
+                index=index, detail=f"No user with grade {task.grade} or higher"
+            ))
+            continue
+        assignee, load = plan[index]
+        assignments.append(schema_task.AutoAssignment(index=index, assignee=assignee, load=load))
+        rows.append({**task.model_dump(), "assignee": assignee})
+
+    created = []
+    if dry_run:
+        response.status_code = status.HTTP_200_OK
+    elif rows:
+        result = await session.scalars(
+            insert(schema_task.Task).returning(schema_task.Task, sort_by_parameter_order=True),
+            rows
+        )
+        created = result.all()
+        await feed.publish(session, [feed.task_event("created", task) for task in created])
+        await session.commit()
+        for task in created:
+            workload_index.adjust(task.assignee, 1)
+        await response_cache.invalidate("tasks")
+
+    errors.sort(key=lambda error: error.index)
+    return schema_task.AutoAssignResult(assignments=assignments, created=created, errors=errors)
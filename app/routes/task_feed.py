@@ -0,0 +1,99 @@
+import asyncio
+
+import orjson
+from fastapi import APIRouter, Header, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from app import feed
+from app.config import settings
+
+
+router = APIRouter(prefix="/tasks", tags=["Задания"])
+
+
+async def _next_event(subscription: feed.Subscription) -> dict | None:
+    """
+    Следующее событие подписки или None, если за период heartbeat
+    событий не было
+    """
+    try:
+        return await asyncio.wait_for(subscription.queue.get(),
+                                      timeout=settings.feed_heartbeat_seconds)
+    except asyncio.TimeoutError:
+        return None
+
+
+@router.get("/feed",
+            summary="Лента изменений заданий (SSE)",
+            response_class=StreamingResponse,
+            responses={200: {"content": {"text/event-stream": {}}}})
+async def read_feed_sse(assignee: int | None = None,
+                        project: int | None = None,
+                        since: int | None = Query(None,
+                                                  description="Номер последнего полученного события"),
+                        last_event_id: int | None = Header(None)):
+    """
+    Поток событий created/updated/deleted в формате Server-Sent Events
+    с отбором по исполнителю и проекту. При переподключении браузер
+    передает Last-Event-ID, и пропущенные события отправляются из буфера.
+    Событие reset означает, что пропущенные события уже недоступны;
+    событие bulk заменяет изменения пакетного запроса, после него
+    данные затронутых исполнителей и проектов нужно перечитать
+    """
+    subscription = feed.hub.subscribe(assignee, project,
+                                      last_event_id if last_event_id is not None else since)
+
+    async def stream():
+        try:
+            while True:
+                event = await _next_event(subscription)
+                if event is None:
+                    yield b": ping\n\n"
+                    continue
+                head = f"id: {event['seq']}\n" if "seq" in event else ""
+                yield (f"{head}event: {event['type']}\n".encode()
+                       + b"data: " + orjson.dumps(event) + b"\n\n")
+                if event is feed.OVERFLOW:
+                    return
+        finally:
+            feed.hub.unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/feed/ws")
+async def read_feed_ws(websocket: WebSocket,
+                       assignee: int | None = None,
+                       project: int | None = None,
+                       since: int | None = None):
+    """
+    Та же лента изменений через WebSocket: по событию JSON в сообщении
+    """
+    await websocket.accept()
+    subscription = feed.hub.subscribe(assignee, project, since)
+
+    async def send_events():
+        while True:
+            event = await _next_event(subscription)
+            if event is None:
+                event = {"type": "ping"}
+            await websocket.send_text(orjson.dumps(event).decode())
+            if event is feed.OVERFLOW:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
+
+    async def wait_disconnect():
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    tasks = [asyncio.create_task(send_events()), asyncio.create_task(wait_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        feed.hub.unsubscribe(subscription)
@@ -1,6 +1,7 @@
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from pydantic import (BaseModel, Field, BeforeValidator, EmailStr)
-from typing import Optional, Annotated, TypeAlias
+from typing import Optional, Annotated, TypeAlias, List, Any
+from sqlalchemy import JSON, DateTime, Index, func, text
 from sqlmodel import SQLModel, Field as SQLField, UniqueConstraint
 
 def _empty_str_or_none(value: str | None) -> None:
@@ -29,15 +30,41 @@ class TaskCreate(BaseModel):
 class TaskRead(TaskCreate):
     task_id: int
     due_date: EmptyStrOrNone | date
+    version: int = Field(
+        default=1,
+        description="Task version, increases on every update; sent back in If-Match"
+    )
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+def _timestamp_field(**kwargs) -> Any:
+    # Время выставляет БД: при вставке и при каждом UPDATE строки
+    return SQLField(default=None, nullable=False, sa_type=DateTime(timezone=True),
+                    sa_column_kwargs={"server_default": func.now(), **kwargs})
 
 
 class Task(SQLModel, TaskRead, table=True):
+    # Составные индексы повторяют порядок выдачи заданий (по task_id),
+    # поэтому отбор по исполнителю, проекту или дате не требует сортировки
+    __table_args__ = (
+        Index("ix_task_assignee_task_id", "assignee", "task_id"),
+        Index("ix_task_due_date_task_id", "due_date", "task_id"),
+        Index("ix_task_project_task_id", "project", "task_id",
+              postgresql_where=text("project IS NOT NULL")),
+        Index("ix_task_assignee_updated_at", "assignee", "updated_at"),
+        Index("ix_task_updated_at_task_id", "updated_at", "task_id"),
+    )
     task_id: int = SQLField(default=None, nullable=False,
                             primary_key=True)
     due_date: date
     assignee: int = SQLField(foreign_key="user.user_id")
     project: int = SQLField(default=None, nullable=True, foreign_key="project.project_id")
     grade: int = SQLField(default=None, nullable=True, ge=1, le=10)
+    version: int = SQLField(default=1, nullable=False,
+                            sa_column_kwargs={"server_default": "1"})
+    created_at: datetime = _timestamp_field()
+    updated_at: datetime = _timestamp_field(onupdate=func.now())
 
 
 class TaskUpdate(TaskCreate):
@@ -45,6 +72,52 @@ class TaskUpdate(TaskCreate):
     assignee: Optional[int] = None
 
 
+class TaskBulkUpdate(TaskUpdate):
+    task_id: int
+
+
+class BulkItemError(BaseModel):
+    index: int = Field(description="Position of the item in the request")
+    detail: Any
+
+
+class BulkTaskCreateResult(BaseModel):
+    created: List[TaskRead]
+    errors: List[BulkItemError]
+
+
+class BulkTaskUpdateResult(BaseModel):
+    updated: List[TaskRead]
+    errors: List[BulkItemError]
+
+
+class BulkTaskDeleteResult(BaseModel):
+    deleted: List[int]
+    errors: List[BulkItemError]
+
+
+class TaskSearchHit(TaskRead):
+    rank: float = Field(description="Relevance, higher is better")
+    highlight: str = Field(description="HTML-escaped task description with matches wrapped in <b></b>")
+
+
+class TaskAutoAssign(TaskCreate):
+    assignee: None = Field(default=None, exclude=True,
+                           description="Chosen by the scheduler")
+
+
+class AutoAssignment(BaseModel):
+    index: int = Field(description="Position of the item in the request")
+    assignee: int
+    load: float = Field(description="Assignee workload after the assignment")
+
+
+class AutoAssignResult(BaseModel):
+    assignments: List[AutoAssignment]
+    created: List[TaskRead] = Field(description="Empty on a dry run")
+    errors: List[BulkItemError]
+
+
 class User(SQLModel, table=True):
     __table_args__ = (UniqueConstraint("email"),)
     user_id: int = SQLField(default=None, nullable=False, primary_key=True)
@@ -53,11 +126,14 @@ class User(SQLModel, table=True):
     name: str
     grade: int | None = SQLField(ge=1,
                                  le=10,
+                                 index=True,
                                  description="""
                                  Чем выше грейд, тем ценнее сотрудник.
                                  Сотрудник может выдать задание только сотруднику с меньшим грейдом.
                                  Сотруднику с грейдом k можно выдать задание только сложности <= k.
                                  """)
+    created_at: datetime | None = _timestamp_field()
+    updated_at: datetime | None = _timestamp_field(onupdate=func.now())
 
     class Config:
         json_schema_extra = {
@@ -77,6 +153,10 @@ class UserRead(BaseModel):
     grade: Optional[int] = None
 
 
+class CandidateRead(UserRead):
+    load: int = Field(description="Number of tasks assigned to the user")
+
+
 class UserUpdate(BaseModel):
     name: Optional[str] = None
     grade: Optional[int] = None
@@ -86,3 +166,129 @@ class Project(SQLModel, table=True):
     project_id: int = SQLField(default=None, nullable=False, primary_key=True)
     project_name: str
     project_description: str | None
+
+
+class ProjectCreate(BaseModel):
+    project_name: str = Field(max_length=200)
+    project_description: Optional[str] = None
+
+
+class ProjectRead(ProjectCreate):
+    project_id: int
+
+
+class ProjectUpdate(BaseModel):
+    project_name: Optional[str] = Field(default=None, max_length=200)
+    project_description: Optional[str] = None
+
+
+class ProjectTaskStats(SQLModel, table=True):
+    """
+    Число заданий проекта по исполнителю, грейду и сроку. Таблица
+    поддерживается триггерами на task (только Postgres), поэтому
+    статистика проекта не требует чтения его заданий.
+    Задания без грейда учитываются с grade = 0
+    """
+    __tablename__ = "project_task_stats"
+    project_id: int = SQLField(foreign_key="project.project_id", primary_key=True,
+                               ondelete="CASCADE")
+    assignee: int = SQLField(primary_key=True)
+    grade: int = SQLField(primary_key=True)
+    due_date: date = SQLField(primary_key=True)
+    task_count: int
+
+
+class GradeStats(BaseModel):
+    grade: Optional[int] = None
+    tasks: int
+    overdue: int
+
+
+class AssigneeStats(BaseModel):
+    assignee: int
+    tasks: int
+    overdue: int
+
+
+class ProjectStats(BaseModel):
+    project_id: int
+    tasks: int
+    overdue: int = Field(description="Tasks with due_date earlier than today")
+    by_grade: List[GradeStats]
+    by_assignee: List[AssigneeStats]
+
+
+class TaskTombstone(SQLModel, table=True):
+    """
+    Отметка о том, что задание перестало относиться к исполнителю:
+    удалено или передано другому. Нужна для /tasks/changes
+    """
+    __tablename__ = "task_tombstone"
+    __table_args__ = (
+        Index("ix_task_tombstone_assignee_deleted_at", "assignee", "deleted_at"),
+    )
+    tombstone_id: int = SQLField(default=None, nullable=False, primary_key=True)
+    task_id: int
+    assignee: int
+    deleted_at: datetime = _timestamp_field()
+
+
+class TaskChanges(BaseModel):
+    token: str = Field(description="Pass as since in the next request")
+    full: bool = Field(description="changed contains the full list, local state must be replaced")
+    changed: List[TaskRead]
+    deleted: List[int]
+
+
+class Job(SQLModel, table=True):
+    """
+    Фоновое задание очереди app.jobs. Выполненные задания удаляются,
+    исчерпавшие попытки остаются с failed_at для разбора.
+    Пока задание выполняется, run_at - срок аренды исполнителя
+    """
+    __tablename__ = "job"
+    __table_args__ = (
+        Index("ix_job_queue", text("priority DESC"), "run_at",
+              postgresql_where=text("failed_at IS NULL")),
+    )
+    job_id: int = SQLField(default=None, nullable=False, primary_key=True)
+    kind: str
+    payload: dict = SQLField(default_factory=dict, sa_type=JSON)
+    priority: int = SQLField(default=0, sa_column_kwargs={"server_default": "0"})
+    # Ключ незавершенного задания: повторная постановка с тем же ключом игнорируется
+    key: Optional[str] = SQLField(default=None, nullable=True, unique=True)
+    run_at: datetime = _timestamp_field()
+    attempts: int = SQLField(default=0, sa_column_kwargs={"server_default": "0"})
+    max_attempts: int
+    last_error: Optional[str] = None
+    failed_at: Optional[datetime] = SQLField(default=None, nullable=True,
+                                             sa_type=DateTime(timezone=True))
+    created_at: datetime = _timestamp_field()
+
+
+class TaskReminder(SQLModel, table=True):
+    """
+    Отправленное напоминание: повторное напоминание того же вида
+    о задании с тем же сроком не отправляется. Ключ начинается со срока,
+    чтобы старые записи удалялись по диапазону
+    """
+    __tablename__ = "task_reminder"
+    due_date: date = SQLField(primary_key=True)
+    task_id: int = SQLField(primary_key=True)
+    kind: str = SQLField(primary_key=True)
+    sent_at: datetime = _timestamp_field()
+
+
+class ReminderWatermark(SQLModel, table=True):
+    """
+    Позиция сканера напоминаний вида kind: последний обработанный ключ
+    (due_date, task_id) индекса сроков и ключ (updated_at, task_id),
+    после которого проверяются новые и измененные задания
+    """
+    __tablename__ = "reminder_watermark"
+    kind: str = SQLField(primary_key=True)
+    due_date: date
+    task_id: int
+    changed_at: datetime = SQLField(sa_type=DateTime(timezone=True))
+    changed_task_id: int
+    updated_at: datetime = _timestamp_field(onupdate=func.now())
@@ -0,0 +1,157 @@
+"""
+This module provides full-text search over task descriptions for databases
+without tsvector support (SQLite in local and testing deployments):
+an in-process inverted index kept in sync with the task table
+"""
+import asyncio
+import html
+import math
+import re
+from datetime import timedelta
+from typing import Iterable, List, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select, func
+
+from app.schemas import task as schema_task
+
+# Конфигурация текстового поиска Postgres для колонки task.search_vector:
+# без стемминга и стоп-слов, поэтому одинаково разбирает описания
+# на любом языке и совпадает с разбором резервного индекса
+SEARCH_CONFIG = "simple"
+
+_WORD = re.compile(r"\w+")
+
+# Замены html.escape в порядке применения (& первым); по ним же
+# экранируется описание в SQL перед ts_headline
+HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;"))
+
+
+def tokenize(text: str | None) -> List[str]:
+    return [word.lower() for word in _WORD.findall(text or "")]
+
+
+def parse_query(query: str) -> Tuple[List[str], List[str]]:
+    """
+    Слова запроса, которые должны входить в описание, и исключенные
+    слова (с минусом перед ними), как в websearch_to_tsquery.
+    Кавычки и OR резервный индекс не поддерживает: все слова обязательны
+    """
+    include, exclude = [], []
+    for term in query.split():
+        target = exclude if term.startswith("-") else include
+        target.extend(tokenize(term))
+    return include, exclude
+
+
+def highlight(text: str, terms: Iterable[str]) -> str:
+    """
+    Описание с экранированным HTML и найденными словами в <b></b>,
+    как в ts_headline. Экранируется текст между словами: слова
+    не содержат спецсимволов HTML, а слова внутри сущностей (&quot;)
+    не должны подсвечиваться
+    """
+    terms = set(terms)
+    parts, end = [], 0
+    for match in _WORD.finditer(text):
+        word = match.group()
+        parts.append(html.escape(text[end:match.start()]))
+        parts.append(f"<b>{word}</b>" if word.lower() in terms else word)
+        end = match.end()
+    parts.append(html.escape(text[end:]))
+    return "".join(parts)
+
+
+class SearchIndex:
+    """
+    Обратный индекс: слово -> {task_id: число вхождений}. Индекс догоняет
+    таблицу перед каждым поиском: сверяется сводка (число заданий,
+    наибольший task_id, сумма версий, последнее updated_at), и при
+    расхождении перечитываются только задания, измененные с прошлой сверки.
+    Подходит для небольших баз: удаления обнаруживаются чтением всех task_id
+    """
+
+    def __init__(self):
+        self._postings: dict[str, dict[int, int]] = {}
+        self._documents: dict[int, List[str]] = {}
+        self._summary = None
+        self._updated_since = None
+        self._lock = asyncio.Lock()
+
+    def update(self, rows: Iterable[Tuple[int, str | None]]) -> None:
+        """
+        Проиндексировать (или переиндексировать) пары (task_id, описание)
+        """
+        for task_id, description in rows:
+            self.remove([task_id])
+            words = tokenize(description)
+            self._documents[task_id] = words
+            for word in words:
+                postings = self._postings.setdefault(word, {})
+                postings[task_id] = postings.get(task_id, 0) + 1
+
+    def remove(self, task_ids: Iterable[int]) -> None:
+        for task_id in task_ids:
+            for word in set(self._documents.pop(task_id, ())):
+                postings = self._postings[word]
+                del postings[task_id]
+                if not postings:
+                    del self._postings[word]
+
+    def search(self, query: str,
+               after: Tuple[float, int] | None = None) -> List[Tuple[float, int]]:
+        """
+        Пары (ранг, task_id) подходящих заданий в порядке убывания ранга
+        и task_id, начиная после ключа after. Ранг - сумма по словам запроса
+        числа вхождений, взвешенного редкостью слова (tf-idf)
+        """
+        include, exclude = parse_query(query)
+        if not include and not exclude:
+            return []
+        postings = [self._postings.get(word, {}) for word in include]
+        # Запрос только из исключений подходит ко всем остальным заданиям
+        matches = set(min(postings, key=len) if postings else self._documents)
+        for posting in postings:
+            matches.intersection_update(posting)
+        for word in exclude:
+            matches.difference_update(self._postings.get(word, ()))
+
+        total = len(self._documents)
+        weights = [math.log(1 + total / len(posting)) if posting else 0.0 for posting in postings]
+        ranked = []
+        for task_id in matches:
+            rank = sum(weight * posting[task_id] for weight, posting in zip(weights, postings))
+            rank = round(rank / (1 + math.log(max(len(self._documents[task_id]), 1))), 6)
+            if after is None or (rank, task_id) < after:
+                ranked.append((rank, task_id))
+        ranked.sort(reverse=True)
+        return ranked
+
+    async def refresh(self, session: AsyncSession) -> None:
+        """
+        Привести индекс в соответствие с таблицей заданий
+        """
+        task = schema_task.Task
+        summary = (await session.execute(
+            select(func.count(), func.max(task.task_id),
+                   func.coalesce(func.sum(task.version), 0), func.max(task.updated_at))
+        )).one()
+        async with self._lock:
+            if tuple(summary) == self._summary:
+                return
+            statement = select(task.task_id, task.task_description, task.updated_at)
+            if self._updated_since is not None:
+                # SQLite хранит CURRENT_TIMESTAMP с точностью до секунды,
+                # поэтому окно начинается на секунду раньше прошлой сверки
+                statement = statement.where(
+                    task.updated_at >= self._updated_since - timedelta(seconds=1))
+            rows = (await session.execute(statement)).all()
+            self.update((task_id, description) for task_id, description, _ in rows)
+            if len(self._documents) != summary[0]:
+                existing = set((await session.execute(select(task.task_id))).scalars().all())
+                self.remove([task_id for task_id in self._documents if task_id not in existing])
+            self._summary = tuple(summary)
+            self._updated_since = summary[3]
+
+
+search_index = SearchIndex()
@@ -0,0 +1,35 @@
+"""
+This module provides a fast JSON path for listings: columns are selected
+from the database as tuples and encoded straight to bytes with orjson,
+without building ORM objects and validating them into response models
+"""
+from typing import Iterable, Sequence, Type
+
+import orjson
+from pydantic import BaseModel
+
+
+def read_columns(table_model: Type, read_model: Type[BaseModel]) -> list:
+    """
+    Колонки table_model в порядке полей read_model
+    """
+    return [getattr(table_model, name) for name in read_model.model_fields]
+
+
+def rows_to_dicts(read_model: Type[BaseModel], rows: Iterable[Sequence]) -> list[dict]:
+    """
+    Словари с полями read_model из строк, выбранных через read_columns
+    """
+    names = tuple(read_model.model_fields)
+    return [dict(zip(names, row)) for row in rows]
+
+
+def rows_to_json(read_model: Type[BaseModel], rows: Iterable[Sequence]) -> bytes:
+    """
+    JSON-массив объектов read_model из строк, выбранных через read_columns
+    """
+    return orjson.dumps(rows_to_dicts(read_model, rows))
+
+
+def row_to_json_line(read_model: Type[BaseModel], row: Sequence) -> bytes:
+    return orjson.dumps(dict(zip(read_model.model_fields, row))) + b"\n"
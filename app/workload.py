@@ -0,0 +1,150 @@
+"""
+This module provides an in-process index of users' workload
+used to pick task candidates without querying the database
+"""
+import bisect
+import heapq
+import threading
+from typing import Any, Iterable, List, Tuple
+
+from app.schemas import task as schema_task
+
+
+class WorkloadIndex:
+    """
+    Количество заданий на сотрудника, разложенное по грейдам.
+    Для каждого грейда хранится min-куча (нагрузка, user_id);
+    устаревшие записи не удаляются сразу, а пропускаются при чтении
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users: dict[int, schema_task.UserRead] = {}
+        self._loads: dict[int, int] = {}
+        self._buckets: dict[int, list[Tuple[int, int]]] = {}
+        self.ready = False
+
+    def load(self, rows: Iterable[Tuple[schema_task.UserRead, int]]) -> None:
+        """
+        Полностью перестроить индекс по парам (сотрудник, число заданий)
+        """
+        with self._lock:
+            self._users.clear()
+            self._loads.clear()
+            self._buckets.clear()
+            for user, load in rows:
+                self._users[user.user_id] = user
+                self._loads[user.user_id] = load
+                if user.grade is not None:
+                    self._buckets.setdefault(user.grade, []).append((load, user.user_id))
+            for bucket in self._buckets.values():
+                heapq.heapify(bucket)
+            self.ready = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self.ready = False
+
+    def set_user(self, user: schema_task.UserRead) -> None:
+        """
+        Добавить нового сотрудника или обновить данные существующего
+        """
+        if not self.ready:
+            return
+        with self._lock:
+            self._users[user.user_id] = user
+            self._loads.setdefault(user.user_id, 0)
+            self._push(user.user_id)
+
+    def adjust(self, user_id: int, delta: int) -> None:
+        """
+        Изменить число заданий сотрудника на delta
+        """
+        if not self.ready:
+            return
+        with self._lock:
+            if user_id not in self._users:
+                return
+            self._loads[user_id] = max(self._loads[user_id] + delta, 0)
+            self._push(user_id)
+
+    def top_k(self, task_grade: int, k: int = 1) -> List[Tuple[schema_task.UserRead, int]]:
+        """
+        k наименее загруженных сотрудников с грейдом не ниже task_grade.
+        Обход кучи идет от корня к потомкам, поэтому сложность
+        O((k + число устаревших записей) * log) вместо сортировки всех сотрудников
+        """
+        with self._lock:
+            frontier = []
+            for grade, bucket in self._buckets.items():
+                if grade >= task_grade and bucket:
+                    frontier.append((bucket[0], grade, 0))
+            heapq.heapify(frontier)
+
+            result = []
+            seen = set()
+            while frontier and len(result) < k:
+                (load, user_id), grade, position = heapq.heappop(frontier)
+                if user_id not in seen and self._is_actual(load, user_id, grade):
+                    seen.add(user_id)
+                    result.append((self._users[user_id], load))
+                bucket = self._buckets[grade]
+                for child in (2 * position + 1, 2 * position + 2):
+                    if child < len(bucket):
+                        heapq.heappush(frontier, (bucket[child], grade, child))
+            return result
+
+    def _is_actual(self, load: int, user_id: int, grade: int) -> bool:
+        user = self._users.get(user_id)
+        return user is not None and user.grade == grade and self._loads[user_id] == load
+
+    def _push(self, user_id: int) -> None:
+        grade = self._users[user_id].grade
+        if grade is None:
+            return
+        bucket = self._buckets.setdefault(grade, [])
+        heapq.heappush(bucket, (self._loads[user_id], user_id))
+        # Сжимаем кучу, когда устаревших записей становится слишком много
+        if len(bucket) > 2 * len(self._users) + 64:
+            actual = {(load, uid) for load, uid in bucket
+                      if self._is_actual(load, uid, grade)}
+            bucket[:] = list(actual)
+            heapq.heapify(bucket)
+
+
+workload_index = WorkloadIndex()
+
+
+def plan_assignments(users: Iterable[Tuple[int, int | None, float]],
+                     tasks: Iterable[Tuple[Any, int | None, float]]) -> dict:
+    """
+    Распределить задания по сотрудникам за один проход: каждое задание
+    получает наименее загруженный сотрудник с грейдом не ниже грейда задания,
+    после чего его нагрузка растет на вес задания.
+    users - тройки (user_id, грейд, нагрузка), tasks - тройки (ключ, грейд, вес)
+    в порядке назначения. Возвращает {ключ: (user_id, нагрузка после назначения)};
+    задания, для которых нет подходящего сотрудника, в результат не попадают
+    """
+    buckets: dict[int, list[Tuple[float, int]]] = {}
+    for user_id, grade, load in users:
+        if grade is not None:
+            buckets.setdefault(grade, []).append((load, user_id))
+    for bucket in buckets.values():
+        heapq.heapify(bucket)
+    grades = sorted(buckets)
+
+    plan = {}
+    for key, task_grade, weight in tasks:
+        # Каждый сотрудник лежит ровно в одной куче, поэтому достаточно
+        # сравнить корни куч подходящих грейдов (их не больше десяти)
+        best = None
+        for grade in grades[bisect.bisect_left(grades, task_grade or 0):]:
+            top = buckets[grade][0]
+            if best is None or top < best[0]:
+                best = (top, grade)
+        if best is None:
+            continue
+        (load, user_id), grade = best
+        heapq.heapreplace(buckets[grade], (load + weight, user_id))
+        plan[key] = (user_id, load + weight)
+    return plan
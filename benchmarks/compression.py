@@ -0,0 +1,100 @@
+"""
+This module provides a benchmark of response compression codecs.
+
+Example:
+    python -m benchmarks.compression --repeat 20
+    python -m benchmarks.compression --codec gzip --level 1 --level 4 --level 6
+
+For typical listing payloads (a tasks-list page, a large filtered list,
+the NDJSON stream of tasks-list?stream=true and /auth/users) reports
+bytes on the wire and CPU time per response for every codec and level,
+using the same encoders as app.compression. Streams are compressed
+in buffered chunks, as the middleware does. No database is needed: rows
+are generated in memory.
+"""
+import argparse
+import json
+import time
+
+from app import compression
+from app.schemas import task as schema_task
+from app.serialization import rows_to_json, row_to_json_line
+from benchmarks.serialization import make_rows
+
+
+# Уровни по умолчанию: около значений из настроек и крайние
+DEFAULT_LEVELS = {
+    "gzip": [1, 4, 6, 9],
+    "br": [1, 4, 6, 11],
+    "zstd": [1, 3, 6, 12],
+}
+
+ENCODERS = {
+    "gzip": compression.GzipEncoder,
+    "br": compression.BrotliEncoder,
+    "zstd": compression.ZstdEncoder,
+}
+
+
+def make_payloads() -> dict[str, list[bytes]]:
+    """
+    Тела ответов, разбитые на части так, как их отправляет приложение
+    """
+    users = [(f"User number {i}", f"user-{i}@example.com", i + 1, i % 10 + 1)
+             for i in range(1000)]
+    return {
+        "tasks_list_100": [rows_to_json(schema_task.TaskRead, make_rows(100))],
+        "tasks_list_1000": [rows_to_json(schema_task.TaskRead, make_rows(1000))],
+        "tasks_stream_10000": [row_to_json_line(schema_task.TaskRead, row)
+                               for row in make_rows(10000)],
+        "users_1000": [rows_to_json(schema_task.UserRead, users)],
+    }
+
+
+def measure(encoder_factory, chunks: list[bytes], repeat: int) -> tuple[int, float]:
+    """
+    Размер сжатого тела и наименьшее процессорное время одного ответа, мс
+    """
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        started = time.process_time()
+        encoder = encoder_factory()
+        size = sum(len(encoder.compress(chunk)) for chunk in chunks) + len(encoder.finish())
+        best = min(best, time.process_time() - started)
+    return size, round(best * 1000, 3)
+
+
+def main(args: argparse.Namespace) -> None:
+    available = compression.available_encoders()
+    codecs = args.codec or [codec for codec in DEFAULT_LEVELS if codec in available]
+    results = {}
+    for name, chunks in make_payloads().items():
+        raw = sum(len(chunk) for chunk in chunks)
+        result = {"identity_bytes": raw, "codecs": []}
+        for codec in codecs:
+            if codec not in available:
+                raise SystemExit(f"codec {codec} is not available, install its package")
+            for level in args.level or DEFAULT_LEVELS[codec]:
+                size, cpu_ms = measure(
+                    lambda: compression.BufferedEncoder(ENCODERS[codec](level)),
+                    chunks, args.repeat)
+                result["codecs"].append({"codec": codec, "level": level, "bytes": size,
+                                         "ratio": round(raw / size, 2), "cpu_ms": cpu_ms})
+                print(f"{name:20} {codec:5} {level:>3}  {size:>9} B  x{raw / size:>6.2f}  "
+                      f"{cpu_ms:>9.3f} ms", flush=True)
+        results[name] = result
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codec", action="append", choices=list(DEFAULT_LEVELS), default=[],
+                        help="codec to measure (repeatable); by default every available one")
+    parser.add_argument("--level", type=int, action="append", default=[],
+                        help="compression level (repeatable); by default a per-codec range")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", default=None, help="also write the results to a file")
+    main(parser.parse_args())
@@ -0,0 +1,75 @@
+"""
+This module provides an import-time benchmark of the application.
+
+Example:
+    python -m benchmarks.import_time --runs 5 --top 20
+
+Imports app.main in fresh interpreters with `python -X importtime`
+and reports the median total import time and the modules with the
+largest cumulative time. The interpreters run outside the repository
+and without the application settings, like a cold worker before
+its .env is read; tests/test_startup.py checks the same budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """
+    Время импорта модулей из вывода -X importtime: {module: (self_us, cumulative_us)}
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure_import(module: str = "app.main", code: str = "") -> dict[str, tuple[int, int]]:
+    """
+    Импортировать module в новом интерпретаторе; code выполняется после импорта
+    и может проверять состояние модулей
+    """
+    env = {key: value for key, value in os.environ.items()
+           if not key.upper().startswith(("DB_", "DATABASE_URL", "SECRET_KEY", "ALGO",
+                                          "ACCESS_TOKEN_EXPIRE"))}
+    env["PYTHONPATH"] = ROOT
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                                 f"import {module}\n{code}"],
+                                cwd=cwd, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def main(args: argparse.Namespace) -> None:
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    totals = [run[args.module][1] for run in runs]
+    last = runs[-1]
+    top = sorted(last.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    report = {
+        "module": args.module,
+        "runs_ms": [round(total / 1000, 1) for total in totals],
+        "median_ms": round(statistics.median(totals) / 1000, 1),
+        "top_cumulative_ms": {name: round(cumulative / 1000, 1) for name, (_, cumulative) in top},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,126 @@
+"""
+This module provides a simple load generator for a running instance of the API.
+
+Example:
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 \
+        --path /tasks/my-tasks --auth --concurrency 200 --requests 5000
+
+The result (throughput and latency percentiles) is printed as JSON,
+so runs against different commits can be compared directly.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from typing import Callable
+
+import httpx
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+async def obtain_token(client: httpx.AsyncClient) -> str:
+    """
+    Зарегистрировать нового пользователя и получить для него токен
+    """
+    email = f"bench-{uuid.uuid4().hex}@example.com"
+    password = uuid.uuid4().hex
+    response = await client.post("/auth/signup",
+                                 json={"name": "bench", "email": email,
+                                       "password": password, "grade": 10})
+    response.raise_for_status()
+    response = await client.post("/auth/login",
+                                 data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_load(client: httpx.AsyncClient, method: str, path: str,
+                   concurrency: int, total: int, headers: dict | None = None,
+                   make_request: Callable[[int], dict] | None = None,
+                   on_response: Callable[[httpx.Response], None] | None = None) -> dict:
+    """
+    Выполнить total запросов, держа не более concurrency запросов одновременно.
+    make_request(i) возвращает параметры i-го запроса для client.request
+    (url, params, json, ...), on_response получает каждый успешный ответ
+    """
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            kwargs = {"url": path, "headers": headers}
+            if make_request is not None:
+                kwargs.update(make_request(total - remaining - 1))
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, **kwargs)
+                code = response.status_code
+            except httpx.HTTPError:
+                response = None
+                code = 0
+            latencies.append(time.perf_counter() - started)
+            statuses[code] = statuses.get(code, 0) + 1
+            if on_response is not None and response is not None and response.is_success:
+                on_response(response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "method": method,
+        "path": path,
+        "concurrency": concurrency,
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2),
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+        },
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency,
+                          max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits,
+                                 timeout=args.timeout) as client:
+        headers = None
+        if args.auth:
+            headers = {"Authorization": f"Bearer {await obtain_token(client)}"}
+        # Прогрев соединений и пулов сервера
+        await run_load(client, args.method, args.path, args.concurrency,
+                       args.concurrency, headers)
+        result = await run_load(client, args.method, args.path,
+                                args.concurrency, args.requests, headers)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--path", required=True)
+    parser.add_argument("--auth", action="store_true",
+                        help="sign up a fresh user and send its bearer token")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,246 @@
+"""
+This module provides a benchmark run over all API routes.
+
+Examples:
+    # приложение в том же процессе (httpx.ASGITransport), без сети
+    python -m benchmarks.run --output before.json
+    # запущенный сервер; пиковый RSS читается из /proc/<pid>/status
+    python -m benchmarks.run --base-url http://127.0.0.1:8000 --server-pid 1234
+
+The database is expected to be filled by benchmarks.seed. A running
+server should be started with rate_limit_backend=none, otherwise the
+login and signup scenarios are rejected with 429. Every scenario
+is warmed up and then measured; the report (throughput, p50/p95/p99 latency
+and peak RSS) is printed and optionally saved as JSON, so that reports
+of two commits can be diffed. Write scenarios delete the tasks they create.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable
+
+import httpx
+
+from benchmarks.load import run_load
+from benchmarks.seed import DEFAULT_MANIFEST, user_email
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    make_request: Callable[[int], dict] | None = None
+    auth: bool = False
+    # Доля от --requests: для тяжелых маршрутов (bcrypt, полный список)
+    scale: float = 1.0
+    on_response: Callable[[httpx.Response], None] | None = None
+    # Сценарии, меняющие данные, не прогреваются
+    warmup: bool = True
+
+
+def build_scenarios(dataset: dict, rng: random.Random) -> list[Scenario]:
+    users, tasks, projects = dataset["users"], dataset["tasks"], dataset["projects"]
+    today = date.fromisoformat(dataset["today"])
+    created: list[int] = []
+    created_batches: list[list[int]] = []
+
+    def random_day() -> str:
+        return (today + timedelta(days=rng.randint(-30, 335))).isoformat()
+
+    def collect_task(response: httpx.Response) -> None:
+        created.append(response.json()["task_id"])
+
+    def collect_batch(response: httpx.Response) -> None:
+        created_batches.append([task["task_id"] for task in response.json()["created"]])
+
+    def new_task() -> dict:
+        return {"task_description": f"benchmark task {rng.randrange(1 << 30)}",
+                "assignee": rng.randint(1, users)}
+
+    return [
+        Scenario("pool_stats", "GET", "/service/pool-stats"),
+        Scenario("cache_stats", "GET", "/service/cache-stats"),
+        Scenario("user_cache_stats", "GET", "/auth/user-cache-stats"),
+        Scenario("metrics", "GET", "/metrics", scale=0.2),
+        Scenario("me", "GET", "/auth/me", auth=True),
+        Scenario("my_tasks", "GET", "/tasks/my-tasks", auth=True),
+        Scenario("tasks_list", "GET", "/tasks/tasks-list",
+                 lambda i: {"params": {"limit": 100, "after": rng.randint(0, tasks)}}),
+        Scenario("tasks_list_filtered", "GET", "/tasks/tasks-list",
+                 lambda i: {"params": {"limit": 100, "grade_min": rng.randint(1, 10),
+                                       "due_from": random_day()}}),
+        Scenario("tasks_list_assignee", "GET", "/tasks/tasks-list",
+                 lambda i: {"params": {"assignee": rng.randint(1, users)}}),
+        Scenario("tasks_list_stream", "GET", "/tasks/tasks-list",
+                 lambda i: {"params": {"stream": "true", "assignee": rng.randint(1, users)}}),
+        Scenario("tasks_for_day", "GET", "/tasks/tasks-for-day",
+                 lambda i: {"params": {"due_date": random_day()}}),
+        Scenario("tasks_for_week", "GET", "/tasks/tasks-for-day",
+                 lambda i: {"params": {"due_date": random_day(), "view": "week"}}),
+        Scenario("tasks_for_month", "GET", "/tasks/tasks-for-day",
+                 lambda i: {"params": {"due_date": random_day(), "view": "month"}}, scale=0.2),
+        Scenario("get_candidate", "GET", "/tasks/get-candidate/{grade}",
+                 lambda i: {"url": f"/tasks/get-candidate/{rng.randint(1, 10)}"}),
+        Scenario("get_candidates", "GET", "/tasks/get-candidates/{grade}",
+                 lambda i: {"url": f"/tasks/get-candidates/{rng.randint(1, 10)}",
+                            "params": {"k": 10}}),
+        Scenario("users", "GET", "/auth/users", scale=0.1),
+        Scenario("projects_list", "GET", "/projects/projects-list"),
+        Scenario("project_stats", "GET", "/projects/{project_id}/stats",
+                 lambda i: {"url": f"/projects/{rng.randint(1, projects)}/stats"}),
+        Scenario("add_task", "POST", "/tasks/add-task",
+                 lambda i: {"json": new_task()},
+                 on_response=collect_task, warmup=False),
+        Scenario("update_task", "PATCH", "/tasks/update-task",
+                 lambda i: {"params": {"task_id": created[i % len(created)] if created else 0},
+                            "json": {"task_description": f"updated {i}"}},
+                 warmup=False),
+        Scenario("delete_task", "DELETE", "/tasks/delete-task/{task_id}",
+                 lambda i: {"url": f"/tasks/delete-task/{created.pop() if created else 0}"},
+                 warmup=False),
+        Scenario("add_tasks_100", "POST", "/tasks/add-tasks",
+                 lambda i: {"json": [new_task() for _ in range(100)]},
+                 scale=0.1, on_response=collect_batch, warmup=False),
+        Scenario("update_tasks_100", "PATCH", "/tasks/update-tasks",
+                 lambda i: {"json": [{"task_id": task_id, "task_description": f"updated {i}"}
+                                     for task_id in created_batches[i % len(created_batches)]]
+                            if created_batches else []},
+                 scale=0.1, warmup=False),
+        Scenario("delete_tasks_100", "POST", "/tasks/delete-tasks",
+                 lambda i: {"json": created_batches.pop() if created_batches else []},
+                 scale=0.1, warmup=False),
+        Scenario("update_user", "PATCH", "/auth/update-user",
+                 lambda i: {"params": {"user_id": rng.randint(1, users)}, "json": {}},
+                 scale=0.2),
+        Scenario("login", "POST", "/auth/login",
+                 lambda i: {"data": {"username": user_email(rng.randint(1, users)),
+                                     "password": dataset["password"]}},
+                 scale=0.05),
+        # Регистрация добавляет пользователей в набор данных, поэтому идет последней
+        Scenario("signup", "POST", "/auth/signup",
+                 lambda i: {"json": {"name": "bench", "grade": 1, "password": "bench",
+                                     "email": f"bench-{rng.randrange(1 << 60):x}@example.com"}},
+                 scale=0.05, warmup=False),
+    ]
+
+
+def peak_rss_mb(server_pids: list[int]) -> dict:
+    """
+    Пиковый RSS: серверных процессов по /proc/<pid>/status (VmHWM),
+    либо текущего процесса и его дочерних процессов (пул хэширования)
+    """
+    if not server_pids:
+        return {"self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)}
+    result = {}
+    for pid in server_pids:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    result[str(pid)] = round(int(line.split()[1]) / 1024, 1)
+    return result
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_scenarios(client: httpx.AsyncClient, args: argparse.Namespace,
+                        dataset: dict) -> list[dict]:
+    response = await client.post("/auth/login", data={"username": user_email(1),
+                                                      "password": dataset["password"]})
+    response.raise_for_status()
+    auth_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    rng = random.Random(args.seed)
+    results = []
+    for scenario in build_scenarios(dataset, rng):
+        if args.only and scenario.name not in args.only:
+            continue
+        total = max(1, int(args.requests * scenario.scale))
+        concurrency = min(args.concurrency, total)
+        headers = auth_headers if scenario.auth else None
+        if scenario.warmup:
+            await run_load(client, scenario.method, scenario.path, concurrency, concurrency,
+                           headers, scenario.make_request)
+        result = await run_load(client, scenario.method, scenario.path, concurrency, total,
+                                headers, scenario.make_request, scenario.on_response)
+        result["name"] = scenario.name
+        results.append(result)
+        print(f"{scenario.name:24} {result['throughput_rps']:>9} rps  "
+              f"p50 {result['latency_ms']['p50']:>8} ms  p99 {result['latency_ms']['p99']:>8} ms  "
+              f"{result['statuses']}", flush=True)
+    return results
+
+
+async def main(args: argparse.Namespace) -> dict:
+    with open(args.manifest, encoding="utf-8") as f:
+        dataset = json.load(f)
+    limits = httpx.Limits(max_connections=args.concurrency,
+                          max_keepalive_connections=args.concurrency)
+
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits,
+                                     timeout=args.timeout) as client:
+            results = await run_scenarios(client, args, dataset)
+    else:
+        from app.config import settings
+        from app.main import app
+
+        # Внешний календарь не должен влиять на результаты, а ограничение
+        # частоты входа - отклонять запросы нагрузки с одного адреса
+        if "dayoff_provider" not in os.environ:
+            settings.dayoff_provider = "file"
+        if "rate_limit_backend" not in os.environ:
+            settings.rate_limit_backend = "none"
+
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark",
+                                         limits=limits, timeout=args.timeout) as client:
+                results = await run_scenarios(client, args, dataset)
+
+    return {"revision": git_revision(),
+            "target": args.base_url or "in-process",
+            "dataset": dataset,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "peak_rss_mb": peak_rss_mb(args.server_pid),
+            "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=None,
+                        help="running server; by default the app is run in-process")
+    parser.add_argument("--server-pid", type=int, action="append", default=[],
+                        help="server process to report peak RSS for (repeatable)")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--requests", type=int, default=1000,
+                        help="requests per scenario (scaled down for heavy routes)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", action="append", default=[],
+                        help="run only the named scenario (repeatable)")
+    parser.add_argument("--output", default=None, help="also write the report to a file")
+    args = parser.parse_args()
+    report = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,182 @@
+"""
+This module provides a reproducible synthetic dataset for benchmarks.
+
+Examples:
+    # Postgres из .env (схема создается миграциями: alembic upgrade head)
+    python -m benchmarks.seed --tasks 1M --truncate
+    # SQLite вместо Postgres
+    database_url=sqlite+aiosqlite:///bench.db python -m benchmarks.seed --tasks 10k
+
+The same --seed and sizes always produce the same rows. A manifest with
+the dataset parameters is written next to the data and is included
+in the benchmarks.run report.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import faker
+from sqlalchemy import func, insert, select, text
+
+from app.auth.hashing import get_pwd_context
+from app.db import get_async_engine, init_database, is_postgres
+from app.schemas.task import Project, Task, User
+
+
+BENCH_PASSWORD = "benchmark"
+DEFAULT_MANIFEST = ".cache/benchmark-dataset.json"
+CHUNK_SIZE = 50_000
+# Пул текстов: Faker слишком медленный, чтобы вызывать его на каждую из 10M строк
+TEXT_POOL_SIZE = 1000
+
+
+def parse_size(value: str) -> int:
+    """
+    Размер вида 10000, 10k, 1M, 10M
+    """
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    suffix = value[-1].lower()
+    if suffix in multipliers:
+        return int(float(value[:-1]) * multipliers[suffix])
+    return int(value)
+
+
+def user_email(user_id: int) -> str:
+    return f"user{user_id}@example.com"
+
+
+def _users(count: int, rng: random.Random, names: list[str]):
+    password = get_pwd_context().hash(BENCH_PASSWORD)
+    for user_id in range(1, count + 1):
+        yield {"user_id": user_id, "email": user_email(user_id), "password": password,
+               "name": rng.choice(names), "grade": rng.randint(1, 10)}
+
+
+def _projects(count: int, rng: random.Random, sentences: list[str]):
+    for project_id in range(1, count + 1):
+        yield {"project_id": project_id, "project_name": f"Project {project_id}",
+               "project_description": rng.choice(sentences)}
+
+
+def _tasks(count: int, users: int, projects: int, rng: random.Random,
+           sentences: list[str], today: date):
+    for task_id in range(1, count + 1):
+        yield {"task_id": task_id,
+               "task_description": rng.choice(sentences),
+               "assignee": rng.randint(1, users),
+               "due_date": today + timedelta(days=rng.randint(-30, 335)),
+               "grade": rng.randint(1, 10) if rng.random() < 0.9 else None,
+               "project": rng.randint(1, projects) if rng.random() < 0.8 else None}
+
+
+def _chunks(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _copy(conn, table, rows) -> None:
+    """
+    Загрузка строк: COPY для Postgres, executemany для остальных БД
+    """
+    columns = [column.name for column in table.columns]
+    for chunk in _chunks(rows, CHUNK_SIZE):
+        if is_postgres():
+            raw = (await conn.get_raw_connection()).driver_connection
+            await raw.copy_records_to_table(
+                table.name, columns=columns,
+                records=[tuple(row[column] for column in columns) for row in chunk]
+            )
+        else:
+            await conn.execute(insert(table), chunk)
+
+
+async def seed(tasks: int, users: int, projects: int, seed_value: int,
+               truncate: bool, manifest: str) -> dict:
+    rng = random.Random(seed_value)
+    fake = faker.Faker("ru_RU")
+    fake.seed_instance(seed_value)
+    names = [fake.name() for _ in range(TEXT_POOL_SIZE)]
+    sentences = [fake.sentence(nb_words=10)[:300] for _ in range(TEXT_POOL_SIZE)]
+    # Даты отсчитываются от фиксированного дня, а не от сегодняшнего,
+    # чтобы набор данных не зависел от дня запуска
+    today = date(2025, 1, 1) + timedelta(days=seed_value % 365)
+
+    if not is_postgres():
+        init_database()
+
+    async_engine = get_async_engine()
+    started = time.perf_counter()
+    async with async_engine.begin() as conn:
+        existing = (await conn.execute(select(func.count()).select_from(User))).scalar_one()
+        if existing and not truncate:
+            raise SystemExit("Database is not empty, pass --truncate to replace the data")
+        for table in (Task.__table__, Project.__table__, User.__table__):
+            if is_postgres():
+                await conn.execute(text(f'TRUNCATE "{table.name}" RESTART IDENTITY CASCADE'))
+            else:
+                await conn.execute(table.delete())
+
+        await _copy(conn, User.__table__, _users(users, rng, names))
+        await _copy(conn, Project.__table__, _projects(projects, rng, sentences))
+        await _copy(conn, Task.__table__, _tasks(tasks, users, projects, rng, sentences, today))
+
+        if is_postgres():
+            # Строки загружены с явными id: сдвигаем последовательности
+            for table, column, value in (("user", "user_id", users),
+                                         ("project", "project_id", projects),
+                                         ("task", "task_id", tasks)):
+                await conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('\"{table}\"', '{column}'), {value})"
+                ))
+
+    if is_postgres():
+        async with async_engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("ANALYZE"))
+    await async_engine.dispose()
+
+    dataset = {"backend": async_engine.dialect.name, "seed": seed_value,
+               "tasks": tasks, "users": users, "projects": projects,
+               "today": today.isoformat(), "password": BENCH_PASSWORD,
+               "seconds": round(time.perf_counter() - started, 1)}
+    directory = os.path.dirname(manifest)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump(dataset, f, indent=2)
+    return dataset
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=parse_size, default=parse_size("10k"),
+                        help="number of tasks: 10k, 1M, 10M, ...")
+    parser.add_argument("--users", type=parse_size, default=None,
+                        help="number of users (default: tasks / 100)")
+    parser.add_argument("--projects", type=parse_size, default=None,
+                        help="number of projects (default: tasks / 1000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true",
+                        help="delete existing users, projects and tasks first")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    args = parser.parse_args()
+    users = args.users or max(10, args.tasks // 100)
+    projects = args.projects or max(1, args.tasks // 1000)
+    dataset = asyncio.run(seed(args.tasks, users, projects, args.seed,
+                               args.truncate, args.manifest))
+    print(json.dumps(dataset, indent=2))
+
+
+if __name__ == "__main__":
+    main()
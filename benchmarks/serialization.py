@@ -0,0 +1,70 @@
+"""
+This module provides a micro-benchmark of listing serialization paths.
+
+Example:
+    python -m benchmarks.serialization --rows 100000
+
+Compares rows/sec of:
+  * orm_response_model - ORM Task objects validated into List[TaskRead]
+    and dumped, as FastAPI does for response_model;
+  * orm_dump_json - ORM Task objects dumped by a TypeAdapter directly;
+  * tuples_orjson - column tuples encoded with orjson (app.serialization).
+No database is needed: rows are generated in memory.
+"""
+import argparse
+import json
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.schemas import task as schema_task
+from app.serialization import rows_to_json
+
+
+def make_rows(count: int) -> list[tuple]:
+    start = date(2025, 1, 1)
+    created = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [(f"Task number {i}", i % 500 + 1, start + timedelta(days=i % 365),
+             i % 10 + 1, None, i + 1, 1,
+             created + timedelta(seconds=i), created + timedelta(seconds=i, minutes=i % 60))
+            for i in range(count)]
+
+
+def measure(func, rows_count: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return round(rows_count / best)
+
+
+def main(args: argparse.Namespace) -> None:
+    rows = make_rows(args.rows)
+    names = list(schema_task.TaskRead.model_fields)
+    tasks = [schema_task.Task(**dict(zip(names, row))) for row in rows]
+    adapter = TypeAdapter(List[schema_task.TaskRead])
+
+    results = {
+        "rows": args.rows,
+        "rows_per_sec": {
+            "orm_response_model": measure(
+                lambda: adapter.dump_json(adapter.validate_python(tasks, from_attributes=True)),
+                args.rows, args.repeat),
+            "orm_dump_json": measure(
+                lambda: adapter.dump_json(tasks, warnings=False), args.rows, args.repeat),
+            "tuples_orjson": measure(
+                lambda: rows_to_json(schema_task.TaskRead, rows), args.rows, args.repeat),
+        },
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -33,6 +33,24 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = SQLModel.metadata
 
+# Объекты, которые есть только в БД: колонка task.search_vector
+# (генерируемый tsvector, см. app/search.py) и ее GIN-индекс не объявлены
+# в модели, поскольку не поддерживаются SQLite. Без фильтра autogenerate
+# предложил бы их удалить
+DATABASE_ONLY_OBJECTS = {
+    ("column", "search_vector"): "task",
+    ("index", "ix_task_search_vector"): "task",
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if reflected and compare_to is None:
+        table = object.table.name if type_ in ("column", "index") else None
+        if DATABASE_ONLY_OBJECTS.get((type_, name)) == table:
+            return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -55,6 +73,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -64,7 +83,8 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata,
+                      include_object=include_object)
 
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,47 @@
+"""track_changed_tasks_in_reminders
+
+Revision ID: 59452fbf3d85
+Revises: 30b3ad02cda7
+Create Date: 2026-10-18 21:36:17.605133
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '59452fbf3d85'
+down_revision: Union[str, None] = '30b3ad02cda7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Позиция обхода измененных заданий заменяет наибольший task_id:
+    # новые задания тоже получают updated_at при вставке
+    op.add_column('reminder_watermark',
+                  sa.Column('changed_at', sa.DateTime(timezone=True),
+                            server_default=sa.text('now()'), nullable=False))
+    op.add_column('reminder_watermark',
+                  sa.Column('changed_task_id', sa.Integer(),
+                            server_default='0', nullable=False))
+    op.alter_column('reminder_watermark', 'changed_at', server_default=None)
+    op.alter_column('reminder_watermark', 'changed_task_id', server_default=None)
+    op.drop_column('reminder_watermark', 'new_task_id')
+    with op.get_context().autocommit_block():
+        op.create_index('ix_task_updated_at_task_id', 'task', ['updated_at', 'task_id'],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_task_updated_at_task_id', table_name='task',
+                      postgresql_concurrently=True)
+    op.add_column('reminder_watermark',
+                  sa.Column('new_task_id', sa.Integer(), server_default='0', nullable=False))
+    op.alter_column('reminder_watermark', 'new_task_id', server_default=None)
+    op.drop_column('reminder_watermark', 'changed_task_id')
+    op.drop_column('reminder_watermark', 'changed_at')
@@ -0,0 +1,42 @@
+"""add_task_search_vector
+
+Revision ID: 906da302ef52
+Revises: bd731a9f180c
+Create Date: 2026-10-18 21:10:56.729422
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '906da302ef52'
+down_revision: Union[str, None] = 'bd731a9f180c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Колонка есть только в БД: модель Task ее не объявляет, чтобы
+    # select(Task) не читал вектор, а SQLite обходился без tsvector.
+    # Конфигурация 'simple' совпадает с app.search.SEARCH_CONFIG
+    op.add_column('task', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple'::regconfig, coalesce(task_description, ''))",
+                    persisted=True),
+        nullable=False
+    ))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_task_search_vector', 'task', ['search_vector'], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_task_search_vector', table_name='task',
+                      postgresql_using='gin', postgresql_concurrently=True)
+    op.drop_column('task', 'search_vector')
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""add_task_access_path_indexes
+
+Revision ID: d86854e736e2
+Revises: 9d3b33e475d6
+Create Date: 2026-10-18 20:38:19.151202
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd86854e736e2'
+down_revision: Union[str, None] = '9d3b33e475d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY не блокирует запись в таблицу,
+    # но не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index('ix_task_assignee_task_id', 'task', ['assignee', 'task_id'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_task_due_date_task_id', 'task', ['due_date', 'task_id'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_task_project_task_id', 'task', ['project', 'task_id'],
+                        unique=False, postgresql_concurrently=True,
+                        postgresql_where=sa.text('project IS NOT NULL'))
+        op.create_index(op.f('ix_user_grade'), 'user', ['grade'],
+                        unique=False, postgresql_concurrently=True)
+        # Одиночные индексы покрываются составными
+        op.drop_index('ix_task_assignee', table_name='task', postgresql_concurrently=True)
+        op.drop_index('ix_task_due_date', table_name='task', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_task_due_date', 'task', ['due_date'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_task_assignee', 'task', ['assignee'],
+                        unique=False, postgresql_concurrently=True)
+        op.drop_index(op.f('ix_user_grade'), table_name='user', postgresql_concurrently=True)
+        op.drop_index('ix_task_project_task_id', table_name='task',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_task_due_date_task_id', table_name='task',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_task_assignee_task_id', table_name='task',
+                      postgresql_concurrently=True)
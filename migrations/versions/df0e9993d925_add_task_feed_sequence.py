@@ -0,0 +1,28 @@
+"""add_task_feed_sequence
+
+Revision ID: df0e9993d925
+Revises: 89ab37afe8c9
+Create Date: 2026-10-18 20:46:39.268796
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'df0e9993d925'
+down_revision: Union[str, None] = '89ab37afe8c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Номера событий ленты изменений заданий (app/feed.py)
+    op.execute(sa.schema.CreateSequence(sa.Sequence('task_feed_seq')))
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(sa.Sequence('task_feed_seq')))
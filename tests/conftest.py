@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.fixture(scope="module", autouse=True)
+def client_lifespan(request):
+    """
+    Запускает lifespan приложения на время модуля с тестами,
+    чтобы асинхронные соединения с БД жили в одном event loop
+    """
+    client = getattr(request.module, "client", None)
+    if client is None:
+        yield
+        return
+    with client:
+        yield
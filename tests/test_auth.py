@@ -1,5 +1,6 @@
 from fastapi.testclient import TestClient
 import faker
+from app.auth import auth_handler
 from app.main import app
 
 client = TestClient(app)
@@ -114,3 +115,27 @@ def test_list_users():
     response = client.get("/auth/users")
     assert response.status_code == 200
     assert len(response.json()) > 0
+
+
+def test_me_is_cached_and_invalidated_on_update():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    user_id = client.post("/auth/signup", json=user_data).json()
+    token = get_token(user_data["email"], user_data["password"])
+    headers = {"Authorization": f"Bearer {token}"}
+
+    client.get("/auth/me", headers=headers)
+    hits_before = auth_handler.get_user_cache().hits
+    response = client.get("/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert auth_handler.get_user_cache().hits == hits_before + 1
+
+    assert client.get("/auth/user-cache-stats").status_code == 401
+    assert client.get("/auth/user-cache-stats", headers=headers).json()["size"] >= 1
+
+    client.patch("/auth/update-user", params={"user_id": user_id}, json={"name": "Petr"})
+    response = client.get("/auth/me", headers=headers)
+    assert response.json()["name"] == "Petr"
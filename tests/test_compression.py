@@ -0,0 +1,75 @@
+import gzip
+from datetime import date, timedelta
+
+import faker
+import pytest
+from fastapi.testclient import TestClient
+
+from app.compression import negotiate
+from app.main import app
+
+
+client = TestClient(app)
+fake = faker.Faker()
+DUE_DATE = (date.today() + timedelta(days=30)).isoformat()
+
+
+def test_negotiate():
+    encodings = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, deflate", encodings) == "gzip"
+    assert negotiate("gzip, br, zstd", encodings) == "zstd"
+    assert negotiate("gzip;q=1.0, br;q=0.5", encodings) == "gzip"
+    assert negotiate("*;q=0.1, zstd;q=0", encodings) == "br"
+    assert negotiate("identity", encodings) is None
+    assert negotiate("", encodings) is None
+
+
+@pytest.fixture(scope="module")
+def assignee():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    assignee = int(client.post("/auth/signup", json=user_data).text)
+    response = client.post("/tasks/add-tasks", json=[
+        {"task_description": f"Compressed task {i}", "assignee": assignee,
+         "due_date": DUE_DATE}
+        for i in range(50)
+    ])
+    assert response.status_code == 201
+    return assignee
+
+
+def test_listing_is_compressed(assignee):
+    response = client.get("/tasks/tasks-list", params={"assignee": assignee},
+                          headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    assert len(response.json()) == 50
+
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    response = client.get("/tasks/tasks-list", params={"assignee": assignee},
+                          headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_stream_is_compressed(assignee):
+    with client.stream("GET", "/tasks/tasks-list",
+                       params={"assignee": assignee, "stream": "true"},
+                       headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["Content-Encoding"] == "gzip"
+        body = gzip.decompress(b"".join(response.iter_raw()))
+    assert len(body.splitlines()) == 50
+
+
+def test_small_response_is_not_compressed():
+    response = client.get("/service/pool-stats", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+
+    response = client.get("/auth/users", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
@@ -0,0 +1,99 @@
+import asyncio
+import json
+from datetime import date
+
+import pytest
+
+from app.dayoff import DayOffCalendar, DayOffProvider, FileProvider
+
+# Годы, которые календарь тестов запрашивает у провайдера
+YEARS = range(2000, 2100)
+
+
+class CountingProvider(DayOffProvider):
+    def __init__(self, delay: float = 0):
+        self.calls = 0
+        self.delay = delay
+
+    async def fetch_year(self, year):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return await FileProvider("missing.json").fetch_year(year)
+
+
+class FailingProvider(DayOffProvider):
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch_year(self, year):
+        self.calls += 1
+        raise ValueError("provider is down")
+
+
+def test_year_is_fetched_once_and_persisted(tmp_path):
+    cache_path = str(tmp_path / "dayoff.json")
+    provider = CountingProvider()
+    calendar = DayOffCalendar(cache_path=cache_path, timeout=1, years=YEARS)
+    calendar.provider = provider
+
+    async def lookups():
+        return await asyncio.gather(calendar.is_day_off(date(2025, 5, 17)),
+                                    calendar.is_day_off(date(2025, 5, 19)))
+
+    assert asyncio.run(lookups()) == [True, False]
+    assert provider.calls == 1
+
+    restored = DayOffCalendar(cache_path=cache_path, timeout=1, years=YEARS)
+    assert asyncio.run(restored.is_day_off(date(2025, 5, 17))) is True
+
+
+def test_slow_provider_degrades_to_none():
+    calendar = DayOffCalendar(cache_path=None, timeout=0.01, years=YEARS)
+    calendar.provider = CountingProvider(delay=0.2)
+
+    async def lookup_twice():
+        first = await calendar.is_day_off(date(2025, 5, 17))
+        await asyncio.sleep(0.3)
+        second = await calendar.is_day_off(date(2025, 5, 17))
+        return first, second
+
+    assert asyncio.run(lookup_twice()) == (None, True)
+    assert calendar.provider.calls == 1
+
+
+def test_failed_year_is_not_refetched_until_retry():
+    calendar = DayOffCalendar(cache_path=None, timeout=1, retry_after=60, years=YEARS)
+    calendar.provider = FailingProvider()
+
+    async def lookup_twice():
+        return [await calendar.is_day_off(date(2025, 5, 17)) for _ in range(2)]
+
+    assert asyncio.run(lookup_twice()) == [None, None]
+    assert calendar.provider.calls == 1
+
+    calendar.retry_after = 0
+    assert asyncio.run(calendar.is_day_off(date(2025, 5, 17))) is None
+    assert calendar.provider.calls == 2
+
+
+def test_years_outside_range_are_not_fetched():
+    calendar = DayOffCalendar(cache_path=None, timeout=1, years=YEARS)
+    calendar.provider = CountingProvider()
+    assert asyncio.run(calendar.is_day_off(date(1, 1, 1))) is None
+    assert calendar.provider.calls == 0
+
+
+def test_file_provider(tmp_path):
+    path = tmp_path / "calendar.json"
+    path.write_text(json.dumps({"2025": ["2025-05-19"]}))
+    days = asyncio.run(FileProvider(str(path)).fetch_year(2025))
+    assert days[date(2025, 5, 19).timetuple().tm_yday - 1] is True
+    assert days[date(2025, 5, 17).timetuple().tm_yday - 1] is False
+
+
+def test_incomplete_provider_is_rejected():
+    class NoFetchProvider(DayOffProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        NoFetchProvider()
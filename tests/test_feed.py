@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import asyncpg
+from fastapi.testclient import TestClient
+import faker
+from app.config import settings
+from app.feed import FeedHub, OVERFLOW, RESET, bulk_event
+from app.main import app
+
+
+client = TestClient(app)
+fake = faker.Faker()
+
+
+def make_event(seq, assignee, project=None, previous=None):
+    event = {"seq": seq, "type": "updated",
+             "task": {"task_id": seq, "assignee": assignee, "project": project}}
+    if previous is not None:
+        event["previous"] = previous
+    return json.dumps(event)
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_hub_filters_by_assignee_and_previous_assignee():
+    hub = FeedHub(buffer_size=10, queue_size=10)
+    subscription = hub.subscribe(assignee=1)
+    hub.dispatch(make_event(1, assignee=1))
+    hub.dispatch(make_event(2, assignee=2))
+    hub.dispatch(make_event(3, assignee=2, previous={"assignee": 1, "project": None}))
+    assert [event["seq"] for event in drain(subscription)] == [1, 3]
+
+
+def test_hub_resumes_by_position_in_history():
+    hub = FeedHub(buffer_size=3, queue_size=10)
+    # Номера приходят в порядке фиксации транзакций, а не по возрастанию
+    for seq in (1, 3, 2, 4):
+        hub.dispatch(make_event(seq, assignee=1))
+    assert [event["seq"] for event in drain(hub.subscribe(since=3))] == [2, 4]
+    assert drain(hub.subscribe(since=1)) == [RESET]
+
+
+def test_hub_bounds_subscription_queue():
+    hub = FeedHub(buffer_size=10, queue_size=2)
+    subscription = hub.subscribe()
+    for seq in range(1, 4):
+        hub.dispatch(make_event(seq, assignee=1))
+    assert drain(subscription) == [OVERFLOW]
+
+
+def test_listener_reconnects_after_unexpected_error(monkeypatch):
+    attempts = []
+
+    async def connect(**kwargs):
+        attempts.append(kwargs)
+        raise asyncpg.InterfaceError("connection is closed")
+
+    monkeypatch.setattr(asyncpg, "connect", connect)
+
+    async def scenario():
+        hub = FeedHub(buffer_size=10, queue_size=10)
+        subscription = hub.subscribe()
+        await hub.start()
+        try:
+            while len(attempts) < 2:
+                await asyncio.sleep(0.05)
+        finally:
+            await hub.stop()
+        return drain(subscription)
+
+    assert RESET in asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+
+def test_bulk_event_matches_affected_subscribers():
+    event = bulk_event([json.loads(make_event(1, assignee=1, project=5)),
+                        json.loads(make_event(2, assignee=2, previous={"assignee": 3,
+                                                                       "project": None}))])
+    assert event == {"type": "bulk", "action": "updated", "count": 2,
+                     "assignees": [1, 2, 3], "projects": [None, 5]}
+    hub = FeedHub(buffer_size=10, queue_size=10)
+    matching = [hub.subscribe(assignee=3), hub.subscribe(project=5), hub.subscribe()]
+    other = [hub.subscribe(assignee=4), hub.subscribe(project=6)]
+    hub.dispatch(json.dumps({"seq": 1, **event}))
+    assert all(len(drain(subscription)) == 1 for subscription in matching)
+    assert all(drain(subscription) == [] for subscription in other)
+
+
+def test_websocket_feed_coalesces_bulk_requests(monkeypatch):
+    monkeypatch.setattr(settings, "feed_bulk_threshold", 2)
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    assignee = int(client.post("/auth/signup", json=user_data).text)
+    with client.websocket_connect(f"/tasks/feed/ws?assignee={assignee}") as websocket:
+        created = client.post("/tasks/add-tasks", json=[
+            {"task_description": f"Bulk feed task {i}", "assignee": assignee}
+            for i in range(3)
+        ]).json()["created"]
+        client.post("/tasks/delete-tasks", json=[task["task_id"] for task in created])
+
+        event = websocket.receive_json()
+        assert (event["type"], event["action"], event["count"]) == ("bulk", "created", 3)
+        assert event["assignees"] == [assignee]
+        event = websocket.receive_json()
+        assert (event["type"], event["action"], event["count"]) == ("bulk", "deleted", 3)
+
+
+def test_websocket_feed():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    assignee = int(client.post("/auth/signup", json=user_data).text)
+    with client.websocket_connect(f"/tasks/feed/ws?assignee={assignee}") as websocket:
+        task_id = client.post("/tasks/add-task", json={
+            "task_description": "Test task",
+            "assignee": assignee,
+        }).json()["task_id"]
+        client.patch("/tasks/update-task", params={"task_id": task_id},
+                     json={"assignee": 1})
+        client.delete(f"/tasks/delete-task/{task_id}")
+
+        created = websocket.receive_json()
+        assert created["type"] == "created"
+        assert created["task"]["task_id"] == task_id
+        # Задание ушло другому исполнителю, но подписчик узнает об этом
+        updated = websocket.receive_json()
+        assert updated["type"] == "updated"
+        assert updated["previous"]["assignee"] == assignee
+        assert updated["seq"] > created["seq"]
+
+    with client.websocket_connect(f"/tasks/feed/ws?since={created['seq']}") as websocket:
+        assert websocket.receive_json()["seq"] == updated["seq"]
+        assert websocket.receive_json()["type"] == "deleted"
@@ -0,0 +1,61 @@
+from fastapi.testclient import TestClient
+import faker
+from passlib.context import CryptContext
+from sqlalchemy import update
+from sqlmodel import select
+
+from app import db
+from app.auth import hashing
+from app.config import settings
+from app.main import app
+from app.schemas.task import User
+
+
+client = TestClient(app)
+fake = faker.Faker()
+
+
+def signup() -> dict:
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    user_data["user_id"] = client.post("/auth/signup", json=user_data).json()
+    return user_data
+
+
+def stored_hash(user_id: int) -> str:
+    # Синхронный движок: асинхронные соединения принадлежат event loop клиента
+    with db.get_engine().connect() as connection:
+        return connection.execute(select(User.password).where(User.user_id == user_id)).scalar_one()
+
+
+def test_hash_uses_configured_rounds(monkeypatch):
+    monkeypatch.setattr(hashing, "_pwd_context", None)
+    monkeypatch.setattr(settings, "bcrypt_rounds", 5)
+    assert hashing._hash("secret").startswith("$2b$05$")
+
+
+def test_overloaded_pool_returns_503(monkeypatch):
+    monkeypatch.setattr(hashing, "_pending", settings.password_hash_max_pending)
+    response = client.post("/auth/signup", json={
+        "name": fake.name(), "email": fake.email(), "password": fake.password()
+    })
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_login_rehashes_password_with_other_rounds():
+    user = signup()
+    cheap_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(user["password"])
+    with db.get_engine().begin() as connection:
+        connection.execute(update(User).where(User.user_id == user["user_id"])
+                           .values(password=cheap_hash))
+
+    response = client.post("/auth/login", data={"username": user["email"],
+                                                "password": user["password"]})
+    assert response.status_code == 200
+    new_hash = stored_hash(user["user_id"])
+    assert new_hash != cheap_hash
+    assert new_hash.startswith(f"$2b${settings.bcrypt_rounds:02d}$")
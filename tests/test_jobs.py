@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import faker
+import pytest
+from sqlalchemy import insert
+from sqlmodel import select
+
+from app import db, jobs
+from app.config import settings
+from app.schemas.task import Job, TaskTombstone
+
+
+fake = faker.Faker()
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    # Только обработчики теста: встроенные периодические задания не запускаются
+    registry = {}
+    monkeypatch.setattr(jobs, "HANDLERS", registry)
+    monkeypatch.setattr(settings, "jobs_retry_base_seconds", 0.05)
+    return registry
+
+
+def run(scenario):
+    async def with_dispose():
+        try:
+            return await scenario()
+        finally:
+            await db.dispose()
+
+    return asyncio.run(with_dispose())
+
+
+async def enqueue(kind: str, count: int = 1, **kwargs) -> None:
+    async with db.async_session() as session:
+        for i in range(count):
+            await jobs.enqueue(session, kind, {"n": i}, **kwargs)
+        await session.commit()
+
+
+async def job_rows(kind: str) -> list:
+    async with db.async_session() as session:
+        return (await session.execute(select(Job).where(Job.kind == kind))).scalars().all()
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_jobs_run_with_retries_and_kind_limit(handlers):
+    kind, flaky_kind = f"test-{fake.uuid4()}", f"test-flaky-{fake.uuid4()}"
+    done, active, peak, failures = [], [0], [0], []
+
+    async def handler(payload):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.02)
+        active[0] -= 1
+        done.append(payload["n"])
+
+    async def flaky(payload):
+        failures.append(payload["n"])
+        if len(failures) < 2:
+            raise RuntimeError("temporary failure")
+
+    handlers[kind] = jobs.Handler(handler, concurrency=2)
+    handlers[flaky_kind] = jobs.Handler(flaky)
+
+    async def scenario():
+        await enqueue(kind, 6)
+        await enqueue(flaky_kind, max_attempts=3)
+        runner = jobs.JobRunner(concurrency=4, poll_interval=0.05)
+        await runner.start()
+        try:
+            await wait_for(lambda: len(done) == 6 and len(failures) == 2)
+            await asyncio.sleep(0.1)
+        finally:
+            await runner.stop()
+        return await job_rows(kind), await job_rows(flaky_kind)
+
+    remaining, flaky_remaining = run(scenario)
+    assert sorted(done) == list(range(6))
+    assert peak[0] <= 2
+    assert remaining == [] and flaky_remaining == []
+
+
+def test_failed_job_is_kept_and_key_is_released(handlers):
+    kind = f"test-{fake.uuid4()}"
+
+    async def broken(payload):
+        raise ValueError("broken")
+
+    handlers[kind] = jobs.Handler(broken)
+
+    async def scenario():
+        await enqueue(kind, key=kind, max_attempts=1)
+        # Незавершенное задание с тем же ключом уже есть
+        await enqueue(kind, key=kind, max_attempts=1)
+        assert len(await job_rows(kind)) == 1
+        runner = jobs.JobRunner(poll_interval=0.05)
+        await runner.start()
+        try:
+            for _ in range(100):
+                rows = await job_rows(kind)
+                if rows[0].failed_at is not None:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await runner.stop()
+        await enqueue(kind, key=kind, max_attempts=1)
+        return await job_rows(kind)
+
+    rows = run(scenario)
+    assert len(rows) == 2
+    failed = next(row for row in rows if row.failed_at is not None)
+    assert failed.key is None and failed.last_error == "ValueError: broken"
+
+
+def test_concurrent_claims_do_not_overlap():
+    kind = f"test-{fake.uuid4()}"
+
+    async def scenario():
+        await enqueue(kind, 10)
+
+        async def claim():
+            async with db.async_session() as session:
+                return [job.job_id for job in await jobs.claim(session, 4, [kind])]
+
+        return await asyncio.gather(*(claim() for _ in range(4)))
+
+    claimed = run(scenario)
+    ids = [job_id for batch in claimed for job_id in batch]
+    assert len(ids) == len(set(ids)) == 10
+
+
+def test_purge_tombstones():
+    task_id = fake.random_int(10 ** 8, 10 ** 9)
+    old = datetime.now(timezone.utc) - timedelta(days=settings.sync_tombstone_retention_days + 1)
+
+    async def scenario():
+        async with db.async_session() as session:
+            await session.execute(insert(TaskTombstone), [
+                {"task_id": task_id, "assignee": 1, "deleted_at": old},
+                {"task_id": task_id, "assignee": 2},
+            ])
+            await session.commit()
+        await jobs.purge_tombstones({"batch": 1})
+        async with db.async_session() as session:
+            return (await session.execute(
+                select(TaskTombstone.assignee).where(TaskTombstone.task_id == task_id)
+            )).scalars().all()
+
+    assert run(scenario) == [2]
@@ -0,0 +1,80 @@
+from fastapi.testclient import TestClient
+import faker
+from app.main import app
+
+
+client = TestClient(app)
+fake = faker.Faker()
+
+
+def create_user():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password(),
+        "grade": 10
+    }
+    return int(client.post("/auth/signup", json=user_data).text)
+
+
+def create_project():
+    response = client.post("/projects/add-project",
+                           json={"project_name": fake.catch_phrase()})
+    assert response.status_code == 201
+    return response.json()["project_id"]
+
+
+def test_project_crud():
+    project_id = create_project()
+    response = client.patch("/projects/update-project", params={"project_id": project_id},
+                            json={"project_description": "Описание"})
+    assert response.status_code == 202
+    assert response.json()["project_description"] == "Описание"
+
+    response = client.get(f"/projects/{project_id}")
+    assert response.status_code == 200
+    assert response.json()["project_description"] == "Описание"
+
+    response = client.get("/projects/projects-list", params={"after": project_id - 1, "limit": 1})
+    assert response.status_code == 200
+    assert response.json()[0]["project_id"] == project_id
+
+    response = client.delete(f"/projects/delete-project/{project_id}")
+    assert response.status_code == 200
+    assert client.get(f"/projects/{project_id}").status_code == 404
+
+
+def test_project_stats():
+    project_id = create_project()
+    first, second = create_user(), create_user()
+    task_ids = []
+    for assignee, grade in ((first, 3), (first, 3), (first, None), (second, 5)):
+        response = client.post("/tasks/add-task", json={
+            "task_description": "Test task",
+            "assignee": assignee,
+            "grade": grade,
+            "project": project_id,
+        })
+        assert response.status_code == 201
+        task_ids.append(response.json()["task_id"])
+
+    stats = client.get(f"/projects/{project_id}/stats").json()
+    assert stats["tasks"] == 4
+    assert stats["overdue"] == 0
+    assert stats["by_grade"] == [{"grade": 3, "tasks": 2, "overdue": 0},
+                                 {"grade": 5, "tasks": 1, "overdue": 0},
+                                 {"grade": None, "tasks": 1, "overdue": 0}]
+    assert stats["by_assignee"] == [{"assignee": first, "tasks": 3, "overdue": 0},
+                                    {"assignee": second, "tasks": 1, "overdue": 0}]
+
+    # Сводка следует за изменением и удалением заданий
+    client.patch("/tasks/update-task", params={"task_id": task_ids[0]},
+                 json={"assignee": second})
+    client.delete(f"/tasks/delete-task/{task_ids[2]}")
+    stats = client.get(f"/projects/{project_id}/stats").json()
+    assert stats["tasks"] == 3
+    assert stats["by_assignee"] == [{"assignee": second, "tasks": 2, "overdue": 0},
+                                    {"assignee": first, "tasks": 1, "overdue": 0}]
+
+    response = client.delete(f"/projects/delete-project/{project_id}")
+    assert response.status_code == 409
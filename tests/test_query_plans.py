@@ -0,0 +1,85 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import select
+
+from app.db import IS_POSTGRES, engine
+from app.routes import task as task_routes
+from app.schemas.task import Task, TaskTombstone, User
+
+
+pytestmark = pytest.mark.skipif(not IS_POSTGRES, reason="query plans are checked on Postgres")
+
+TASKS = 100_000
+USERS = 1_000
+PROJECTS = 100
+
+
+def seed(conn):
+    """
+    Заполнить таблицы внутри транзакции теста, которая затем откатывается
+    """
+    first_user = min(conn.execute(text(
+        'INSERT INTO "user" (email, name, grade) '
+        "SELECT 'plan-' || g || '@example.com', 'plan', g % 10 + 1 "
+        "FROM generate_series(1, :n) g RETURNING user_id"
+    ), {"n": USERS}).scalars().all())
+    first_project = min(conn.execute(text(
+        "INSERT INTO project (project_name) SELECT 'plan' FROM generate_series(1, :n) "
+        "RETURNING project_id"
+    ), {"n": PROJECTS}).scalars().all())
+    conn.execute(text(
+        "INSERT INTO task (task_description, assignee, due_date, grade, project) "
+        "SELECT 'plan ' || g, :first_user + g % :users, DATE '2025-01-01' + g % 365, g % 10 + 1, "
+        "CASE WHEN g % 5 = 0 THEN NULL ELSE :first_project + g % :projects END "
+        "FROM generate_series(1, :n) g"
+    ), {"n": TASKS, "users": USERS, "projects": PROJECTS,
+        "first_user": first_user, "first_project": first_project})
+    conn.execute(text(
+        "INSERT INTO task_tombstone (task_id, assignee, deleted_at) "
+        "SELECT g, :first_user + g % :users, now() - g * INTERVAL '1 minute' "
+        "FROM generate_series(1, :n) g"
+    ), {"n": TASKS, "users": USERS, "first_user": first_user})
+    for table in ("task", '"user"', "project", "task_tombstone"):
+        conn.execute(text(f"ANALYZE {table}"))
+    return first_user, first_project
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan["Node Type"] == "Seq Scan":
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def test_route_queries_use_indexes():
+    with engine.connect() as conn:
+        user_id, project_id = seed(conn)
+        day = date(2025, 6, 1)
+        statements = {
+            "tasks-list": task_routes._tasks_list_statement(after=TASKS // 2).limit(100),
+            "tasks-list?assignee / my-tasks": task_routes._tasks_list_statement(assignee=user_id),
+            "tasks-list?project": task_routes._tasks_list_statement(project=project_id).limit(100),
+            "tasks-list?grade_min&due_from": task_routes._tasks_list_statement(
+                grade_min=5, due_from=day).limit(100),
+            "tasks-for-day": task_routes._tasks_for_days_statement(day, day),
+            "tasks-for-day?view=week": task_routes._tasks_for_days_statement(day, date(2025, 6, 7)),
+            "changes": task_routes._tasks_list_statement(assignee=user_id).where(
+                Task.updated_at > datetime(2025, 6, 1, tzinfo=timezone.utc)),
+            "changes (tombstones)": select(TaskTombstone.task_id).where(
+                TaskTombstone.assignee == user_id,
+                TaskTombstone.deleted_at > datetime(2025, 6, 1, tzinfo=timezone.utc)),
+            "get-candidate": task_routes._workload_statement(10).limit(1),
+            "search": task_routes._search_statement("4242").limit(20),
+            "update-task / delete-task": select(Task).where(Task.task_id == TASKS // 2),
+            "login": select(User).where(User.email == "plan-1@example.com"),
+        }
+        for name, statement in statements.items():
+            sql = statement.compile(dialect=engine.dialect,
+                                    compile_kwargs={"literal_binds": True})
+            plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar_one()
+            assert seq_scans(plan[0]["Plan"]) == [], f"{name} falls back to a sequential scan"
+        conn.rollback()
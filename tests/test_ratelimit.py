@@ -0,0 +1,92 @@
+import asyncio
+
+import faker
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.ratelimit import MemoryBackend, rate_limiter
+
+
+client = TestClient(app)
+fake = faker.Faker()
+
+
+def test_token_bucket(tmp_path):
+    backend = MemoryBackend(str(tmp_path), shards=4, slots=8)
+    # Второй экземпляр с тем же файлом - как другой воркер
+    other_worker = MemoryBackend(str(tmp_path), shards=4, slots=8)
+
+    async def scenario():
+        assert await backend.take("a", capacity=2, rate=0.1) == 0
+        assert await other_worker.take("a", capacity=2, rate=0.1) == 0
+        retry_after = await backend.take("a", capacity=2, rate=0.1)
+        assert 0 < retry_after <= 10
+        assert await backend.take("b", capacity=2, rate=0.1) == 0
+
+    asyncio.run(scenario())
+
+
+def test_lockout_backoff(tmp_path):
+    backend = MemoryBackend(str(tmp_path), shards=4, slots=8)
+    args = (3, 10.0, 60.0, 900.0)
+
+    async def scenario():
+        assert await backend.add_failure("user", *args) == 0
+        assert await backend.add_failure("user", *args) == 0
+        assert await backend.locked_for("user", *args) == 0
+        assert await backend.add_failure("user", *args) == 10
+        assert await backend.add_failure("user", *args) == 20
+        assert 0 < await backend.locked_for("user", *args) <= 20
+        await backend.reset("user")
+        assert await backend.locked_for("user", *args) == 0
+
+    asyncio.run(scenario())
+
+
+def test_eviction_keeps_table_bounded(tmp_path):
+    backend = MemoryBackend(str(tmp_path), shards=1, slots=4)
+
+    async def scenario():
+        for i in range(100):
+            assert await backend.take(f"ip-{i}", capacity=1, rate=0.01) == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def limited(tmp_path, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_backend", MemoryBackend(str(tmp_path), 4, 64))
+    monkeypatch.setattr(rate_limiter, "_backend_ready", True)
+    monkeypatch.setattr(settings, "login_lockout_threshold", 2)
+    monkeypatch.setattr(settings, "login_account_burst", 10)
+    monkeypatch.setattr(settings, "login_ip_burst", 6)
+
+
+def test_login_lockout_and_generic_errors(limited):
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    client.post("/auth/signup", json=user_data)
+
+    unknown = client.post("/auth/login", data={"username": fake.email(), "password": "x"})
+    wrong = client.post("/auth/login", data={"username": user_data["email"], "password": "x"})
+    assert unknown.status_code == wrong.status_code == 401
+    assert unknown.json() == wrong.json()
+
+    response = client.post("/auth/login", data={"username": user_data["email"], "password": "x"})
+    assert response.status_code == 401
+    # Блокировка действует и на верный пароль
+    response = client.post("/auth/login", data={"username": user_data["email"],
+                                                "password": user_data["password"]})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_login_ip_bucket(limited):
+    statuses = [client.post("/auth/login", data={"username": fake.email(), "password": "x"})
+                .status_code for _ in range(7)]
+    assert statuses == [401] * 6 + [429]
@@ -0,0 +1,164 @@
+import asyncio
+from datetime import date, timedelta
+
+import faker
+import pytest
+from sqlalchemy import delete, insert, text, update
+from sqlmodel import select
+
+from app import db, reminders
+from app.config import settings
+from app.feed import Subscription
+from app.schemas.task import Job, ReminderWatermark, Task, TaskReminder, User
+
+
+fake = faker.Faker()
+# Дата сканирования далеко впереди, чтобы задания теста не смешивались
+# с заданиями других тестов
+TODAY = date.today() + timedelta(days=400)
+
+
+def run(scenario):
+    async def with_dispose():
+        try:
+            return await scenario()
+        finally:
+            await db.dispose()
+
+    return asyncio.run(with_dispose())
+
+
+async def reset_watermarks():
+    async with db.async_session() as session:
+        await session.execute(delete(ReminderWatermark))
+        await session.commit()
+
+
+async def sent(task_ids) -> set:
+    async with db.async_session() as session:
+        rows = (await session.execute(
+            select(TaskReminder.task_id, TaskReminder.kind)
+            .where(TaskReminder.task_id.in_(task_ids))
+        )).all()
+    return set(rows)
+
+
+async def queued(assignee: int) -> list:
+    """
+    Задания из рассылок исполнителю: (вид, task_id) в порядке постановки
+    """
+    async with db.async_session() as session:
+        jobs = (await session.execute(
+            select(Job.payload).where(Job.kind == "reminders.send").order_by(Job.job_id)
+        )).scalars().all()
+    return [(job["kind"], task_id) for job in jobs if job["assignee"] == assignee
+            for task_id in job["task_ids"]]
+
+
+def add_tasks(assignee: int, *days: int) -> list[int]:
+    async def scenario():
+        async with db.async_session() as session:
+            task_ids = (await session.execute(
+                insert(Task).returning(Task.task_id),
+                [{"task_description": "Reminder task", "assignee": assignee,
+                  "due_date": TODAY + timedelta(days=day)} for day in days]
+            )).scalars().all()
+            await session.commit()
+        return list(task_ids)
+
+    return run(scenario)
+
+
+def move_task(task_id: int, day: int) -> None:
+    async def scenario():
+        async with db.async_session() as session:
+            await session.execute(update(Task).where(Task.task_id == task_id)
+                                  .values(due_date=TODAY + timedelta(days=day)))
+            await session.commit()
+
+    run(scenario)
+
+
+async def add_user() -> int:
+    async with db.async_session() as session:
+        user = User(name=fake.name(), email=fake.email())
+        session.add(user)
+        await session.commit()
+        return user.user_id
+
+
+@pytest.fixture
+def assignee(monkeypatch):
+    monkeypatch.setattr(settings, "reminder_batch_size", 2)
+    monkeypatch.setattr(settings, "reminder_due_soon_days", 1)
+    run(reset_watermarks)
+    yield run(add_user)
+    run(reset_watermarks)
+
+
+def test_scan_reminds_once_per_threshold(assignee):
+    due_today, due_tomorrow, overdue, later = add_tasks(assignee, 0, 1, -1, 5)
+
+    run(lambda: reminders.scan(TODAY))
+    assert run(lambda: sent([due_today, due_tomorrow, overdue, later])) == {
+        (due_today, "due_soon"), (due_tomorrow, "due_soon"), (overdue, "overdue")}
+    assert sorted(run(lambda: queued(assignee))) == [
+        ("due_soon", due_today), ("due_soon", due_tomorrow), ("overdue", overdue)]
+
+    # Повторный проход ничего не отправляет, а новое задание внутри окна
+    # находится, хотя обход индекса сроков уже прошел его дату
+    new_task, = add_tasks(assignee, 0)
+    run(lambda: reminders.scan(TODAY))
+    assert sorted(run(lambda: queued(assignee))) == [
+        ("due_soon", due_today), ("due_soon", due_tomorrow), ("due_soon", new_task),
+        ("overdue", overdue)]
+
+    run(lambda: reminders.scan(TODAY + timedelta(days=4)))
+    assert (later, "due_soon") in run(lambda: sent([later]))
+
+
+def test_scan_reminds_moved_due_dates(assignee):
+    overdue, tomorrow, later = add_tasks(assignee, -1, 1, 5)
+    run(lambda: reminders.scan(TODAY))
+    assert sorted(run(lambda: queued(assignee))) == [("due_soon", tomorrow), ("overdue", overdue)]
+
+    # Срок перенесен внутрь окна позади позиции обхода индекса сроков
+    # и с одной прошедшей даты на другую
+    move_task(later, 0)
+    move_task(overdue, -3)
+    run(lambda: reminders.scan(TODAY))
+    assert sorted(run(lambda: queued(assignee))) == [
+        ("due_soon", tomorrow), ("due_soon", later), ("overdue", overdue), ("overdue", overdue)]
+
+
+def test_scan_does_not_repeat_reminders_for_long_overdue_tasks(assignee):
+    long_overdue, = add_tasks(assignee, -30)
+    run(lambda: reminders.scan(TODAY))
+
+    # Отметка об отправке давно удалена, но правка задания не должна
+    # приводить к повторному напоминанию
+    move_task(long_overdue, -31)
+    run(lambda: reminders.scan(TODAY))
+    assert run(lambda: queued(assignee)) == []
+
+
+def test_scan_skips_when_another_worker_scans(assignee):
+    async def scenario():
+        async with db.async_session() as holder, db.async_session() as session:
+            await holder.execute(text("SELECT pg_advisory_xact_lock(:a, :b)"),
+                                 {"a": reminders.LOCK_CLASS, "b": 0})
+            result = await reminders.scan_step(session, "due_soon", TODAY)
+            await holder.rollback()
+            return result
+
+    if not db.is_postgres():
+        pytest.skip("advisory locks are Postgres-only")
+    assert run(scenario) is None
+
+
+def test_reminder_event_is_routed_to_assignee():
+    event = {"type": "reminder", "reminder": "due_soon", "assignee": 7, "tasks": []}
+    assert Subscription(7, None, 10).matches(event)
+    assert Subscription(None, None, 10).matches(event)
+    assert not Subscription(8, None, 10).matches(event)
+    assert not Subscription(None, 3, 10).matches(event)
@@ -0,0 +1,41 @@
+from app.search import SearchIndex, highlight, parse_query
+
+
+def make_index():
+    index = SearchIndex()
+    index.update([
+        (1, "Fix login page"),
+        (2, "Fix the search page, search is slow"),
+        (3, "Write report"),
+        (4, "Починить поиск"),
+    ])
+    return index
+
+
+def test_parse_query_and_highlight():
+    assert parse_query('Fix "search page" -login') == (["fix", "search", "page"], ["login"])
+    assert highlight("Fix the Search page", ["search", "fix"]) == "<b>Fix</b> the <b>Search</b> page"
+    assert highlight('<script>"quot"</script>', ["script", "quot"]) == (
+        "&lt;<b>script</b>&gt;&quot;<b>quot</b>&quot;&lt;/<b>script</b>&gt;")
+
+
+def test_search_ranks_and_filters():
+    index = make_index()
+    assert [task_id for _, task_id in index.search("fix")] == [1, 2]
+    assert [task_id for _, task_id in index.search("search")] == [2]
+    assert [task_id for _, task_id in index.search("fix -login")] == [2]
+    assert [task_id for _, task_id in index.search("поиск")] == [4]
+    assert index.search("fix missing") == []
+    assert sorted(task_id for _, task_id in index.search("-fix")) == [3, 4]
+
+
+def test_search_pagination_and_updates():
+    index = make_index()
+    index.update([(5, "fix"), (6, "fix")])
+    ranked = index.search("fix")
+    assert index.search("fix", after=ranked[1]) == ranked[2:]
+
+    index.update([(1, "Write tests")])
+    index.remove([2])
+    assert [task_id for _, task_id in index.search("fix")] == [6, 5]
+    assert [task_id for _, task_id in index.search("write")] == [3, 1]
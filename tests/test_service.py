@@ -0,0 +1,26 @@
+from fastapi.testclient import TestClient
+from app import db
+from app.main import app
+
+
+client = TestClient(app)
+
+
+def test_pool_stats():
+    client.get("/auth/users")
+    had_engine = db._engine is not None
+    response = client.get("/service/pool-stats")
+    assert response.status_code == 200
+    stats = response.json()["async_engine"]
+    assert stats["checked_out"] >= 0
+    assert stats["idle"] >= 1
+    # Синхронный движок не создается ради статистики
+    assert ("engine" in response.json()) == had_engine == (db._engine is not None)
+
+
+def test_metrics():
+    client.get("/auth/users")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'http_request_duration_seconds_count{method="GET",route="/auth/users"' in response.text
+    assert 'http_request_db_statements_sum{method="GET",route="/auth/users"}' in response.text
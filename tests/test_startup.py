@@ -0,0 +1,70 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from benchmarks.import_time import measure_import
+
+
+client = TestClient(app)
+
+# Бюджет времени импорта app.main в холодном интерпретаторе, мс: обычно
+# 1000-1250 мс (python -m benchmarks.import_time), запас ~30% на шум
+# загруженной машины. Библиотеки, которые должны импортироваться лениво,
+# отдельно проверяет test_import_is_lazy
+IMPORT_TIME_BUDGET_MS = int(os.environ.get("IMPORT_TIME_BUDGET_MS", "1600"))
+
+
+def test_import_is_lazy():
+    # Импорт проходит без .env, не создает движки и не тянет
+    # библиотеки, нужные только после запуска
+    measure_import(code="\n".join([
+        "import sys",
+        "from app import config, db",
+        "assert config._settings is None",
+        "assert db._engine is None and db._async_engine is None",
+        "loaded = {'httpx', 'passlib', 'asyncpg', 'psycopg2'} & set(sys.modules)",
+        "assert not loaded, loaded",
+    ]))
+
+
+def test_import_time_budget():
+    # Наименьшее из замеров: посторонняя нагрузка только увеличивает время
+    totals = [measure_import()["app.main"][1] / 1000 for _ in range(3)]
+    assert min(totals) < IMPORT_TIME_BUDGET_MS, totals
+
+
+def test_warm_up_opens_pool():
+    response = client.get("/service/pool-stats")
+    assert response.status_code == 200
+    assert response.json()["async_engine"]["idle"] >= 2
+
+
+def test_failed_startup_still_cleans_up(monkeypatch):
+    from app import db, feed, jobs, main, metrics
+    from app.auth import hashing
+
+    cleaned = []
+
+    async def broken_warm_up(app):
+        raise RuntimeError("warm-up failed")
+
+    def recorder(name):
+        async def record():
+            cleaned.append(name)
+        return record
+
+    monkeypatch.setattr(settings, "warmup_enabled", True)
+    monkeypatch.setattr(main, "warm_up", broken_warm_up)
+    monkeypatch.setattr(hashing, "shutdown", lambda: cleaned.append("hashing"))
+    monkeypatch.setattr(metrics, "mark_process_dead", lambda: cleaned.append("metrics"))
+    # Службы модуля уже запущены lifespan клиента этого модуля
+    monkeypatch.setattr(jobs.runner, "stop", recorder("jobs"))
+    monkeypatch.setattr(feed.hub, "stop", recorder("feed"))
+    monkeypatch.setattr(db, "dispose", recorder("db"))
+    with pytest.raises(RuntimeError):
+        with TestClient(app):
+            pass
+    assert cleaned == ["jobs", "feed", "hashing", "metrics", "db"]
@@ -1,3 +1,5 @@
+import json
+from datetime import date, timedelta
 from fastapi.testclient import TestClient
 import faker
 from app.main import app
@@ -5,6 +7,8 @@ from app.main import app
 
 client = TestClient(app)
 fake = faker.Faker()
+# Срок новых заданий не может быть в прошлом
+DUE_DATE = (date.today() + timedelta(days=30)).isoformat()
 
 client.fake_user_email = fake.email()
 client.fake_user_password = fake.password()
@@ -23,7 +27,7 @@ def test_add_task():
     task_data = {
         "task_description": "Test task",
         "assignee": 1,
-        "due_date": "2025-12-31",
+        "due_date": DUE_DATE,
     }
     response = client.post("/tasks/add-task", json=task_data)
     assert response.status_code == 201
@@ -40,7 +44,7 @@ def test_high_graded_task():
     task_data = {
         "task_description": "Test task",
         "assignee": 1,
-        "due_date": "2025-12-31",
+        "due_date": DUE_DATE,
     }
     response = client.post("/tasks/add-task", json=task_data)
     assert response.status_code == 201
@@ -58,7 +62,7 @@ def test_update_task():
     task_data = {
         "task_description": "Test task",
         "assignee": 1,
-        "due_date": "2025-12-31",
+        "due_date": DUE_DATE,
     }
     response = client.post("/tasks/add-task", json=task_data)
     task_id = response.json()["task_id"]
@@ -70,6 +74,40 @@ def test_update_task():
     assert response.json()["task_description"] == "Updated description"
 
 
+def test_update_task_if_match():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    new_assignee = int(client.post("/auth/signup", json=user_data).text)
+    task_data = {
+        "task_description": "Test task",
+        "assignee": 1,
+        "due_date": DUE_DATE,
+    }
+    response = client.post("/tasks/add-task", json=task_data)
+    task_id = response.json()["task_id"]
+    assert response.headers["ETag"] == '"1"'
+
+    # Исполнитель без заданий тоже подходит для переназначения
+    response = client.patch("/tasks/update-task", params={"task_id": task_id},
+                            json={"assignee": new_assignee}, headers={"If-Match": '"1"'})
+    assert response.status_code == 202
+    assert response.json()["assignee"] == new_assignee
+    assert response.json()["version"] == 2
+    assert response.headers["ETag"] == '"2"'
+
+    response = client.patch("/tasks/update-task", params={"task_id": task_id},
+                            json={"task_description": "Stale"}, headers={"If-Match": '"1"'})
+    assert response.status_code == 412
+    assert response.headers["ETag"] == '"2"'
+
+    response = client.patch("/tasks/update-task", params={"task_id": task_id},
+                            json={"project": 10 ** 9})
+    assert response.status_code == 404
+
+
 def test_my_tasks():
     user_data = {
         "name": fake.name(),
@@ -86,9 +124,349 @@ def test_my_tasks():
     task_data = {
         "task_description": "Test task",
         "assignee": int(signup_response.text),
-        "due_date": "2025-12-31",
+        "due_date": DUE_DATE,
     }
     client.post("/tasks/add-task", json=task_data)
     response = client.get("/tasks/my-tasks", headers=headers)
     assert response.status_code == 200
     assert len(response.json()) > 0
+
+
+def test_task_changes():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    assignee = int(client.post("/auth/signup", json=user_data).text)
+    response = client.post("/auth/login",
+                           data={"username": user_data["email"],
+                                 "password": user_data["password"]}
+                           )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    task_ids = [
+        client.post("/tasks/add-task", json={
+            "task_description": "Test task",
+            "assignee": assignee,
+            "due_date": DUE_DATE,
+        }).json()["task_id"]
+        for _ in range(3)
+    ]
+
+    response = client.get("/tasks/changes", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["full"] is True
+    assert [task["task_id"] for task in response.json()["changed"]] == task_ids
+    token = response.json()["token"]
+
+    client.patch("/tasks/update-task", params={"task_id": task_ids[0]},
+                 json={"task_description": "Updated"})
+    client.patch("/tasks/update-task", params={"task_id": task_ids[1]},
+                 json={"assignee": 1})
+    client.delete(f"/tasks/delete-task/{task_ids[2]}")
+
+    response = client.get("/tasks/changes", params={"since": token}, headers=headers)
+    assert response.status_code == 200
+    changes = response.json()
+    assert changes["full"] is False
+    assert [task["task_id"] for task in changes["changed"]] == [task_ids[0]]
+    assert changes["changed"][0]["task_description"] == "Updated"
+    assert changes["deleted"] == task_ids[1:]
+
+    response = client.get("/tasks/changes", params={"since": "invalid"}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_tasks_list_pagination():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    signup_response = client.post("/auth/signup", json=user_data)
+    assignee = int(signup_response.text)
+    for _ in range(3):
+        client.post("/tasks/add-task", json={
+            "task_description": "Test task",
+            "assignee": assignee,
+            "due_date": DUE_DATE,
+        })
+    response = client.get("/tasks/tasks-list",
+                          params={"assignee": assignee, "limit": 2})
+    assert response.status_code == 200
+    first_page = response.json()
+    assert len(first_page) == 2
+    cursor = response.headers["X-Next-Cursor"]
+    assert cursor == str(first_page[-1]["task_id"])
+
+    response = client.get("/tasks/tasks-list",
+                          params={"assignee": assignee, "limit": 2, "after": cursor})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert "X-Next-Cursor" not in response.headers
+    assert response.json()[0]["task_id"] > first_page[-1]["task_id"]
+
+
+def test_tasks_list_stream():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    signup_response = client.post("/auth/signup", json=user_data)
+    assignee = int(signup_response.text)
+    for _ in range(2):
+        client.post("/tasks/add-task", json={
+            "task_description": "Test task",
+            "assignee": assignee,
+            "due_date": DUE_DATE,
+        })
+    response = client.get("/tasks/tasks-list",
+                          params={"assignee": assignee, "stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert len(lines) == 2
+    assert all(json.loads(line)["assignee"] == assignee for line in lines)
+
+
+def test_get_candidates():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password(),
+        "grade": 10
+    }
+    client.post("/auth/signup", json=user_data)
+    response = client.get("/tasks/get-candidates/10", params={"k": 3})
+    assert response.status_code == 200
+    candidates = response.json()
+    assert 0 < len(candidates) <= 3
+    assert all(candidate["grade"] >= 10 for candidate in candidates)
+    loads = [candidate["load"] for candidate in candidates]
+    assert loads == sorted(loads)
+
+    response = client.get("/tasks/get-candidate/10")
+    assert response.status_code == 200
+    assert response.json()["user_id"] == candidates[0]["user_id"]
+
+
+def test_tasks_for_day():
+    response = client.get("/tasks/tasks-for-day", params={"due_date": "2025-12-31"})
+    assert response.status_code == 200
+    day = response.json()[0]
+    assert day["due_date"] == "2025-12-31"
+    assert day["is_day_off"] in (True, False, None)
+    assert all(task["due_date"] == "2025-12-31" for task in day["tasks"])
+
+
+def test_tasks_for_month():
+    response = client.get("/tasks/tasks-for-day",
+                          params={"due_date": "2025-12-31", "view": "month"})
+    assert response.status_code == 200
+    days = response.json()
+    assert len(days) == 31
+    assert days[0]["due_date"][-2:] == "01"
+    assert all(day["count"] == len(day["tasks"]) for day in days)
+
+
+def test_tasks_for_last_days_of_calendar():
+    response = client.get("/tasks/tasks-for-day",
+                          params={"due_date": "9999-12-31", "view": "month"})
+    assert response.status_code == 200
+    assert len(response.json()) == 31
+
+    response = client.get("/tasks/tasks-for-day",
+                          params={"due_date": "9999-12-31", "view": "week"})
+    assert response.status_code == 200
+    # Неделя обрезана по последнему дню календаря (пятница)
+    assert [day["due_date"] for day in response.json()] == [
+        "9999-12-27", "9999-12-28", "9999-12-29", "9999-12-30", "9999-12-31"]
+
+
+def test_tasks_for_range():
+    response = client.get("/tasks/tasks-for-day",
+                          params={"from": "2025-06-01", "to": "2025-06-02"})
+    assert response.status_code == 200
+    days = response.json()
+    assert [day["due_date"] for day in days] == ["2025-06-01", "2025-06-02"]
+
+    response = client.get("/tasks/tasks-for-day",
+                          params={"from": "2025-06-02", "to": "2025-06-01"})
+    assert response.status_code == 422
+
+
+def test_bulk_add_update_delete():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    assignee = int(client.post("/auth/signup", json=user_data).text)
+    tasks = [
+        {"task_description": "Bulk task 1", "assignee": assignee, "due_date": DUE_DATE},
+        {"task_description": "Bulk task 2", "assignee": -1, "due_date": DUE_DATE},
+        {"assignee": assignee},
+        {"task_description": "Bulk task 3", "assignee": assignee, "due_date": DUE_DATE},
+    ]
+    response = client.post("/tasks/add-tasks", json=tasks)
+    assert response.status_code == 201
+    result = response.json()
+    assert [task["task_description"] for task in result["created"]] == ["Bulk task 1", "Bulk task 3"]
+    assert [error["index"] for error in result["errors"]] == [1, 2]
+
+    task_ids = [task["task_id"] for task in result["created"]]
+    response = client.patch("/tasks/update-tasks", json=[
+        {"task_id": task_ids[0], "task_description": "Updated 1"},
+        {"task_id": task_ids[1], "task_description": "Updated 3"},
+        {"task_id": -1, "task_description": "Missing"},
+    ])
+    assert response.status_code == 202
+    result = response.json()
+    assert [task["task_description"] for task in result["updated"]] == ["Updated 1", "Updated 3"]
+    assert [error["index"] for error in result["errors"]] == [2]
+
+    response = client.post("/tasks/delete-tasks", json=task_ids + [-1])
+    assert response.status_code == 200
+    result = response.json()
+    assert sorted(result["deleted"]) == sorted(task_ids)
+    assert [error["index"] for error in result["errors"]] == [2]
+
+
+def test_bulk_ids_beyond_bind_parameter_limit():
+    # Больше id, чем параметров запроса допускает asyncpg
+    missing = list(range(-40000, 0))
+    response = client.post("/tasks/delete-tasks", json=missing)
+    assert response.status_code == 200
+    assert len(response.json()["errors"]) == len(missing)
+
+    response = client.patch("/tasks/update-tasks",
+                            json=[{"task_id": task_id, "task_description": "Missing"}
+                                  for task_id in missing])
+    assert response.status_code == 202
+    assert len(response.json()["errors"]) == len(missing)
+
+
+def test_bulk_add_ndjson():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    assignee = int(client.post("/auth/signup", json=user_data).text)
+    lines = [
+        json.dumps({"task_description": "NDJSON task", "assignee": assignee,
+                    "due_date": DUE_DATE}),
+        "{not json",
+    ]
+    response = client.post("/tasks/add-tasks", content="\n".join(lines),
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 201
+    result = response.json()
+    assert len(result["created"]) == 1
+    assert result["errors"][0]["index"] == 1
+
+
+def test_tasks_list_etag_and_invalidation():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    assignee = int(client.post("/auth/signup", json=user_data).text)
+    task_data = {
+        "task_description": "Cached task",
+        "assignee": assignee,
+        "due_date": DUE_DATE,
+    }
+    client.post("/tasks/add-task", json=task_data)
+    response = client.get("/tasks/tasks-list", params={"assignee": assignee})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get("/tasks/tasks-list", params={"assignee": assignee},
+                          headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.post("/tasks/add-task", json=task_data)
+    response = client.get("/tasks/tasks-list", params={"assignee": assignee},
+                          headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_auto_assign():
+    user_ids = []
+    for _ in range(3):
+        user_data = {
+            "name": fake.name(),
+            "email": fake.email(),
+            "password": fake.password(),
+            "grade": 10
+        }
+        user_ids.append(int(client.post("/auth/signup", json=user_data).text))
+    items = [{"task_description": f"Scheduled task {i}", "grade": 10, "due_date": DUE_DATE}
+             for i in range(6)]
+    items.append({"task_description": "Too hard", "grade": 11})
+    items.append({"task_description": "Unknown project", "project": 10 ** 9})
+
+    response = client.post("/tasks/auto-assign", params={"dry_run": True}, json=items)
+    assert response.status_code == 200
+    plan = response.json()
+    assert plan["created"] == []
+    assert [assignment["index"] for assignment in plan["assignments"]] == list(range(6))
+    assert [error["index"] for error in plan["errors"]] == [6, 7]
+    for user_id in user_ids:
+        response = client.get("/tasks/tasks-list", params={"assignee": user_id})
+        assert response.status_code == 204
+
+    response = client.post("/tasks/auto-assign", params={"weight_by_due_date": True}, json=items)
+    assert response.status_code == 201
+    result = response.json()
+    assert len(result["created"]) == 6
+    assert [task["task_description"] for task in result["created"]] == \
+        [item["task_description"] for item in items[:6]]
+    assert all(task["assignee"] == assignment["assignee"]
+               for task, assignment in zip(result["created"], result["assignments"]))
+    # Есть по крайней мере три сотрудника без заданий: шесть заданий
+    # распределяются не больше чем по два на человека
+    assert all(assignment["load"] <= 2 for assignment in result["assignments"])
+
+
+def test_search_tasks():
+    user_data = {
+        "name": fake.name(),
+        "email": fake.email(),
+        "password": fake.password()
+    }
+    assignee = int(client.post("/auth/signup", json=user_data).text)
+    marker = fake.uuid4().replace("-", "")
+    response = client.post("/tasks/add-tasks", json=[
+        {"task_description": f"{marker} report {i}", "assignee": assignee,
+         "due_date": DUE_DATE}
+        for i in range(3)
+    ] + [{"task_description": f"{marker} {marker} urgent", "assignee": assignee,
+          "due_date": DUE_DATE},
+         {"task_description": f"<img src=x onerror=alert(1)> {marker}x", "assignee": assignee,
+          "due_date": DUE_DATE}])
+    assert response.status_code == 201
+
+    response = client.get("/tasks/search", params={"q": marker, "limit": 2})
+    assert response.status_code == 200
+    hits = response.json()
+    assert hits[0]["task_description"] == f"{marker} {marker} urgent"
+    assert f"<b>{marker}</b>" in hits[0]["highlight"]
+    assert hits[0]["rank"] >= hits[1]["rank"]
+
+    next_page = client.get("/tasks/search", params={
+        "q": marker, "limit": 2, "after": response.headers["X-Next-Cursor"]
+    }).json()
+    found = {hit["task_id"] for hit in hits + next_page}
+    assert len(found) == 4
+
+    response = client.get("/tasks/search", params={"q": f"{marker} -urgent",
+                                                   "assignee": assignee})
+    assert len(response.json()) == 3
+    hit, = client.get("/tasks/search", params={"q": f"{marker}x"}).json()
+    assert hit["highlight"] == f"&lt;img src=x onerror=alert(1)&gt; <b>{marker}x</b>"
+    assert client.get("/tasks/search", params={"q": marker, "after": "bad"}).status_code == 400
@@ -0,0 +1,48 @@
+from app.schemas.task import UserRead
+from app.workload import WorkloadIndex, plan_assignments
+
+
+def make_user(user_id, grade):
+    return UserRead(user_id=user_id, name=f"user{user_id}",
+                    email=f"user{user_id}@example.com", grade=grade)
+
+
+def test_top_k_respects_grade_and_load():
+    index = WorkloadIndex()
+    index.load([(make_user(1, 3), 5), (make_user(2, 5), 1),
+                (make_user(3, 7), 0), (make_user(4, 2), 0)])
+    result = index.top_k(3, k=3)
+    assert [(user.user_id, load) for user, load in result] == [(3, 0), (2, 1), (1, 5)]
+
+
+def test_adjust_and_set_user_update_order():
+    index = WorkloadIndex()
+    index.load([(make_user(1, 5), 0), (make_user(2, 5), 1)])
+    index.adjust(1, 2)
+    assert index.top_k(5)[0][0].user_id == 2
+
+    index.set_user(make_user(3, 6))
+    assert index.top_k(5)[0][0].user_id == 3
+
+    index.set_user(make_user(3, 4))
+    assert [user.user_id for user, _ in index.top_k(5, k=5)] == [2, 1]
+
+
+def test_plan_assignments_balances_and_respects_grade():
+    users = [(1, 3, 0), (2, 5, 2), (3, 7, 0), (4, None, 0)]
+    tasks = [("hard", 7, 1), ("a", 3, 1), ("b", 3, 1), ("c", 3, 1), ("d", 3, 1), ("none", None, 1),
+             ("impossible", 8, 1)]
+    plan = plan_assignments(users, tasks)
+    assert plan["hard"] == (3, 1)
+    assert "impossible" not in plan
+    assert all(user_id != 4 for user_id, _ in plan.values())
+    assert plan["none"] == (2, 3)
+    loads = {1: 0, 2: 2, 3: 0}
+    for user_id, _ in plan.values():
+        loads[user_id] += 1
+    assert max(loads.values()) - min(loads.values()) <= 1
+
+
+def test_plan_assignments_weights():
+    plan = plan_assignments([(1, 5, 0), (2, 5, 0)], [("urgent", 5, 2.0), ("a", 5, 1), ("b", 5, 1)])
+    assert plan["urgent"][0] != plan["a"][0] == plan["b"][0]